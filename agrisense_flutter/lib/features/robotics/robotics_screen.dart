@@ -272,7 +272,7 @@ class _RoboticsScreenState extends State<RoboticsScreen> {
                         // Bounding box overlay
                         if (esp32.detections.isNotEmpty)
                           CustomPaint(
-                            painter: _BoundingBoxPainter(esp32.detections),
+                            painter: _BoundingBoxPainter(esp32.detections, esp32.frameSize),
                           ),
                       ],
                     )
@@ -681,8 +681,10 @@ class _RoboticsScreenState extends State<RoboticsScreen> {
 /// Custom painter for drawing YOLO bounding boxes on the live feed.
 class _BoundingBoxPainter extends CustomPainter {
   final List<Detection> detections;
+  // Size of the frame the boxes were detected on (falls back to 640x480)
+  final Size? frameSize;
 
-  _BoundingBoxPainter(this.detections);
+  _BoundingBoxPainter(this.detections, this.frameSize);
 
   @override
   void paint(Canvas canvas, Size size) {
@@ -693,18 +695,20 @@ class _BoundingBoxPainter extends CustomPainter {
 
     final textPainter = TextPainter(textDirection: TextDirection.ltr);
 
-    // Assume 640x480 source image for scaling
-    const srcW = 640.0;
-    const srcH = 480.0;
-    final scaleX = size.width / srcW;
-    final scaleY = size.height / srcH;
+    // Boxes are in original frame pixels; map them onto the image as laid
+    // out by BoxFit.contain (the received frame may be downscaled)
+    final src = frameSize ?? const Size(640, 480);
+    final fitted = applyBoxFit(BoxFit.contain, src, size).destination;
+    final dst = Alignment.center.inscribe(fitted, Offset.zero & size);
+    final scaleX = dst.width / src.width;
+    final scaleY = dst.height / src.height;
 
     for (final det in detections) {
       final rect = Rect.fromLTRB(
-        det.x1 * scaleX,
-        det.y1 * scaleY,
-        det.x2 * scaleX,
-        det.y2 * scaleY,
+        dst.left + det.x1 * scaleX,
+        dst.top + det.y1 * scaleY,
+        dst.left + det.x2 * scaleX,
+        dst.top + det.y2 * scaleY,
       );
       canvas.drawRect(rect, paint);
 
@@ -726,5 +730,5 @@ class _BoundingBoxPainter extends CustomPainter {
 
   @override
   bool shouldRepaint(covariant _BoundingBoxPainter oldDelegate) =>
-      oldDelegate.detections != detections;
+      oldDelegate.detections != detections || oldDelegate.frameSize != frameSize;
 }
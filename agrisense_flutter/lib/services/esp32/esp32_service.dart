@@ -1,5 +1,6 @@
 import 'dart:async';
 import 'dart:convert';
+import 'dart:ui' show Size;
 
 import 'package:flutter/foundation.dart';
 import 'package:http/http.dart' as http;
@@ -97,8 +98,12 @@ class ESP32Service extends ChangeNotifier {
   // Scanner
   ScanState _scanState = ScanState.idle;
   List<Detection> _detections = [];
+  // Pixel size the detection boxes refer to (the original camera frame)
+  Size? _frameSize;
   final List<ScanResult> _scanResults = [];
   Uint8List? _latestFrame;
+  // Binary frames by frame_id, until the event referencing them arrives
+  final Map<int, Uint8List> _frameCache = {};
 
   // System status
   bool _yoloLoaded = false;
@@ -138,6 +143,7 @@ class ESP32Service extends ChangeNotifier {
   String? get connectionError => _connectionError;
   ScanState get scanState => _scanState;
   List<Detection> get detections => _detections;
+  Size? get frameSize => _frameSize;
   List<ScanResult> get scanResults => _scanResults;
   Uint8List? get latestFrame => _latestFrame;
   bool get yoloLoaded => _yoloLoaded;
@@ -389,7 +395,10 @@ class ESP32Service extends ChangeNotifier {
 
     final wsUrl = _apiBase.replaceFirst('http', 'ws');
     try {
-      _wsChannel = WebSocketChannel.connect(Uri.parse('$wsUrl/ws/scan'));
+      // Binary frames downscaled server-side: 640px wide, JPEG quality 70
+      _wsChannel = WebSocketChannel.connect(
+        Uri.parse('$wsUrl/ws/scan?frames=binary&max_width=640&quality=70'),
+      );
       _wsSubscription = _wsChannel!.stream.listen(
         _handleWsMessage,
         onError: (e) => debugPrint('WebSocket error: $e'),
@@ -407,7 +416,25 @@ class ESP32Service extends ChangeNotifier {
     _wsChannel = null;
   }
 
+  /// Binary frame message: "AGF1" + uint32 frame_id (big-endian) + JPEG.
+  void _handleBinaryFrame(List<int> raw) {
+    final bytes = raw is Uint8List ? raw : Uint8List.fromList(raw);
+    if (bytes.length < 8 ||
+        bytes[0] != 0x41 || bytes[1] != 0x47 || bytes[2] != 0x46 || bytes[3] != 0x31) {
+      return;
+    }
+    final frameId = ByteData.sublistView(bytes, 4, 8).getUint32(0);
+    _frameCache[frameId] = Uint8List.sublistView(bytes, 8);
+    while (_frameCache.length > 8) {
+      _frameCache.remove(_frameCache.keys.first);
+    }
+  }
+
   void _handleWsMessage(dynamic rawData) {
+    if (rawData is List<int>) {
+      _handleBinaryFrame(rawData);
+      return;
+    }
     try {
       final msg = jsonDecode(rawData as String) as Map<String, dynamic>;
       final eventType = msg['event_type'] as String?;
@@ -420,14 +447,24 @@ class ESP32Service extends ChangeNotifier {
           break;
 
         case 'frame':
+          final frameId = data['frame_id'] as int?;
           final b64 = data['frame_base64'] as String?;
-          if (b64 != null) {
+          if (frameId != null && _frameCache.containsKey(frameId)) {
+            _latestFrame = _frameCache[frameId];
+          } else if (b64 != null) {
             _latestFrame = base64Decode(b64);
           }
           final dets = data['detections'] as List?;
           if (dets != null) {
             _detections = dets.map((d) => Detection.fromJson(d)).toList();
           }
+          final frameSize = data['frame_size'] as Map<String, dynamic>?;
+          if (frameSize != null) {
+            _frameSize = Size(
+              (frameSize['width'] as num).toDouble(),
+              (frameSize['height'] as num).toDouble(),
+            );
+          }
           _updatePositionFromData(data);
           break;
 
@@ -455,8 +492,12 @@ class ESP32Service extends ChangeNotifier {
           break;
 
         case 'advice':
-          if (_scanResults.isNotEmpty) {
-            _scanResults[0] = _scanResults[0].copyWith(
+          // Pipelined scans deliver advice asynchronously: match it by scan index.
+          // Advice for a result we don't have (cleared by a new scan, or sent
+          // before this client connected) is dropped, never put on another result
+          final idx = _scanResults.indexWhere((r) => r.scanIndex == data['scan_index']);
+          if (idx >= 0) {
+            _scanResults[idx] = _scanResults[idx].copyWith(
               advice: data['advice'] as Map<String, dynamic>?,
             );
           }
@@ -464,7 +505,8 @@ class ESP32Service extends ChangeNotifier {
 
         case 'error':
           _connectionError = data['message'] as String?;
-          _scanState = ScanState.error;
+          // A failed frame during a pipelined scan keeps state 'scanning'
+          _scanState = _parseScanState(msg['state'] ?? 'error');
           break;
       }
       notifyListeners();
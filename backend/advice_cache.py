@@ -0,0 +1,177 @@
+"""
+AgriSense Advice Cache - Bounded LRU with per-entry TTL
+
+Caches treatment advice produced by rag_agent.get_agri_advice so that the
+ten disease classes that dominate traffic are answered without a Groq call.
+
+Features:
+- Size-bounded LRU eviction (OrderedDict, O(1) get/set)
+- Per-entry TTL so advice never outlives the forecast it was generated for
+- Keys include a normalized forecast fingerprint and a coarse location bucket
+- Copy-on-read / copy-on-write: callers can mutate what they get back
+- Hit / miss / eviction / expiration counters for the stats endpoint
+
+Configuration (environment):
+- ADVICE_CACHE_MAX_ENTRIES: maximum cached responses (default 256)
+- ADVICE_CACHE_TTL_SECONDS: lifetime of a cached response (default 3600,
+  same as the weather_service forecast cache)
+- ADVICE_CACHE_LOCATION_BUCKET_DEG: lat/lon bucket size in degrees (default 0.5)
+"""
+
+import os
+import copy
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+logger = logging.getLogger("AdviceCache")
+
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("ADVICE_CACHE_MAX_ENTRIES", "256"))
+DEFAULT_TTL_SECONDS = float(os.getenv("ADVICE_CACHE_TTL_SECONDS", "3600"))
+LOCATION_BUCKET_DEG = float(os.getenv("ADVICE_CACHE_LOCATION_BUCKET_DEG", "0.5"))
+
+
+# =============================================================================
+# Key Construction
+# =============================================================================
+
+def forecast_fingerprint(weather_forecast: Optional[str]) -> str:
+    """
+    Short, stable fingerprint of a forecast string.
+
+    Whitespace and case are normalized so cosmetic differences between two
+    fetches of the same forecast map to the same key. The forecast carries
+    relative day labels ("today", "tomorrow"), so the fingerprint naturally
+    changes when the day rolls over.
+    """
+    if not weather_forecast:
+        return "none"
+    normalized = " ".join(weather_forecast.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+def location_bucket(latitude: Optional[float], longitude: Optional[float]) -> str:
+    """Snap coordinates to a coarse grid cell (weather is regional, not per-farm)."""
+    if latitude is None or longitude is None:
+        return "default"
+    step = LOCATION_BUCKET_DEG
+    lat_b = round(round(latitude / step) * step, 3)
+    lon_b = round(round(longitude / step) * step, 3)
+    return f"{lat_b},{lon_b}"
+
+
+def make_advice_key(
+    disease_name: str,
+    weather_condition: str,
+    weather_forecast: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    rag_enabled: bool = True,
+    use_reranker: bool = True,
+) -> str:
+    """Build the cache key for a get_agri_advice call."""
+    return ":".join([
+        disease_name.strip().lower(),
+        (weather_condition or "").strip().lower(),
+        forecast_fingerprint(weather_forecast),
+        location_bucket(latitude, longitude),
+        f"rag={int(rag_enabled)}",
+        f"rr={int(use_reranker)}",
+    ])
+
+
+# =============================================================================
+# LRU + TTL Cache
+# =============================================================================
+
+class AdviceCache:
+    """Thread-safe LRU cache with per-entry TTL for advice dictionaries."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a deep copy of the cached advice, or None on miss/expiry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        """Store a deep copy of the advice, evicting the least recently used entry if full."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        stored = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (stored, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._evictions += 1
+                logger.debug(f"Evicted advice cache entry: {evicted_key}")
+
+    def invalidate(self, key: str) -> bool:
+        """Drop a single entry. Returns True if it existed."""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def purge_expired(self) -> int:
+        """Remove expired entries eagerly. Returns the number removed."""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, exp) in self._entries.items() if now >= exp]
+            for k in expired:
+                del self._entries[k]
+            self._expirations += len(expired)
+            return len(expired)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache counters for monitoring."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
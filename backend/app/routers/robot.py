@@ -2,13 +2,18 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 import httpx
 import asyncio
+import os
+import time
+from collections import deque
 from typing import Optional
 
 router = APIRouter(prefix="/api/robot", tags=["Robot Control"])
 
-# Configuration - Update with your ESP32's IP
-ESP32_BASE_URL = "http://192.168.1.100"  # Change to your ESP32 IP
+# Configuration - ESP32_BASE_URL is the rail controller (esp32/camera_robot_controller.ino)
+ESP32_BASE_URL = os.getenv("ESP32_BASE_URL", "http://192.168.1.100")
 TIMEOUT = 5.0
+# The ESP32 web server handles very few sockets; keep a small pool alive between commands
+POOL_LIMITS = httpx.Limits(max_connections=2, max_keepalive_connections=2, keepalive_expiry=30.0)
 
 # --- Models ---
 class LinearMotionRequest(BaseModel):
@@ -64,26 +69,102 @@ POSITION_PRESETS = {
     "full_right": {"pan": 180, "tilt": 90},
 }
 
+# --- Command metrics ---
+command_metrics = {}  # endpoint -> counters and recent latencies
+
+def _record_latency(endpoint: str, latency_ms: float, success: bool):
+    m = command_metrics.setdefault(endpoint, {
+        "count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "recent_ms": deque(maxlen=100),
+    })
+    m["count"] += 1
+    m["errors"] += 0 if success else 1
+    m["total_ms"] += latency_ms
+    m["max_ms"] = max(m["max_ms"], latency_ms)
+    m["recent_ms"].append(latency_ms)
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
 # --- Helper to send commands to ESP32 ---
+_pooled_client: Optional[httpx.AsyncClient] = None
+
+def _get_pooled_client() -> httpx.AsyncClient:
+    """Keep-alive client for ESP32_BASE_URL, created once and reused by every command"""
+    global _pooled_client
+    if _pooled_client is None or _pooled_client.is_closed:
+        _pooled_client = httpx.AsyncClient(timeout=TIMEOUT, limits=POOL_LIMITS)
+    return _pooled_client
+
 async def send_esp32_command(endpoint: str, params: dict = None) -> dict:
-    """Send command to ESP32 via HTTP"""
+    """Send command to ESP32 via HTTP over the pooled keep-alive client"""
+    start = time.perf_counter()
+    result = None
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            url = f"{ESP32_BASE_URL}{endpoint}"
-            response = await client.get(url, params=params)
-            current_state["connected"] = True
-            if response.status_code == 200:
-                return {"success": True, "data": response.text}
-            else:
-                return {"success": False, "error": f"ESP32 returned {response.status_code}"}
+        response = await _get_pooled_client().get(f"{ESP32_BASE_URL}{endpoint}", params=params)
+        current_state["connected"] = True
+        if response.status_code == 200:
+            result = {"success": True, "data": response.text}
+        else:
+            result = {"success": False, "error": f"ESP32 returned {response.status_code}"}
     except httpx.ConnectError:
         current_state["connected"] = False
-        return {"success": False, "error": "Cannot connect to ESP32. Check IP and network."}
+        result = {"success": False, "error": "Cannot connect to ESP32. Check IP and network."}
     except httpx.TimeoutException:
         current_state["connected"] = False
-        return {"success": False, "error": "ESP32 request timed out."}
+        result = {"success": False, "error": "ESP32 request timed out."}
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        result = {"success": False, "error": str(e)}
+    finally:
+        latency_ms = (time.perf_counter() - start) * 1000
+        _record_latency(endpoint, latency_ms, bool(result and result["success"]))
+    result["latency_ms"] = round(latency_ms, 1)
+    return result
+
+# --- Pan-tilt coalescing ---
+class PanTiltCoalescer:
+    """
+    Keeps at most one /pantilt command in flight. Targets that arrive while
+    one is being sent collapse into the latest absolute target, which is
+    sent next; every caller gets the response of the first send that
+    covered its target.
+    """
+
+    def __init__(self):
+        self._target = None
+        self._version = 0
+        self._sending: Optional[asyncio.Future] = None
+        self.submitted = 0
+        self.sent = 0
+
+    @property
+    def coalesced(self) -> int:
+        return self.submitted - self.sent
+
+    async def move(self, pan: int, tilt: int) -> dict:
+        self._target = {"pan": pan, "tilt": tilt}
+        self._version += 1
+        self.submitted += 1
+        mine = self._version
+        while True:
+            if self._sending is None:
+                target, version = self._target, self._version
+                done = asyncio.get_running_loop().create_future()
+                self._sending = done
+                result = None
+                try:
+                    result = await send_esp32_command("/pantilt", target)
+                    self.sent += 1
+                finally:
+                    self._sending = None
+                    # A cancelled send covers nobody; a waiter will retry it
+                    done.set_result((version if result is not None else -1, result))
+            else:
+                version, result = await asyncio.shield(self._sending)
+            if version >= mine:
+                return {**result, "coalesced": version > mine}
+
+pantilt_channel = PanTiltCoalescer()
 
 # --- Endpoints ---
 
@@ -146,7 +227,7 @@ async def pantilt_set(request: PanTiltRequest):
     if not params:
         raise HTTPException(status_code=400, detail="Provide at least pan or tilt angle")
 
-    result = await send_esp32_command("/pantilt", params)
+    result = await pantilt_channel.move(current_state["pan_angle"], current_state["tilt_angle"])
     return {
         "message": f"Pan-tilt set to pan={current_state['pan_angle']}°, tilt={current_state['tilt_angle']}°",
         "esp32_response": result,
@@ -155,19 +236,17 @@ async def pantilt_set(request: PanTiltRequest):
 
 @router.post("/pantilt/increment")
 async def pantilt_increment(request: PanTiltIncrementRequest):
-    """Incrementally adjust pan or tilt"""
+    """Incrementally adjust pan or tilt (rapid increments coalesce into the latest absolute target)"""
     delta = request.increment if request.direction == "positive" else -request.increment
 
     if request.axis == "pan":
         new_angle = max(0, min(180, current_state["pan_angle"] + delta))
         current_state["pan_angle"] = new_angle
-        params = {"pan": new_angle, "tilt": current_state["tilt_angle"]}
     else:
         new_angle = max(0, min(180, current_state["tilt_angle"] + delta))
         current_state["tilt_angle"] = new_angle
-        params = {"pan": current_state["pan_angle"], "tilt": new_angle}
 
-    result = await send_esp32_command("/pantilt", params)
+    result = await pantilt_channel.move(current_state["pan_angle"], current_state["tilt_angle"])
     return {
         "message": f"{request.axis} adjusted by {delta}° to {new_angle}°",
         "esp32_response": result,
@@ -179,7 +258,7 @@ async def pantilt_home():
     """Center pan-tilt bracket to home position (90, 90)"""
     current_state["pan_angle"] = 90
     current_state["tilt_angle"] = 90
-    result = await send_esp32_command("/pantilt", {"pan": 90, "tilt": 90})
+    result = await pantilt_channel.move(90, 90)
     return {"message": "Pan-tilt homed to center (90°, 90°)", "esp32_response": result, "state": current_state}
 
 @router.post("/home")
@@ -190,7 +269,7 @@ async def home_all(request: HomeRequest):
     if request.home_pan_tilt:
         current_state["pan_angle"] = 90
         current_state["tilt_angle"] = 90
-        results["pantilt"] = await send_esp32_command("/pantilt", {"pan": 90, "tilt": 90})
+        results["pantilt"] = await pantilt_channel.move(90, 90)
 
     if request.home_rail:
         current_state["rail_moving"] = False
@@ -215,7 +294,7 @@ async def move_to_preset(request: CameraPositionPreset):
         tilt = preset.get("tilt", current_state["tilt_angle"])
         current_state["pan_angle"] = pan
         current_state["tilt_angle"] = tilt
-        results["pantilt"] = await send_esp32_command("/pantilt", {"pan": pan, "tilt": tilt})
+        results["pantilt"] = await pantilt_channel.move(pan, tilt)
 
     if "rail_direction" in preset:
         direction = preset["rail_direction"]
@@ -243,3 +322,25 @@ async def get_stream_url():
         "snapshot_url": f"{ESP32_BASE_URL}/capture",
         "connected": current_state["connected"],
     }
+
+@router.get("/metrics")
+async def get_command_metrics():
+    """Per-command latency (ms) and pan-tilt coalescing counters"""
+    return {
+        "commands": {
+            endpoint: {
+                "count": m["count"],
+                "errors": m["errors"],
+                "avg_ms": round(m["total_ms"] / m["count"], 1),
+                "p50_ms": round(_percentile(m["recent_ms"], 0.5), 1),
+                "p95_ms": round(_percentile(m["recent_ms"], 0.95), 1),
+                "max_ms": round(m["max_ms"], 1),
+            }
+            for endpoint, m in command_metrics.items()
+        },
+        "pantilt": {
+            "submitted": pantilt_channel.submitted,
+            "sent": pantilt_channel.sent,
+            "coalesced": pantilt_channel.coalesced,
+        },
+    }
@@ -0,0 +1,219 @@
+"""
+AgriSense Device Registry - Multi-Camera Robotics Fleet
+
+main.lifespan used to create exactly one ESP32Client and one
+RoboticsScanner, so a backend process could drive a single camera rig.
+The registry holds one RoboticsDevice per device id instead.
+
+Features:
+- Each device has its own ESP32Client (with its shared MJPEG reader and
+  motor scheduler), RoboticsScanner, FrameStore and subscriber hub, which
+  is the /ws/scan/{device_id} topic
+- Devices share the expensive back-ends:
+  - one YOLODetector, whose batching queue merges frames from all cameras
+  - the vision_engine classifier batch queues
+  - one pair of bounded CPU / network executors, so inference concurrency
+    does not grow with the number of cameras
+- Devices are created on first connect (POST /esp32/connect?device_id=...)
+  or declared at startup via ESP32_DEVICES
+- The "default" device always exists and backs the single-camera API
+  (requests without a device_id, /ws/scan, app.state.esp32_client/scanner)
+
+Configuration (environment):
+- ESP32_DEVICES: devices to register (and connect) at startup, comma-separated
+  "id=ip[:port]", e.g. "rig-1=192.168.1.50,rig-2=192.168.1.51:8080" (default none)
+- ESP32_MAX_DEVICES: maximum registered devices (default 32)
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("AgriSense.Devices")
+
+
+DEFAULT_DEVICE_ID = "default"
+DEVICE_SPECS = os.getenv("ESP32_DEVICES", "")
+MAX_DEVICES = int(os.getenv("ESP32_MAX_DEVICES", "32"))
+
+_DEVICE_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def parse_device_specs(spec: str) -> List[Tuple[str, str, int]]:
+    """
+    (device_id, ip_address, port) for each "id=ip[:port]" entry.
+
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    devices = []
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        device_id, sep, address = entry.partition("=")
+        if not sep or not device_id.strip() or not address.strip():
+            raise ValueError(f"Invalid ESP32_DEVICES entry '{entry}' (expected id=ip[:port])")
+        host, _, port = address.strip().partition(":")
+        devices.append((device_id.strip(), host, int(port) if port else 80))
+    return devices
+
+
+def startup_device_count(spec: str = DEVICE_SPECS) -> int:
+    """Devices registered at startup: the ESP32_DEVICES entries plus the default."""
+    try:
+        entries = parse_device_specs(spec)
+    except ValueError:
+        return 1
+    return len({device_id for device_id, _, _ in entries} | {DEFAULT_DEVICE_ID})
+
+
+@dataclass
+class RoboticsDevice:
+    """One camera rig: its client and scanner."""
+    device_id: str
+    client: Any  # ESP32Client
+    scanner: Any  # RoboticsScanner
+    created_at: float = field(default_factory=time.time)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stream = self.client.stream.get_stats()
+        return {
+            "device_id": self.device_id,
+            "connected": self.client.is_connected,
+            "base_url": self.client.base_url,
+            "scan_state": self.scanner.state.value,
+            "scan_results_count": self.scanner.results_count,
+            "subscribers": self.scanner.subscriber_count,
+            "stream_viewers": stream["viewers"],
+            "stream_fps": stream["fps"],
+            "motor_queue_depth": self.client.motors.queue_depth,
+            "registered_s": round(time.time() - self.created_at, 1),
+        }
+
+
+class DeviceRegistry:
+    """
+    Devices by id.
+
+    Args:
+        client_factory: device_id -> new ESP32Client
+        scanner_factory: (device_id, client) -> RoboticsScanner wired to the
+            shared back-ends
+        max_devices: Registry capacity
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[str], Any],
+        scanner_factory: Callable[[str, Any], Any],
+        max_devices: int = MAX_DEVICES,
+    ):
+        self._client_factory = client_factory
+        self._scanner_factory = scanner_factory
+        self.max_devices = max(1, max_devices)
+        self._devices: Dict[str, RoboticsDevice] = {}
+        self.get_or_create(DEFAULT_DEVICE_ID)
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __iter__(self) -> Iterator[RoboticsDevice]:
+        return iter(list(self._devices.values()))
+
+    @property
+    def default(self) -> RoboticsDevice:
+        return self._devices[DEFAULT_DEVICE_ID]
+
+    def get(self, device_id: str) -> Optional[RoboticsDevice]:
+        return self._devices.get(device_id)
+
+    def get_or_create(self, device_id: str) -> RoboticsDevice:
+        """
+        The device with this id, registering it if needed.
+
+        Raises:
+            ValueError: If the id is invalid or the registry is full
+        """
+        device = self._devices.get(device_id)
+        if device is not None:
+            return device
+        if not _DEVICE_ID.match(device_id or ""):
+            raise ValueError(f"Invalid device id '{device_id}' (letters, digits, '.', '_', '-'; max 64)")
+        if len(self._devices) >= self.max_devices:
+            raise ValueError(f"Device limit reached ({self.max_devices}); remove a device or raise ESP32_MAX_DEVICES")
+
+        client = self._client_factory(device_id)
+        device = RoboticsDevice(device_id, client, self._scanner_factory(device_id, client))
+        self._devices[device_id] = device
+        logger.info(f"📷 Registered device '{device_id}' ({len(self._devices)} total)")
+        return device
+
+    async def remove(self, device_id: str) -> bool:
+        """
+        Stop the device's scan, end its WebSocket sessions and disconnect it.
+
+        Raises:
+            ValueError: For the default device
+        """
+        if device_id == DEFAULT_DEVICE_ID:
+            raise ValueError("The default device cannot be removed")
+        device = self._devices.pop(device_id, None)
+        if device is None:
+            return False
+        await self._shutdown(device)
+        logger.info(f"🗑️ Removed device '{device_id}' ({len(self._devices)} remaining)")
+        return True
+
+    async def connect_from_specs(self, spec: str = DEVICE_SPECS) -> Dict[str, bool]:
+        """Register and connect the ESP32_DEVICES entries concurrently. Returns connected per device."""
+        try:
+            entries = parse_device_specs(spec)
+        except ValueError as e:
+            logger.error(f"❌ {e}")
+            return {}
+
+        async def connect(device_id: str, host: str, port: int) -> bool:
+            try:
+                return await self.get_or_create(device_id).client.connect(host, port)
+            except ValueError as e:
+                logger.error(f"❌ {e}")
+                return False
+
+        results = await asyncio.gather(*(connect(*entry) for entry in entries))
+        status = {entry[0]: ok for entry, ok in zip(entries, results)}
+        if status:
+            logger.info(f"📷 ESP32_DEVICES: {sum(status.values())}/{len(status)} connected")
+        return status
+
+    async def close(self):
+        """Stop every scan and disconnect every device (shutdown)."""
+        for device in self:
+            await self._shutdown(device)
+
+    @staticmethod
+    async def _shutdown(device: RoboticsDevice):
+        try:
+            if device.scanner.is_scanning:
+                await device.scanner.stop_scan()
+        except Exception as e:
+            logger.warning(f"⚠️ Stopping scan on '{device.device_id}' failed: {e}")
+        device.scanner.unsubscribe_all()
+        if device.client.is_connected:
+            await device.client.disconnect()
+        else:
+            await device.client.stream.stop()
+            await device.client.motors.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        devices = [d.get_stats() for d in self]
+        return {
+            "count": len(devices),
+            "max_devices": self.max_devices,
+            "connected": sum(1 for d in devices if d["connected"]),
+            "scanning": sum(1 for d in self if d.scanner.is_scanning),
+            "devices": devices,
+        }
@@ -0,0 +1,31 @@
+"""
+AgriSense Disease Classes - Shared Disease Vocabulary
+
+The API's accepted disease names (main.DISEASE_CLASSES) and the classes
+whose retrieval results are precomputed (markdown_rag_pipeline) used to
+be two hand-maintained copies of the same list. Both import it from here.
+
+Features:
+- DISEASE_NAMES: diseased classes, the ones that reach retrieval
+- HEALTHY_CLASS: answered without RAG
+- DISEASE_CLASSES: all 10 tomato classes (same as the Flutter on-device model)
+"""
+
+from typing import List, Tuple
+
+
+DISEASE_NAMES: Tuple[str, ...] = (
+    "Bacterial Spot",
+    "Early Blight",
+    "Late Blight",
+    "Leaf Mold",
+    "Septoria Leaf Spot",
+    "Spider Mites",
+    "Target Spot",
+    "Yellow Leaf Curl Virus",
+    "Mosaic Virus",
+)
+
+HEALTHY_CLASS = "Healthy"
+
+DISEASE_CLASSES: List[str] = [*DISEASE_NAMES, HEALTHY_CLASS]
@@ -16,17 +16,35 @@ Expected ESP32-CAM HTTP endpoints:
   POST /motor/stop                -> No-op (compatibility), report position
   POST /motor/position?pan=N&tilt=N -> Set absolute servo positions
   GET  /motor/position            -> Get current servo angles
+
+The device serves at most one MJPEG stream: all viewers share a single
+SharedMJPEGReader (mjpeg_stream), and capture_frame() reuses its frames
+while it is running instead of requesting /capture alongside the stream.
+Manual motor commands go through a MotorCommandScheduler (motors) that
+keeps one request in flight and collapses superseded jogs.
+
+Configuration (environment):
+- ESP32_STREAM_CAPTURE_MAX_AGE_S: max age of a stream frame served as a still (default 0.5)
+- ESP32_STREAM_CHUNK_SIZE: read size for the MJPEG stream in bytes (default 16384)
 """
 
+import os
 import logging
 import asyncio
 from typing import Optional, AsyncIterator, Dict, Any
 
 import httpx
 
+from mjpeg_stream import MJPEGParser, SharedMJPEGReader
+from motor_scheduler import MotorCommandScheduler
+
 logger = logging.getLogger("AgriSense.ESP32")
 
 
+STREAM_CAPTURE_MAX_AGE_S = float(os.getenv("ESP32_STREAM_CAPTURE_MAX_AGE_S", "0.5"))
+STREAM_CHUNK_SIZE = int(os.getenv("ESP32_STREAM_CHUNK_SIZE", "16384"))
+
+
 class ESP32Client:
     """Async HTTP client for ESP32-CAM communication."""
 
@@ -35,12 +53,21 @@ class ESP32Client:
         self._client: Optional[httpx.AsyncClient] = None
         self._connected: bool = False
         self._timeout = httpx.Timeout(connect=5.0, read=10.0, write=5.0, pool=5.0)
+        # One upstream MJPEG connection shared by every viewer, the scanner and captures
+        self.stream = SharedMJPEGReader(self.stream_frames)
+        self._stream_parser: Optional[MJPEGParser] = None
+        # Manual jog commands: one request in flight, superseded moves collapsed
+        self.motors = MotorCommandScheduler(self)
+        self._stream_captures = 0
+        self._device_captures = 0
 
     async def connect(self, ip_address: str, port: int = 80) -> bool:
         """Connect to an ESP32-CAM device by IP address."""
         self._base_url = f"http://{ip_address}:{port}"
 
-        # Close existing client if any
+        # Close existing client (and its stream / queued motor commands) if any
+        await self.stream.stop()
+        await self.motors.stop()
         if self._client:
             await self._client.aclose()
 
@@ -71,6 +98,8 @@ class ESP32Client:
 
     async def disconnect(self):
         """Disconnect from ESP32-CAM."""
+        await self.stream.stop()
+        await self.motors.stop()
         if self._client:
             await self._client.aclose()
             self._client = None
@@ -220,6 +249,7 @@ class ESP32Client:
                 timeout=httpx.Timeout(connect=5.0, read=15.0, write=5.0, pool=5.0),
             )
             if resp.status_code == 200:
+                self._device_captures += 1
                 logger.info(f"Captured still image: {len(resp.content)} bytes")
                 return resp.content
             else:
@@ -227,54 +257,68 @@ class ESP32Client:
         except httpx.TimeoutException:
             raise RuntimeError("Timeout capturing still image from ESP32-CAM")
 
+    async def capture_frame(self, max_age_s: float = STREAM_CAPTURE_MAX_AGE_S, fresh: bool = False) -> bytes:
+        """
+        A current JPEG frame, from the shared stream when it is running.
+
+        Args:
+            max_age_s: Accept the latest stream frame if it is at most this old
+            fresh: Wait for the next stream frame instead (e.g. after a servo
+                move has settled)
+
+        Falls back to capture_still() when no stream is running or no frame
+        arrives in time.
+        """
+        self._ensure_connected()
+        if self.stream.running:
+            frame = None if fresh else self.stream.latest(max_age_s)
+            if frame is None:
+                frame = await self.stream.next_frame()
+            if frame is not None:
+                self._stream_captures += 1
+                return frame
+        return await self.capture_still()
+
+    def get_stream_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stream.get_stats(),
+            "captures_from_stream": self._stream_captures,
+            "captures_from_device": self._device_captures,
+            "parser": self._stream_parser.get_stats() if self._stream_parser else None,
+        }
+
     async def stream_frames(self) -> AsyncIterator[bytes]:
         """
         Consume the ESP32-CAM MJPEG stream, yielding individual JPEG frames.
 
         The ESP32-CAM /stream endpoint emits multipart/x-mixed-replace with
-        JPEG frames separated by boundaries. This parser extracts individual
-        JPEG frames by finding SOI (0xFFD8) and EOI (0xFFD9) markers.
+        a Content-Length header per JPEG part. MJPEGParser cuts frames by
+        that length (falling back to SOI/EOI markers) in linear time; each
+        frame is copied out of its buffer once because the shared reader
+        keeps it after the next chunk arrives.
         """
         self._ensure_connected()
 
         stream_timeout = httpx.Timeout(connect=5.0, read=30.0, write=5.0, pool=5.0)
+        parser = MJPEGParser()
+        self._stream_parser = parser
 
         async with self._client.stream(
             "GET", f"{self._base_url}/stream", timeout=stream_timeout
         ) as response:
-            buffer = b""
-            async for chunk in response.aiter_bytes(chunk_size=4096):
-                buffer += chunk
-                while True:
-                    # Find JPEG start-of-image marker
-                    start = buffer.find(b"\xff\xd8")
-                    if start == -1:
-                        # No SOI found, discard everything before the last byte
-                        # (keep last byte in case it's the start of 0xFFD8)
-                        if len(buffer) > 1:
-                            buffer = buffer[-1:]
-                        break
-
-                    # Find JPEG end-of-image marker after SOI
-                    end = buffer.find(b"\xff\xd9", start + 2)
-                    if end == -1:
-                        # No EOI yet, need more data
-                        # Discard anything before SOI
-                        buffer = buffer[start:]
-                        break
-
-                    # Extract complete JPEG frame
-                    frame = buffer[start : end + 2]
-                    buffer = buffer[end + 2 :]
-                    yield frame
+            async for chunk in response.aiter_bytes(chunk_size=STREAM_CHUNK_SIZE):
+                for view in parser.feed(chunk):
+                    yield bytes(view)
 
     async def proxy_stream(self) -> AsyncIterator[bytes]:
         """
         Proxy the ESP32 MJPEG stream in multipart/x-mixed-replace format.
 
-        Yields raw multipart chunks suitable for a StreamingResponse.
+        Yields raw multipart chunks suitable for a StreamingResponse. All
+        viewers share one upstream connection (self.stream).
         """
-        async for frame in self.stream_frames():
+        self._ensure_connected()
+        async for frame in self.stream.frames():
             yield (
                 b"--frame\r\n"
                 b"Content-Type: image/jpeg\r\n"
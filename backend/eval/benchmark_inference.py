@@ -0,0 +1,234 @@
+"""
+AgriSense Disease Classifier Inference Benchmark
+================================================
+Compares the vision_engine forward-pass backends on the same inputs:
+
+  1. keras           — model.predict(x, verbose=0) (original path, reference)
+  2. tf_function     — traced tf.function with a fixed input signature
+  3. tflite_fp32     — TFLite interpreter, full precision
+  4. tflite_float16  — TFLite, fp16 weights
+  5. tflite_int8     — TFLite, int8 post-training quantization
+
+For each model and backend it reports single-image latency (P50, P95, mean),
+batched throughput, and agreement with the keras reference (max |Δp|, top-1
+agreement). With labelled images (class-named subfolders, e.g. the
+convert_to_tflite.py calibration set) it also reports accuracy and suggests
+the fastest variant within an accuracy budget, so the backend can be picked
+per deployment (VISION_BACKEND_MOBILENET / VISION_BACKEND_RESNET).
+
+Usage:
+  # Both models, all backends, random inputs (latency only)
+  python eval/benchmark_inference.py
+
+  # Accuracy vs latency on the calibration images
+  python eval/benchmark_inference.py --calibration
+
+  # One model, a specific labelled image directory
+  python eval/benchmark_inference.py --model mobilenet --images ./calibration_data
+
+  # Only the TFLite variants, stricter accuracy budget
+  python eval/benchmark_inference.py --calibration --backends keras tflite_float16 tflite_int8 --max-accuracy-drop 0.5
+
+Output:
+  eval/benchmark_inference_<timestamp>.json   — per-model, per-backend metrics
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path so we can import vision_engine directly
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+# Batching queues add a wait window; benchmark the raw forward paths
+os.environ['VISION_BATCHING_ENABLED'] = 'false'
+# The keras reference needs the .h5 models in memory regardless of deployment config
+os.environ['VISION_INFERENCE_MODE'] = 'keras'
+os.environ.pop('VISION_BACKEND_MOBILENET', None)
+os.environ.pop('VISION_BACKEND_RESNET', None)
+
+import vision_engine
+from inference_backends import INFERENCE_MODES, create_backend
+from convert_to_tflite import CALIBRATION_DIRS
+
+
+def _norm(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '', name.lower().replace("tomato", ""))
+
+
+# Folder name → class index (accepts raw PlantVillage names and display names)
+_LABELS = {}
+for _i, _raw in enumerate(vision_engine.CLASS_NAMES):
+    _LABELS[_norm(_raw)] = _i
+    _LABELS[_norm(vision_engine.DISPLAY_NAMES.get(_raw, _raw))] = _i
+
+
+def find_images(images_dir: str | None, calibration: bool, limit: int) -> list[Path]:
+    dirs = [images_dir] if images_dir else (CALIBRATION_DIRS if calibration else [])
+    for d in dirs:
+        if d and os.path.isdir(d):
+            paths = [
+                p for p in sorted(Path(d).rglob("*"))
+                if p.suffix.lower() in vision_engine.SUPPORTED_FORMATS
+            ]
+            if paths:
+                print(f"  Using {min(len(paths), limit)} images from {d}")
+                return paths[:limit]
+    if dirs:
+        print("  No images found, using random inputs (latency only)")
+    return []
+
+
+def load_inputs(model_type: str, paths: list[Path], count: int) -> tuple[np.ndarray, np.ndarray | None]:
+    """Preprocessed (N, 224, 224, 3) inputs and labels (None if unknown), or random pixels."""
+    if paths:
+        inputs, labels = [], []
+        for p in paths:
+            try:
+                inputs.append(vision_engine.preprocess_image(p.read_bytes(), model_type=model_type))
+            except ValueError:
+                continue
+            labels.append(_LABELS.get(_norm(p.parent.name), -1))
+        labels = np.array(labels)
+        return np.concatenate(inputs), (labels if (labels >= 0).all() else None)
+
+    rng = np.random.default_rng(42)
+    pixels = rng.integers(0, 256, size=(count, 224, 224, 3)).astype(np.float32)
+    return vision_engine.PREPROCESS_FN[model_type](pixels), None
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def bench_backend(backend, inputs: np.ndarray, iterations: int, batch_size: int, warmup: int) -> dict:
+    # Warm-up (graph tracing, allocator, interpreter resize)
+    for i in range(warmup):
+        backend.predict_batch(inputs[i % len(inputs)][np.newaxis])
+    backend.predict_batch(inputs[:batch_size])
+
+    single_ms = []
+    for i in range(iterations):
+        x = inputs[i % len(inputs)][np.newaxis]
+        t = time.perf_counter()
+        backend.predict_batch(x)
+        single_ms.append((time.perf_counter() - t) * 1000)
+
+    batch = inputs[:batch_size]
+    n_batches = max(1, iterations // batch_size)
+    t = time.perf_counter()
+    for _ in range(n_batches):
+        backend.predict_batch(batch)
+    batch_elapsed = time.perf_counter() - t
+
+    return {
+        "single_p50_ms": round(percentile(single_ms, 50), 3),
+        "single_p95_ms": round(percentile(single_ms, 95), 3),
+        "single_mean_ms": round(statistics.mean(single_ms), 3),
+        "batch_size": len(batch),
+        "batch_mean_ms": round(batch_elapsed / n_batches * 1000, 3),
+        "batch_throughput_ips": round(n_batches * len(batch) / batch_elapsed, 2),
+    }
+
+
+def predict_all(backend, inputs: np.ndarray, batch_size: int) -> np.ndarray:
+    return np.concatenate([
+        backend.predict_batch(inputs[i:i + batch_size])
+        for i in range(0, len(inputs), batch_size)
+    ])
+
+
+def recommend(results: dict, max_drop_pp: float) -> str | None:
+    """Fastest backend whose accuracy is within max_drop_pp of keras."""
+    ref = results.get("keras", {}).get("accuracy")
+    if ref is None:
+        return None
+    eligible = [
+        (m["single_p50_ms"], mode) for mode, m in results.items()
+        if m.get("accuracy") is not None and (ref - m["accuracy"]) * 100 <= max_drop_pp
+    ]
+    return min(eligible)[1] if eligible else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AgriSense classifier inference benchmark")
+    parser.add_argument("--model", choices=["mobilenet", "resnet", "all"], default="all")
+    parser.add_argument("--backends", nargs="+", choices=list(INFERENCE_MODES), default=list(INFERENCE_MODES))
+    parser.add_argument("--images", type=str, default=None, help="Directory of test images (class-named subfolders for accuracy)")
+    parser.add_argument("--calibration", action="store_true", help="Use the convert_to_tflite.py calibration images")
+    parser.add_argument("--limit", type=int, default=200, help="Max images to load")
+    parser.add_argument("--iterations", type=int, default=100, help="Single-image iterations per backend")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size for the throughput run")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--max-accuracy-drop", type=float, default=1.0,
+                        help="Accuracy budget (percentage points vs keras) for the recommendation")
+    args = parser.parse_args()
+
+    print("📦 Loading models...")
+    status = vision_engine.load_models()
+    model_types = ["mobilenet", "resnet"] if args.model == "all" else [args.model]
+    backends = ["keras"] + [b for b in args.backends if b != "keras"]
+    image_paths = find_images(args.images, args.calibration, args.limit)
+
+    report = {"timestamp": datetime.now().isoformat(), "args": vars(args), "models": {}}
+
+    for model_type in model_types:
+        if not status.get(model_type) or vision_engine._models.get(model_type) is None:
+            print(f"⚠️  {model_type} Keras model not loaded, skipping")
+            continue
+        model = vision_engine._models[model_type]
+        inputs, labels = load_inputs(model_type, image_paths, max(args.batch_size, 32))
+        reference = predict_all(create_backend(model_type, model, mode="keras"), inputs, args.batch_size)
+
+        print(f"\n{'='*86}\n  {model_type.upper()}  ({len(inputs)} inputs, labels={'yes' if labels is not None else 'no'})\n{'='*86}")
+        print(f"  {'backend':<15} {'p50 ms':>8} {'p95 ms':>8} {'batch ms':>9} {'img/s':>8} "
+              f"{'max|Δp|':>9} {'top1 agr':>9} {'acc':>7} {'MB':>7}")
+
+        results = {}
+        for mode in backends:
+            backend = create_backend(model_type, model, mode=mode)
+            if backend is None or backend.mode != mode:
+                print(f"  {mode:<15} unavailable")
+                continue
+            metrics = bench_backend(backend, inputs, args.iterations, args.batch_size, args.warmup)
+            outputs = predict_all(backend, inputs, args.batch_size)
+            metrics["max_abs_diff_vs_keras"] = float(np.max(np.abs(outputs - reference)))
+            metrics["top1_agreement_vs_keras"] = float(np.mean(outputs.argmax(1) == reference.argmax(1)))
+            metrics["accuracy"] = float(np.mean(outputs.argmax(1) == labels)) if labels is not None else None
+            metrics["size_mb"] = backend.describe().get("size_mb")
+            results[mode] = metrics
+
+            acc = f"{metrics['accuracy']:.2%}" if metrics["accuracy"] is not None else "-"
+            size = f"{metrics['size_mb']:.1f}" if metrics["size_mb"] else "-"
+            print(
+                f"  {mode:<15} {metrics['single_p50_ms']:>8.2f} {metrics['single_p95_ms']:>8.2f} "
+                f"{metrics['batch_mean_ms']:>9.2f} {metrics['batch_throughput_ips']:>8.1f} "
+                f"{metrics['max_abs_diff_vs_keras']:>9.2e} {metrics['top1_agreement_vs_keras']:>9.2%} "
+                f"{acc:>7} {size:>7}"
+            )
+
+        best = recommend(results, args.max_accuracy_drop)
+        if best:
+            print(f"\n  ✅ Recommended: VISION_BACKEND_{model_type.upper()}={best} "
+                  f"(fastest within {args.max_accuracy_drop:.1f} pp of keras accuracy)")
+        report["models"][model_type] = {"backends": results, "recommended": best}
+
+    out_path = Path(__file__).resolve().parent / f"benchmark_inference_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Saved: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+YOLOv8 Dynamic-Batch ONNX Export for AgriSense
+===============================================
+Re-exports the trained leaf detector (.pt) to ONNX with a dynamic batch
+dimension, so YOLODetector.detect_batch can run several frames in one
+ONNX Runtime call. A fixed-batch export still works, one image per call.
+
+Usage:
+    cd AgriSense/backend
+    pip install ultralytics
+    python export_yolo_onnx.py
+    python export_yolo_onnx.py --weights path/to/yolov8s_tomato_leaf.pt --opset 17
+
+Outputs:
+    models/YoloV8/yolov8s_tomato_leaf.onnx   (input: [batch, 3, 640, 640])
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+YOLO_DIR = os.path.join(SCRIPT_DIR, 'models', 'YoloV8')
+METADATA_PATH = os.path.join(YOLO_DIR, 'model_metadata_v2.json')
+
+
+def main():
+    with open(METADATA_PATH, 'r') as f:
+        meta = json.load(f)
+    export_files = meta.get('export_files', {})
+
+    parser = argparse.ArgumentParser(description="Export the YOLOv8 leaf detector to dynamic-batch ONNX")
+    parser.add_argument('--weights', default=os.path.join(YOLO_DIR, export_files.get('pytorch', 'yolov8s_tomato_leaf.pt')))
+    parser.add_argument('--output', default=os.path.join(YOLO_DIR, export_files.get('onnx', 'yolov8s_tomato_leaf.onnx')))
+    parser.add_argument('--imgsz', type=int, default=meta.get('input_shape', [640])[0])
+    parser.add_argument('--opset', type=int, default=17)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.weights):
+        print(f"❌ Weights not found: {args.weights}")
+        sys.exit(1)
+
+    try:
+        from ultralytics import YOLO
+    except ImportError:
+        print("❌ ultralytics is required for export: pip install ultralytics")
+        sys.exit(1)
+
+    print(f"📦 Exporting {args.weights} (imgsz={args.imgsz}, opset={args.opset}, dynamic batch)")
+    exported = YOLO(args.weights).export(
+        format='onnx', imgsz=args.imgsz, dynamic=True, simplify=True, opset=args.opset,
+    )
+
+    if os.path.abspath(exported) != os.path.abspath(args.output):
+        if os.path.exists(args.output):
+            backup = args.output + '.bak'
+            shutil.copy2(args.output, backup)
+            print(f"   Previous model backed up to {backup}")
+        shutil.move(exported, args.output)
+
+    print(f"✅ Saved: {args.output} ({os.path.getsize(args.output) / (1024 * 1024):.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+AgriSense Frame Channel - Binary Frame Fan-Out for the Scan WebSocket
+
+Scan events used to carry the full JPEG as base64 (frame events, every
+ScanResult and the advice event), so each frame was base64-encoded up to
+three times and JSON-serialized per subscriber.
+
+The scanner now stores each captured JPEG once under a frame id and its
+events reference that id. Per WebSocket subscriber:
+
+- Binary subscribers receive each frame once as a binary message
+  (header + JPEG) right before its frame event; later events (advice)
+  only reference the id, and a missed frame can be fetched from
+  /esp32/frames/{frame_id}
+- Legacy subscribers keep receiving frame_base64 / image_base64 in the
+  JSON, encoded once per frame variant and shared by all subscribers
+- Either kind may ask for a downscaled / lower-quality variant
+  (max_width, quality); variants are encoded once and cached
+
+Binary message layout (big-endian):
+    b"AGF1" | frame_id: uint32 | JPEG bytes
+
+Configuration (environment):
+- FRAME_CACHE_SIZE: recent frames kept for fan-out and /esp32/frames (default 64)
+- FRAME_VARIANT_CACHE_SIZE: encoded variants kept (default 128)
+"""
+
+import os
+import base64
+import struct
+import logging
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import cv2
+
+from image_preprocessing import decode_image
+
+logger = logging.getLogger("AgriSense.FrameChannel")
+
+
+FRAME_CACHE_SIZE = int(os.getenv("FRAME_CACHE_SIZE", "64"))
+FRAME_VARIANT_CACHE_SIZE = int(os.getenv("FRAME_VARIANT_CACHE_SIZE", "128"))
+
+FRAME_MAGIC = b"AGF1"
+_HEADER = struct.Struct(">4sI")
+HEADER_SIZE = _HEADER.size
+
+# JSON key a legacy subscriber gets the image under, per event type
+LEGACY_IMAGE_KEYS = {"frame": "frame_base64", "advice": "image_base64"}
+
+
+def pack_frame(frame_id: int, jpeg: bytes) -> bytes:
+    """Binary WebSocket message for a frame."""
+    return _HEADER.pack(FRAME_MAGIC, frame_id) + jpeg
+
+
+def unpack_frame(message: bytes) -> Tuple[int, memoryview]:
+    """
+    (frame_id, JPEG view) from a binary frame message.
+
+    Raises:
+        ValueError: If the message is not a frame message
+    """
+    if len(message) < HEADER_SIZE:
+        raise ValueError("Frame message too short")
+    magic, frame_id = _HEADER.unpack_from(message)
+    if magic != FRAME_MAGIC:
+        raise ValueError("Not a frame message")
+    return frame_id, memoryview(message)[HEADER_SIZE:]
+
+
+@dataclass(frozen=True)
+class FrameOptions:
+    """A subscriber's frame delivery preferences."""
+    binary: bool = False
+    max_width: int = 0  # 0 = original size
+    quality: int = 0  # JPEG quality 1-100, 0 = original encoding
+
+    @property
+    def is_original(self) -> bool:
+        return not self.max_width and not self.quality
+
+    @classmethod
+    def from_params(cls, params: Dict[str, Any]) -> "FrameOptions":
+        """From WebSocket query params / a command: frames=binary|base64, max_width, quality."""
+        frames = str(params.get("frames", "base64")).lower()
+        binary = frames == "binary" or str(params.get("binary", "")).lower() in {"1", "true", "yes"}
+        max_width = max(0, int(params.get("max_width") or 0))
+        quality = min(100, max(0, int(params.get("quality") or 0)))
+        return cls(binary=binary, max_width=max_width, quality=quality)
+
+
+class FrameStore:
+    """
+    Recent JPEG frames by id, plus a cache of encoded variants.
+
+    Frames belonging to scan results can be pinned so the LRU window of
+    live frames never evicts them.
+    """
+
+    def __init__(self, capacity: int = FRAME_CACHE_SIZE, variant_capacity: int = FRAME_VARIANT_CACHE_SIZE):
+        self.capacity = max(1, capacity)
+        self.variant_capacity = max(1, variant_capacity)
+        self._frames: "OrderedDict[int, bytes]" = OrderedDict()
+        self._pinned: Dict[int, bytes] = {}
+        self._variants: "OrderedDict[Tuple[int, int, int, bool], Any]" = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()  # variants are built on worker threads
+
+        self._variant_hits = 0
+        self._variant_misses = 0
+        self._bytes_in = 0
+
+    def put(self, jpeg: bytes) -> int:
+        """Store a frame and return its id."""
+        with self._lock:
+            frame_id = self._next_id
+            self._next_id = (self._next_id + 1) & 0xFFFFFFFF or 1
+            self._frames[frame_id] = jpeg
+            self._bytes_in += len(jpeg)
+            while len(self._frames) > self.capacity:
+                self._frames.popitem(last=False)
+            return frame_id
+
+    def get(self, frame_id: int) -> Optional[bytes]:
+        with self._lock:
+            return self._pinned.get(frame_id) or self._frames.get(frame_id)
+
+    def pin(self, frame_id: int):
+        """Keep a frame (e.g. a ScanResult image) until unpin_all()."""
+        with self._lock:
+            jpeg = self._frames.get(frame_id)
+            if jpeg is not None:
+                self._pinned[frame_id] = jpeg
+
+    def unpin_all(self):
+        with self._lock:
+            self._pinned.clear()
+
+    def variant(self, frame_id: int, options: FrameOptions = FrameOptions()) -> Optional[bytes]:
+        """JPEG for the subscriber's options (original bytes if no resize/re-encode)."""
+        return self._cached(frame_id, options, as_base64=False)
+
+    def base64(self, frame_id: int, options: FrameOptions = FrameOptions()) -> Optional[str]:
+        """Base64 of variant(), encoded once and shared by all legacy subscribers."""
+        return self._cached(frame_id, options, as_base64=True)
+
+    def needs_work(self, frame_id: int, options: FrameOptions, as_base64: bool) -> bool:
+        """True if the variant is not cached yet and has to be re-encoded (run it off the loop)."""
+        if options.is_original and not as_base64:
+            return False
+        with self._lock:
+            return (frame_id, options.max_width, options.quality, as_base64) not in self._variants
+
+    def _cached(self, frame_id: int, options: FrameOptions, as_base64: bool):
+        jpeg = self.get(frame_id)
+        if jpeg is None:
+            return None
+        if options.is_original and not as_base64:
+            return jpeg
+
+        key = (frame_id, options.max_width, options.quality, as_base64)
+        with self._lock:
+            cached = self._variants.get(key)
+            if cached is not None:
+                self._variants.move_to_end(key)
+                self._variant_hits += 1
+                return cached
+            self._variant_misses += 1
+
+        data = jpeg if options.is_original else self._encode(jpeg, options)
+        value = base64.b64encode(data).decode("ascii") if as_base64 else data
+        with self._lock:
+            self._variants[key] = value
+            while len(self._variants) > self.variant_capacity:
+                self._variants.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _encode(jpeg: bytes, options: FrameOptions) -> bytes:
+        """Downscale to max_width (JPEG DCT-reduced decode when possible) and re-encode."""
+        try:
+            image = decode_image(jpeg, long_side=options.max_width)
+        except ValueError:
+            return jpeg
+        img = image.bgr
+        if options.max_width and img.shape[1] > options.max_width:
+            height = max(1, int(round(img.shape[0] * options.max_width / img.shape[1])))
+            img = cv2.resize(img, (options.max_width, height), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, options.quality or 85])
+        return buf.tobytes() if ok else jpeg
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "frames": len(self._frames),
+                "pinned": len(self._pinned),
+                "variants": len(self._variants),
+                "variant_hits": self._variant_hits,
+                "variant_misses": self._variant_misses,
+                "frames_stored": self._next_id - 1,
+                "mb_stored": round(self._bytes_in / (1024 * 1024), 1),
+            }
+
+
+class FrameSender:
+    """
+    Delivers scan events to one WebSocket subscriber, resolving frame ids
+    to a binary message or inline base64 according to its FrameOptions.
+
+    Args:
+        websocket: Starlette/FastAPI WebSocket
+        store: The scanner's FrameStore
+        options: Subscriber preferences
+        run_blocking: async callable(fn, *args) used for variant encoding
+            (e.g. the scanner CPU pool's run)
+    """
+
+    def __init__(
+        self,
+        websocket,
+        store: FrameStore,
+        options: FrameOptions,
+        run_blocking: Callable[..., Awaitable[Any]],
+    ):
+        self.websocket = websocket
+        self.store = store
+        self.options = options
+        self._run = run_blocking
+        self._sent_ids: deque = deque(maxlen=FRAME_CACHE_SIZE)
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+    async def _resolve(self, frame_id: int, as_base64: bool):
+        fn = self.store.base64 if as_base64 else self.store.variant
+        if self.store.needs_work(frame_id, self.options, as_base64):
+            return await self._run(fn, frame_id, self.options)
+        return fn(frame_id, self.options)
+
+    async def send(self, event) -> int:
+        """
+        Send a ScanEvent (plus its frame: binary for frame events, base64
+        for the legacy keys).
+
+        The JSON text comes from event.to_json(), so it is serialized once
+        per payload variant however many subscribers receive it.
+
+        Returns:
+            Bytes written to the socket
+        """
+        data = event.data or {}
+        frame_id = data.get("frame_id")
+        sent = 0
+        text = None
+
+        if frame_id is not None:
+            if self.options.binary:
+                if event.event_type == "frame" and frame_id not in self._sent_ids:
+                    jpeg = await self._resolve(frame_id, as_base64=False)
+                    if jpeg is not None:
+                        message = pack_frame(frame_id, jpeg)
+                        await self.websocket.send_bytes(message)
+                        self._sent_ids.append(frame_id)
+                        self.frames_sent += 1
+                        sent += len(message)
+            else:
+                key = LEGACY_IMAGE_KEYS.get(event.event_type)
+                if key is not None:
+                    b64 = await self._resolve(frame_id, as_base64=True)
+                    if b64 is not None:
+                        variant = ("base64", self.options.max_width, self.options.quality)
+                        text = event.to_json(variant, {key: b64})
+                        self.frames_sent += 1
+
+        if text is None:
+            text = event.to_json()
+        await self.websocket.send_text(text)
+        sent += len(text)
+        self.bytes_sent += sent
+        return sent
@@ -0,0 +1,273 @@
+"""
+AgriSense Image Preprocessing - Shared Decode and Fused Model Inputs
+
+vision_engine and yolo_detector each decoded the same JPEG and then built
+their inputs through chains of full-size temporaries (BGR->RGB copy,
+astype, preprocess_input, expand_dims / [:, :, ::-1], /255, transpose).
+A scanner detection decoded every frame twice.
+
+This module decodes once and writes each model's input straight into a
+preallocated per-thread buffer:
+
+- decode_image: JPEG frames are decoded at 1/2, 1/4 or 1/8 scale
+  (libjpeg DCT scaling) when the result is still at least as large as
+  every consumer needs, e.g. a 1600x1200 frame for 224px + 640px inputs
+  decodes at 800x600
+- classifier_input: (1, 224, 224, 3) float32 NHWC with the Keras
+  preprocess_input math fused in (MobileNetV2 [-1, 1], ResNet50 caffe
+  BGR mean subtraction, which needs no RGB conversion at all)
+- detector_input / detector_batch: (B, 3, 640, 640) float32 NCHW
+  letterboxed RGB / 255
+- crop_box: zero-copy padded crop of a detection box for crop-to-classify
+
+Buffers are reused by the next call on the same thread; callers that keep
+an input past that point pass out= or copy it.
+
+Configuration (environment):
+- VISION_REDUCED_DECODE: "false" always decodes at full size (default true)
+"""
+
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+
+REDUCED_DECODE = os.getenv("VISION_REDUCED_DECODE", "true").lower() in {"1", "true", "yes", "on"}
+
+CLASSIFIER_SIZE = 224
+DETECTOR_SIZE = 640
+
+# Keras 'caffe' mode (ResNet50): BGR channel means, no scaling
+_CAFFE_BGR_MEAN = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+_LETTERBOX_FILL = 114
+
+_REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# SOF markers carrying frame dimensions (excludes DHT C4, JPG C8, DAC CC)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+_local = threading.local()
+
+
+@dataclass
+class DecodedImage:
+    """A decoded BGR image plus the size of the original encoded frame."""
+    bgr: np.ndarray
+    orig_w: int
+    orig_h: int
+
+    @property
+    def scale_x(self) -> float:
+        """Original pixels per decoded pixel (horizontal)."""
+        return self.orig_w / self.bgr.shape[1]
+
+    @property
+    def scale_y(self) -> float:
+        return self.orig_h / self.bgr.shape[0]
+
+
+def _buffer(name: str, shape: Tuple[int, ...], dtype=np.float32) -> np.ndarray:
+    """Per-thread scratch array, reallocated only when the shape changes."""
+    buffers = getattr(_local, "buffers", None)
+    if buffers is None:
+        buffers = _local.buffers = {}
+    buf = buffers.get(name)
+    if buf is None or buf.shape != shape or buf.dtype != dtype:
+        buf = buffers[name] = np.empty(shape, dtype=dtype)
+    return buf
+
+
+# =============================================================================
+# Decoding
+# =============================================================================
+
+def jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG's SOF header, or None if not a parsable JPEG."""
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i, n = 2, len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        if marker in (0xD9, 0xDA):  # EOI / start of scan: no SOF before entropy data
+            return None
+        length = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if marker in _SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return (width, height) if width and height else None
+        i += 2 + length
+    return None
+
+
+def reduction_factor(width: int, height: int, min_side: int = 0, long_side: int = 0) -> int:
+    """
+    Largest JPEG scale-down (1, 2, 4 or 8) that keeps the short side at
+    least min_side (stretch resize, classifier) and the long side at least
+    long_side (letterbox resize, detector).
+    """
+    for factor in (8, 4, 2):
+        if min(width, height) / factor >= min_side and max(width, height) / factor >= long_side:
+            return factor
+    return 1
+
+
+def decode_image(image_bytes: bytes, min_side: int = 0, long_side: int = 0) -> DecodedImage:
+    """
+    Decode image bytes once for every consumer.
+
+    Args:
+        image_bytes: Raw image bytes (JPEG/PNG/WebP/BMP)
+        min_side: Smallest short side any consumer resizes down from
+            (CLASSIFIER_SIZE for the disease classifier)
+        long_side: Smallest long side any consumer letterboxes down from
+            (DETECTOR_SIZE for YOLO)
+
+    Raises:
+        ValueError: If the image cannot be decoded
+    """
+    buf = np.frombuffer(image_bytes, np.uint8)
+    size = jpeg_size(image_bytes) if REDUCED_DECODE and (min_side or long_side) else None
+    factor = reduction_factor(*size, min_side=min_side, long_side=long_side) if size else 1
+
+    img = cv2.imdecode(buf, _REDUCED_FLAGS[factor] if factor > 1 else cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Failed to decode image. Please provide a valid JPEG, PNG, or WebP file.")
+    orig_w, orig_h = size if size else (img.shape[1], img.shape[0])
+    return DecodedImage(bgr=img, orig_w=orig_w, orig_h=orig_h)
+
+
+# =============================================================================
+# Model inputs
+# =============================================================================
+
+def classifier_input(image: DecodedImage, model_type: str = "mobilenet", out: np.ndarray = None) -> np.ndarray:
+    """
+    Classifier input, identical to resize -> RGB -> float32 -> preprocess_input.
+
+    Args:
+        image: Decoded image
+        model_type: 'mobilenet' (scale to [-1, 1]) or 'resnet' (caffe mode)
+        out: Optional (1, 224, 224, 3) float32 destination; defaults to a
+            per-thread buffer
+
+    Returns:
+        (1, 224, 224, 3) float32 NHWC array
+    """
+    shape = (1, CLASSIFIER_SIZE, CLASSIFIER_SIZE, 3)
+    if out is None:
+        out = _buffer(f"nhwc_{model_type}", shape)
+    resized = cv2.resize(image.bgr, (CLASSIFIER_SIZE, CLASSIFIER_SIZE), interpolation=cv2.INTER_AREA)
+
+    if model_type == "resnet":
+        # preprocess_input would flip RGB back to BGR; the decoded frame already is BGR
+        np.subtract(resized, _CAFFE_BGR_MEAN, out=out[0])
+    else:
+        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=_buffer("rgb224", resized.shape, np.uint8))
+        np.divide(rgb, 127.5, out=out[0], dtype=np.float32)
+        np.subtract(out, 1.0, out=out)
+    return out
+
+
+def detector_input(
+    image: DecodedImage,
+    size: Tuple[int, int] = (DETECTOR_SIZE, DETECTOR_SIZE),
+    out: np.ndarray = None,
+) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Letterboxed YOLO input in a per-thread buffer.
+
+    Args:
+        image: Decoded image
+        size: (height, width) of the model input
+        out: Optional (1, 3, H, W) float32 destination, e.g. one slot of a
+            batch tensor from detector_batch
+
+    Returns:
+        (blob, ratio, (pad_w, pad_h)) where blob is (1, 3, H, W) float32 RGB
+        in [0, 1] and ratio/pad map decoded-image pixels into the blob
+    """
+    target_h, target_w = size
+    h, w = image.bgr.shape[:2]
+    ratio = min(target_h / h, target_w / w)
+    new_h, new_w = int(round(h * ratio)), int(round(w * ratio))
+    pad_w = (target_w - new_w) // 2
+    pad_h = (target_h - new_h) // 2
+
+    canvas = _buffer("letterbox", (target_h, target_w, 3), np.uint8)
+    canvas.fill(_LETTERBOX_FILL)
+    if (h, w) != (new_h, new_w):
+        canvas[pad_h:pad_h + new_h, pad_w:pad_w + new_w] = cv2.resize(
+            image.bgr, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+        )
+    else:
+        canvas[pad_h:pad_h + new_h, pad_w:pad_w + new_w] = image.bgr
+
+    blob = out if out is not None else _buffer("nchw", (1, 3, target_h, target_w))
+    for c in range(3):
+        # BGR canvas -> RGB planes, scaled to [0, 1]
+        np.divide(canvas[:, :, 2 - c], 255.0, out=blob[0, c], dtype=np.float32)
+    return blob, ratio, (pad_w, pad_h)
+
+
+def detector_batch(
+    images: List[DecodedImage], size: Tuple[int, int] = (DETECTOR_SIZE, DETECTOR_SIZE)
+) -> Tuple[np.ndarray, List[Tuple[float, Tuple[int, int]]]]:
+    """
+    Letterbox several images into one (B, 3, H, W) tensor (per-thread buffer).
+
+    Returns:
+        (blob, [(ratio, (pad_w, pad_h)), ...]) in input order
+    """
+    blob = _buffer("nchw_batch", (len(images), 3) + tuple(size))
+    letterbox = []
+    for i, image in enumerate(images):
+        _, ratio, pad = detector_input(image, size, out=blob[i:i + 1])
+        letterbox.append((ratio, pad))
+    return blob, letterbox
+
+
+def crop_box(
+    image: DecodedImage, box: Tuple[float, float, float, float], padding: float = 0.0
+) -> DecodedImage:
+    """
+    Crop a box given in original-image pixels (e.g. a YOLO Detection).
+
+    Args:
+        image: Decoded frame (possibly reduced-size)
+        box: (x1, y1, x2, y2) in original pixels
+        padding: Extra margin on each side as a fraction of the box size
+
+    Returns:
+        A DecodedImage viewing the crop (no pixel copy); its orig_w/orig_h
+        are the crop's size in original pixels
+    """
+    x1, y1, x2, y2 = box
+    pad_x, pad_y = (x2 - x1) * padding, (y2 - y1) * padding
+    h, w = image.bgr.shape[:2]
+    sx, sy = image.scale_x, image.scale_y
+    left = min(max(int((x1 - pad_x) / sx), 0), w - 1)
+    top = min(max(int((y1 - pad_y) / sy), 0), h - 1)
+    right = max(min(int(np.ceil((x2 + pad_x) / sx)), w), left + 1)
+    bottom = max(min(int(np.ceil((y2 + pad_y) / sy)), h), top + 1)
+    return DecodedImage(
+        bgr=image.bgr[top:bottom, left:right],
+        orig_w=max(1, int(round((right - left) * sx))),
+        orig_h=max(1, int(round((bottom - top) * sy))),
+    )
@@ -0,0 +1,244 @@
+"""
+AgriSense Inference Backends - Fast Forward Paths for the Disease Classifiers
+
+`model.predict(x, verbose=0)` builds a tf.data pipeline and callback
+machinery on every call, which costs several milliseconds per image on
+CPU. The backends here run the same network with less Python/TF overhead:
+
+- keras:          model.predict (original behaviour, reference path)
+- tf_function:    model called through a tf.function traced once with a
+                  fixed (None, 224, 224, 3) float32 input signature
+- tflite_fp32 / tflite_float16 / tflite_int8:
+                  TFLite interpreter over the artifacts written by
+                  convert_to_tflite.py (no Keras model needed in memory)
+
+All backends take a preprocessed (N, 224, 224, 3) float32 batch and return
+(N, num_classes) probabilities. The int8 artifacts keep float32 input and
+output, so the same preprocessing applies to every variant.
+
+Configuration (environment):
+- VISION_INFERENCE_MODE: default backend for all models (default tf_function;
+  "tflite" means tflite_<VISION_TFLITE_VARIANT>)
+- VISION_BACKEND_MOBILENET / VISION_BACKEND_RESNET: per-model override,
+  e.g. VISION_BACKEND_RESNET=tflite_int8
+- VISION_TFLITE_DIR: directory with {mobilenetv2,resnet50}_{variant}.tflite
+  (default ../agrisense_flutter/assets/models)
+- VISION_TFLITE_VARIANT: fp32 | float16 | int8 (default fp32)
+- VISION_TFLITE_THREADS: intra-op threads per interpreter (default: TFLite's)
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict
+
+import numpy as np
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+import tensorflow as tf
+
+logger = logging.getLogger("InferenceBackends")
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+INFERENCE_MODE = os.getenv("VISION_INFERENCE_MODE", "tf_function").lower().strip()
+TFLITE_DIR = os.getenv(
+    "VISION_TFLITE_DIR",
+    os.path.join(BACKEND_DIR, "..", "agrisense_flutter", "assets", "models"),
+)
+TFLITE_VARIANT = os.getenv("VISION_TFLITE_VARIANT", "fp32").lower().strip()
+TFLITE_THREADS = int(os.getenv("VISION_TFLITE_THREADS", "0")) or None
+
+TFLITE_VARIANTS = ("fp32", "float16", "int8")
+INFERENCE_MODES = ("keras", "tf_function") + tuple(f"tflite_{v}" for v in TFLITE_VARIANTS)
+
+_MODE_ALIASES = {
+    "tflite": f"tflite_{TFLITE_VARIANT}",
+    "tflite_fp16": "tflite_float16",
+    "tflite_float32": "tflite_fp32",
+}
+
+# vision_engine model type -> convert_to_tflite.py model name
+TFLITE_MODEL_NAMES = {
+    "mobilenet": "mobilenetv2",
+    "resnet": "resnet50",
+}
+
+INPUT_SHAPE = (224, 224, 3)
+
+
+def tflite_path(model_type: str, variant: str = TFLITE_VARIANT) -> str:
+    """Path of the TFLite artifact for a vision_engine model type."""
+    name = TFLITE_MODEL_NAMES.get(model_type, model_type)
+    return os.path.join(TFLITE_DIR, f"{name}_{variant}.tflite")
+
+
+def normalize_mode(mode: str) -> str:
+    mode = (mode or "").lower().strip()
+    return _MODE_ALIASES.get(mode, mode)
+
+
+def backend_mode(model_type: str) -> str:
+    """Configured backend for a model (per-model override, else the global mode)."""
+    return normalize_mode(
+        os.getenv(f"VISION_BACKEND_{model_type.upper()}", "") or INFERENCE_MODE
+    )
+
+
+def needs_keras_model(mode: str) -> bool:
+    """TFLite backends run from the .tflite file alone."""
+    return not normalize_mode(mode).startswith("tflite_")
+
+
+# =============================================================================
+# Backends
+# =============================================================================
+
+class KerasBackend:
+    """Reference path: model.predict()."""
+
+    mode = "keras"
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        return self.model.predict(batch, verbose=0)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"mode": self.mode}
+
+
+class TFFunctionBackend:
+    """Model call through a tf.function traced once for a fixed input signature."""
+
+    mode = "tf_function"
+
+    def __init__(self, model):
+        self.model = model
+
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None,) + INPUT_SHAPE, dtype=tf.float32)])
+        def serve(x):
+            return model(x, training=False)
+
+        self._serve = serve
+        # Trace now so the first request does not pay for graph construction
+        self._serve(tf.zeros((1,) + INPUT_SHAPE, dtype=tf.float32))
+
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        return self._serve(tf.convert_to_tensor(batch, dtype=tf.float32)).numpy()
+
+    def describe(self) -> Dict[str, Any]:
+        return {"mode": self.mode}
+
+
+class TFLiteBackend:
+    """
+    TFLite interpreter over a convert_to_tflite.py artifact.
+
+    Interpreters are not thread-safe, so each calling thread gets its own
+    (built lazily from flatbuffer bytes read once). The batching worker and
+    the executor threads of the direct path never contend on a lock. Each
+    interpreter's input is resized only when the batch size changes.
+    """
+
+    def __init__(self, path: str, variant: str, num_threads: int = TFLITE_THREADS):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"TFLite model not found: {path}")
+        self.path = path
+        self.variant = variant
+        self.mode = f"tflite_{variant}"
+        self.num_threads = num_threads
+        with open(path, "rb") as f:
+            self._model_content = f.read()
+        self._local = threading.local()
+        self._pool_lock = threading.Lock()
+        self._interpreters = 0
+        # Fail fast on a corrupt file (and warm the first thread's interpreter)
+        self._interpreter()
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._model_content)
+
+    def _interpreter(self):
+        state = getattr(self._local, "state", None)
+        if state is None:
+            interpreter = tf.lite.Interpreter(
+                model_content=self._model_content, num_threads=self.num_threads
+            )
+            interpreter.allocate_tensors()
+            input_details = interpreter.get_input_details()[0]
+            state = {
+                "interpreter": interpreter,
+                "input_index": input_details["index"],
+                "output_index": interpreter.get_output_details()[0]["index"],
+                "batch_size": int(input_details["shape"][0]),
+            }
+            self._local.state = state
+            with self._pool_lock:
+                self._interpreters += 1
+        return state
+
+    def predict_batch(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        state = self._interpreter()
+        interpreter = state["interpreter"]
+        if batch.shape[0] != state["batch_size"]:
+            interpreter.resize_tensor_input(state["input_index"], batch.shape)
+            interpreter.allocate_tensors()
+            state["batch_size"] = batch.shape[0]
+        interpreter.set_tensor(state["input_index"], batch)
+        interpreter.invoke()
+        return interpreter.get_tensor(state["output_index"]).copy()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "size_mb": round(self.size_bytes / (1024 * 1024), 2),
+            "interpreters": self._interpreters,
+        }
+
+
+def create_backend(model_type: str, model=None, mode: str = None):
+    """
+    Build the backend for a model.
+
+    Args:
+        model_type: vision_engine model type ('mobilenet' / 'resnet')
+        model: Loaded Keras model (may be None for TFLite backends)
+        mode: Backend name (default: backend_mode(model_type))
+
+    Falls back to tf_function (then keras) if the requested backend cannot be
+    created, e.g. the TFLite artifact has not been generated yet. Returns None
+    if nothing can serve the model (TFLite failed and no Keras model).
+    """
+    mode = normalize_mode(mode) if mode else backend_mode(model_type)
+    if mode not in INFERENCE_MODES:
+        logger.warning(f"⚠️ Unknown inference backend '{mode}' for {model_type}, using tf_function")
+        mode = "tf_function"
+
+    if mode.startswith("tflite_"):
+        variant = mode[len("tflite_"):]
+        try:
+            backend = TFLiteBackend(tflite_path(model_type, variant), variant)
+            logger.info(f"⚡ {model_type}: TFLite {variant} backend ({backend.path})")
+            return backend
+        except Exception as e:
+            logger.warning(f"⚠️ {model_type}: TFLite {variant} backend unavailable ({e}), using tf_function")
+            mode = "tf_function"
+
+    if model is None:
+        return None
+
+    if mode == "tf_function":
+        try:
+            backend = TFFunctionBackend(model)
+            logger.info(f"⚡ {model_type}: traced tf.function backend")
+            return backend
+        except Exception as e:
+            logger.warning(f"⚠️ {model_type}: tf.function tracing failed ({e}), using model.predict")
+
+    return KerasBackend(model)
@@ -0,0 +1,209 @@
+"""
+AgriSense Inference Batcher - Dynamic Micro-Batching for Vision Models
+
+predict_disease used to run one forward pass per image. Web uploads and
+every robot's scan frames now share a per-model queue instead: callers
+submit a preprocessed (H, W, C) tensor, a worker thread stacks whatever
+has arrived within the batching window into one (N, H, W, C) batch, runs a
+single forward pass and hands each caller its own output row.
+
+Features:
+- Dynamic batches bounded by max_batch_size and max_wait_ms (per model)
+- No idle waiting: callers announce images they are preprocessing
+  (expect()), and a batch is flushed as soon as nothing is queued and no
+  announced image is still on its way, so a lone caller never pays the
+  window
+- Blocking (infer) and Future-based (submit) APIs, usable from threads or
+  via asyncio.wrap_future from the event loop
+- Throughput, batch-fill, queue-wait and forward-pass metrics
+- A failed forward pass fails every request in that batch
+
+Configuration (environment, per-model suffix overrides the global value,
+e.g. VISION_BATCH_MAX_SIZE_RESNET=4):
+- VISION_BATCHING_ENABLED: "false" runs each image directly (default true)
+- VISION_BATCH_MAX_SIZE: maximum images per forward pass (default 8)
+- VISION_BATCH_MAX_WAIT_MS: longest wait for announced images after the first one arrives (default 10)
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("InferenceBatcher")
+
+
+BATCHING_ENABLED = os.getenv("VISION_BATCHING_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+
+# Window for the throughput figure (completed images in the last N seconds)
+_THROUGHPUT_WINDOW_S = 60.0
+
+
+def batch_config(model_name: str) -> Tuple[int, float]:
+    """(max_batch_size, max_wait_ms) for a model, honouring per-model overrides."""
+    suffix = model_name.upper()
+    max_size = os.getenv(f"VISION_BATCH_MAX_SIZE_{suffix}", os.getenv("VISION_BATCH_MAX_SIZE", "8"))
+    max_wait = os.getenv(f"VISION_BATCH_MAX_WAIT_MS_{suffix}", os.getenv("VISION_BATCH_MAX_WAIT_MS", "10"))
+    return int(max_size), float(max_wait)
+
+
+class _Request:
+    __slots__ = ("tensor", "future", "enqueued_at")
+
+    def __init__(self, tensor: np.ndarray):
+        self.tensor = tensor
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchingInferenceQueue:
+    """Per-model dynamic batching queue in front of a batch forward function."""
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[np.ndarray], np.ndarray],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+    ):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._incoming = 0  # announced via expect() but not submitted yet
+        self._local = threading.local()
+
+        self._batches = 0
+        self._images = 0
+        self._errors = 0
+        self._queue_wait_ms_total = 0.0
+        self._forward_ms_total = 0.0
+        self._completions: deque = deque()  # (timestamp, n_images) for throughput
+
+        self._worker = threading.Thread(target=self._run, name=f"vision-batch-{name}", daemon=True)
+        self._worker.start()
+        logger.info(
+            f"🧮 [{name}] Batching queue ready (max_batch={self.max_batch_size}, "
+            f"window={max_wait_ms:.0f}ms)"
+        )
+
+    def submit(self, tensor: np.ndarray) -> Future:
+        """
+        Queue one preprocessed image (H, W, C; a leading batch dim of 1 is accepted).
+
+        The Future resolves to (output_row, batch_info) where batch_info has
+        batch_size, queue_wait_ms and forward_ms.
+        """
+        if tensor.ndim == 4:
+            tensor = tensor[0]
+        request = _Request(tensor)
+        self._queue.put(request)
+        if getattr(self._local, "expected", 0) > 0:
+            self._local.expected -= 1
+            with self._lock:
+                self._incoming -= 1
+        return request.future
+
+    @contextmanager
+    def expect(self, n: int = 1) -> Iterator[None]:
+        """
+        Announce that this thread will submit n images (wrap their
+        preprocessing and submission). The worker holds a batch open for
+        announced images, up to max_wait_ms, and otherwise flushes at once.
+        """
+        with self._lock:
+            self._incoming += n
+        self._local.expected = n
+        try:
+            yield
+        finally:
+            unsubmitted, self._local.expected = self._local.expected, 0
+            if unsubmitted:
+                with self._lock:
+                    self._incoming -= unsubmitted
+
+    def infer(self, tensor: np.ndarray) -> Tuple[np.ndarray, Dict[str, float]]:
+        """Blocking submit()."""
+        return self.submit(tensor).result()
+
+    def _collect(self) -> List[_Request]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            if self._incoming <= 0 and self._queue.empty():
+                break  # nobody else is on the way
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                inputs = np.stack([r.tensor for r in batch])
+                outputs = np.asarray(self.run_batch(inputs))
+            except Exception as e:
+                logger.error(f"❌ [{self.name}] Batched inference failed ({len(batch)} images): {e}")
+                with self._lock:
+                    self._errors += len(batch)
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+            forward_ms = (finished - started) * 1000
+
+            wait_total = 0.0
+            for i, request in enumerate(batch):
+                queue_wait_ms = (started - request.enqueued_at) * 1000
+                wait_total += queue_wait_ms
+                request.future.set_result((outputs[i], {
+                    "batch_size": len(batch),
+                    "queue_wait_ms": round(queue_wait_ms, 2),
+                    "forward_ms": round(forward_ms, 2),
+                }))
+
+            with self._lock:
+                self._batches += 1
+                self._images += len(batch)
+                self._queue_wait_ms_total += wait_total
+                self._forward_ms_total += forward_ms
+                now = time.time()
+                self._completions.append((now, len(batch)))
+                while self._completions and now - self._completions[0][0] > _THROUGHPUT_WINDOW_S:
+                    self._completions.popleft()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Throughput and batch-fill metrics."""
+        with self._lock:
+            now = time.time()
+            recent = sum(n for t, n in self._completions if now - t <= _THROUGHPUT_WINDOW_S)
+            avg_batch = self._images / self._batches if self._batches else 0.0
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_s * 1000,
+                "batches": self._batches,
+                "images": self._images,
+                "errors": self._errors,
+                "avg_batch_size": round(avg_batch, 2),
+                "batch_fill": round(avg_batch / self.max_batch_size, 3) if self._batches else 0.0,
+                "avg_queue_wait_ms": round(self._queue_wait_ms_total / self._images, 2) if self._images else 0.0,
+                "avg_forward_ms": round(self._forward_ms_total / self._batches, 2) if self._batches else 0.0,
+                "throughput_ips": round(recent / _THROUGHPUT_WINDOW_S, 3),
+                "queue_depth": self._queue.qsize(),
+                "incoming": self._incoming,
+            }
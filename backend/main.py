@@ -7,6 +7,7 @@ Features:
 - Weather-aware treatment recommendations
 - Comprehensive error handling and logging
 - Response time tracking
+- Streaming advice over Server-Sent Events (/predict/stream)
 - Structured API responses with Pydantic models
 
 Note: Disease detection is handled on-device (Flutter TFLite).
@@ -21,6 +22,7 @@ os.environ['TRANSFORMERS_NO_TF'] = '1'
 os.environ['USE_TF'] = '0'
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 
+import json
 import time
 import logging
 import asyncio
@@ -34,13 +36,14 @@ import ipaddress
 from fastapi import FastAPI, HTTPException, Query, Request, Body, WebSocket, WebSocketDisconnect, UploadFile, File
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from contextlib import asynccontextmanager
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
-from rag_agent import get_agri_advice
+from rag_agent import get_agri_advice_async, stream_agri_advice, get_advice_cache_stats
 from weather_service import get_weather_forecast, get_api_usage_stats, geolocate_ip
+from disease_classes import DISEASE_CLASSES, HEALTHY_CLASS
 
 # Deployment mode: 'rag_only' strips ML models (TF, YOLO, ESP32)
 # Set via environment variable DEPLOY_MODE=rag_only
@@ -51,12 +54,18 @@ if not _is_rag_only:
     from esp32_client import ESP32Client
     from yolo_detector import YOLODetector
     from robotics_scanner import RoboticsScanner, ScanState
+    from frame_channel import FrameOptions, FrameSender
+    from scan_executors import cpu_executor, net_executor
+    from device_registry import DeviceRegistry, RoboticsDevice, DEFAULT_DEVICE_ID, startup_device_count
 else:
     # Stubs so the rest of the file doesn't crash on references
     ESP32Client = None  # type: ignore
     YOLODetector = None  # type: ignore
     RoboticsScanner = None  # type: ignore
     ScanState = None  # type: ignore
+    DeviceRegistry = None  # type: ignore
+    RoboticsDevice = None  # type: ignore
+    DEFAULT_DEVICE_ID = "default"
 
 # Thread pool for running blocking operations
 _executor = ThreadPoolExecutor(max_workers=4)
@@ -92,21 +101,6 @@ class WeatherCondition(str, Enum):
     COLD = "Cold"
 
 
-# All 10 tomato disease classes (same as Flutter on-device model)
-DISEASE_CLASSES = [
-    "Bacterial Spot",
-    "Early Blight",
-    "Late Blight",
-    "Leaf Mold",
-    "Septoria Leaf Spot",
-    "Spider Mites",
-    "Target Spot",
-    "Yellow Leaf Curl Virus",
-    "Mosaic Virus",
-    "Healthy"
-]
-
-
 class SourceDocument(BaseModel):
     """Source document citation"""
     doc_id: str = Field(default="unknown", description="Unique document chunk identifier for citation tracking")
@@ -119,6 +113,9 @@ class LatencyBreakdown(BaseModel):
     """Component-level latency for evaluation"""
     retrieval_ms: float = Field(default=0.0, description="ChromaDB retrieval time")
     rerank_ms: float = Field(default=0.0, description="Cross-encoder reranking time")
+    rerank_batch_size: Optional[int] = Field(default=None, description="Pairs in the cross-encoder micro-batch this request joined")
+    rerank_batch_requests: Optional[int] = Field(default=None, description="Requests sharing that micro-batch")
+    rerank_queue_wait_ms: Optional[float] = Field(default=None, description="Time spent waiting for the micro-batch to run")
     generation_ms: float = Field(default=0.0, description="LLM generation time")
     total_ms: float = Field(default=0.0, description="Total RAG pipeline time")
 
@@ -219,47 +216,71 @@ async def lifespan(app: FastAPI):
         else:
             logger.warning("⚠️ YOLO model not loaded - robotics scanning will be limited")
 
-        # Initialize disease classification models (TensorFlow/Keras)
-        logger.info("🔍 Loading disease classification models...")
+        # Initialize disease classification models (TensorFlow/Keras).
+        # Models load on first use; VISION_PRELOAD_MODELS are warmed in the
+        # background so startup does not block (see GET /vision/ready).
+        logger.info("🔍 Initializing disease classification model registry...")
         try:
             import vision_engine
-            model_status = vision_engine.load_models()
             app.state.vision_engine = vision_engine
-            logger.info(f"✅ Disease models loaded: {model_status}")
+            preload = vision_engine.preload_models()
+            if preload:
+                asyncio.get_running_loop().run_in_executor(_executor, vision_engine.load_models, preload)
+            logger.info(f"✅ Disease model registry ready (preloading: {preload or 'none'})")
         except Exception as e:
-            logger.warning(f"⚠️ Could not load disease models: {e}")
+            logger.warning(f"⚠️ Could not initialize disease models: {e}")
             app.state.vision_engine = None
 
-        # Initialize ESP32 client and robotics scanner
-        esp32_client = ESP32Client()
-        app.state.esp32_client = esp32_client
-
+        # Initialize the camera fleet: one ESP32 client + scanner per device id,
+        # all sharing YOLO, the classifier batch queues and one pair of executors
         classify_fn = None
+        classify_batch_fn = None
         if app.state.vision_engine:
             classify_fn = app.state.vision_engine.predict_disease
+            classify_batch_fn = app.state.vision_engine.predict_batch
+
+        # One inference thread per startup camera (+1) so each rig's frame can join the YOLO batch
+        cpu_pool, net_pool = cpu_executor(min_workers=startup_device_count() + 1), net_executor()
+
+        def create_scanner(device_id: str, client: ESP32Client) -> RoboticsScanner:
+            return RoboticsScanner(
+                esp32_client=client,
+                yolo_detector=yolo,
+                classify_fn=classify_fn,
+                advice_fn=get_agri_advice_async,
+                weather_fn=get_weather_forecast,
+                classify_batch_fn=classify_batch_fn,
+                cpu_pool=cpu_pool,
+                net_pool=net_pool,
+            )
 
-        app.state.scanner = RoboticsScanner(
-            esp32_client=esp32_client,
-            yolo_detector=yolo,
-            classify_fn=classify_fn,
-            advice_fn=get_agri_advice,
-            weather_fn=get_weather_forecast,
-        )
-        logger.info("✅ Robotics scanner initialized")
+        devices = DeviceRegistry(lambda device_id: ESP32Client(), create_scanner)
+        app.state.devices = devices
+        # Single-camera aliases for the default device
+        app.state.esp32_client = devices.default.client
+        app.state.scanner = devices.default.scanner
+        app.state.cpu_pool, app.state.net_pool = cpu_pool, net_pool
+        # ESP32_DEVICES are connected in the background so startup does not wait on the network
+        app.state.device_connect_task = asyncio.create_task(devices.connect_from_specs())
+        logger.info(f"✅ Robotics scanner initialized (max {devices.max_devices} devices)")
     else:
         # Stubs for rag_only mode
         app.state.yolo = None
         app.state.vision_engine = None
         app.state.esp32_client = None
         app.state.scanner = None
+        app.state.devices = None
         logger.info("⏭️  Skipped ML model loading (DEPLOY_MODE=rag_only)")
 
     logger.info(f"🚀 AgriSense API ready to serve requests (mode={DEPLOY_MODE})")
     yield
 
     # Cleanup
-    if not _is_rag_only and app.state.esp32_client and app.state.esp32_client.is_connected:
-        await app.state.esp32_client.disconnect()
+    if not _is_rag_only and app.state.devices:
+        app.state.device_connect_task.cancel()
+        await app.state.devices.close()
+        app.state.cpu_pool.shutdown()
+        app.state.net_pool.shutdown()
     logger.info("🛑 AgriSense API shutting down...")
 
 
@@ -416,7 +437,11 @@ async def root():
             "GET /health": "Detailed health check with uptime and RAG status",
             "GET /classes": "List all detectable disease classes",
             "GET /weather/usage": "Open-Meteo API usage statistics",
-            "POST /predict": "Get RAG-powered treatment advice for a detected disease"
+            "GET /advice/cache": "Advice cache hit/miss/eviction statistics",
+            "GET /vision/stats": "Disease classifier batching throughput and batch-fill metrics",
+            "GET /vision/ready": "Per-model load state and resident memory (503 until ready)",
+            "POST /predict": "Get RAG-powered treatment advice for a detected disease",
+            "POST /predict/stream": "Same as /predict, streamed as Server-Sent Events"
         },
         supported_models=["mobile", "resnet"],
         supported_weather=[w.value for w in WeatherCondition]
@@ -626,10 +651,49 @@ async def get_classes():
     return {
         "classes": DISEASE_CLASSES,
         "total": len(DISEASE_CLASSES),
-        "healthy_class": "Healthy"
+        "healthy_class": HEALTHY_CLASS
     }
 
 
+@app.get("/vision/stats", tags=["Health"])
+async def vision_stats():
+    """
+    Disease classifier status and batching metrics.
+    
+    Per model: load state plus batch queue throughput (images/s over the
+    last minute), average batch size, batch fill ratio, queue wait and
+    forward-pass time.
+    """
+    vision = getattr(app.state, "vision_engine", None)
+    if vision is None:
+        raise HTTPException(status_code=503, detail="Disease classification models are not loaded.")
+    return {"status": "ok", "models": vision.get_model_status()}
+
+
+@app.get("/vision/ready", tags=["Health"])
+async def vision_ready(
+    model_type: Optional[str] = Query(default=None, description="Check one model: 'mobilenet' or 'resnet'"),
+):
+    """
+    Disease classifier readiness probe.
+    
+    Reports each model's registry state (unloaded / loading / ready /
+    failed / evicting / evicted), resident memory, load time and eviction
+    counts.
+    Returns 503 until the requested model (or, without one, every
+    VISION_PRELOAD_MODELS model) is resident.
+    """
+    vision = getattr(app.state, "vision_engine", None)
+    if vision is None:
+        raise HTTPException(status_code=503, detail="Disease classification models are not available.")
+    if model_type is not None:
+        model_type = "mobilenet" if model_type.lower().strip() == "mobile" else model_type.lower().strip()
+        if model_type not in vision.MODEL_PATHS:
+            raise HTTPException(status_code=400, detail=f"Invalid model type: '{model_type}'. Use 'mobilenet' or 'resnet'.")
+    readiness = vision.get_readiness(model_type)
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+
 @app.get("/weather/usage", tags=["Health"])
 async def weather_api_usage():
     """
@@ -657,6 +721,23 @@ async def weather_api_usage():
     }
 
 
+@app.get("/advice/cache", tags=["Health"])
+async def advice_cache_stats():
+    """
+    Get treatment-advice cache statistics.
+    
+    Returns:
+    - Current size and capacity of the LRU cache
+    - Entry TTL in seconds
+    - Hits, misses, hit rate, evictions and TTL expirations
+    - Single-flight counters (executions vs. coalesced concurrent requests)
+    """
+    return {
+        "status": "ok",
+        "cache": get_advice_cache_stats(),
+    }
+
+
 class PredictRequest(BaseModel):
     """Request body for /predict endpoint"""
     disease: str = Field(..., description="Disease name detected on-device (e.g., 'Early Blight')")
@@ -668,6 +749,76 @@ class PredictRequest(BaseModel):
     longitude: Optional[float] = Field(default=None, description="Longitude for weather lookup (defaults to Davao City)", ge=-180, le=180)
 
 
+def _client_location(http_request: Request) -> tuple:
+    """Geolocate the client IP: (lat, lon, label) or (None, None, default label)."""
+    client_ip = http_request.headers.get("x-forwarded-for")
+    if client_ip:
+        client_ip = client_ip.split(",")[0].strip()
+    else:
+        client_ip = http_request.client.host if http_request.client else None
+
+    if client_ip:
+        try:
+            ip_obj = ipaddress.ip_address(client_ip)
+            if ip_obj.is_global:
+                geo = geolocate_ip(client_ip)
+                if geo:
+                    lat, lon, label = geo
+                    logger.info(f"📍 Auto-located user via IP {client_ip}: {label} ({lat},{lon})")
+                    return lat, lon, label
+        except ValueError:
+            pass  # Ignore invalid IPs
+    return None, None, "Davao City (default)"
+
+
+async def _resolve_weather_context(request: "PredictRequest", http_request: Request) -> tuple:
+    """
+    Resolve location and weather for an advice request.
+
+    Prefers request lat/lon, else geolocates the client IP, else the default
+    location. Weather/forecast not supplied by the client are auto-fetched.
+    The lookups use blocking HTTP, so they run in the thread pool.
+
+    Returns:
+        (current_weather, weather_forecast, latitude, longitude)
+    """
+    loop = asyncio.get_running_loop()
+    current_weather = request.weather
+    weather_forecast = request.forecast
+
+    resolved_lat = request.latitude
+    resolved_lon = request.longitude
+    resolved_label = "Davao City (default)"
+
+    if resolved_lat is None or resolved_lon is None:
+        resolved_lat, resolved_lon, resolved_label = await loop.run_in_executor(
+            _executor, _client_location, http_request
+        )
+
+    if not current_weather or not weather_forecast:
+        location_str = resolved_label if (resolved_lat is not None and resolved_lon is not None) else "Davao City (default)"
+        logger.info(f"🌤️ Auto-fetching weather for {location_str}...")
+        
+        api_weather, api_forecast = await loop.run_in_executor(
+            _executor,
+            lambda: get_weather_forecast(
+                lat=resolved_lat,
+                lon=resolved_lon,
+                location_name=location_str
+            )
+        )
+        
+        if not current_weather and api_weather:
+            current_weather = api_weather
+            logger.info(f"   ✅ Current weather: {current_weather}")
+        
+        if not weather_forecast and api_forecast:
+            weather_forecast = api_forecast
+            logger.info(f"   ✅ Forecast retrieved")
+
+    return current_weather, weather_forecast, resolved_lat, resolved_lon
+
+
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
 async def predict(request: PredictRequest, http_request: Request):
     """
@@ -722,61 +873,19 @@ async def predict(request: PredictRequest, http_request: Request):
         
         logger.info(f"📱 On-device detection: {disease_name} ({confidence:.2%}) via {request.model_used}")
         
-        # Fetch weather data if not provided
-        current_weather = request.weather
-        weather_forecast = request.forecast
-
-        # Resolve location: prefer request lat/lon, else geolocate client IP, else default
-        resolved_lat = request.latitude
-        resolved_lon = request.longitude
-        resolved_label = "Davao City (default)"
-
-        if resolved_lat is None or resolved_lon is None:
-            client_ip = http_request.headers.get("x-forwarded-for")
-            if client_ip:
-                client_ip = client_ip.split(",")[0].strip()
-            else:
-                client_ip = http_request.client.host if http_request.client else None
-
-            if client_ip:
-                try:
-                    ip_obj = ipaddress.ip_address(client_ip)
-                    if ip_obj.is_global:
-                        geo = geolocate_ip(client_ip)
-                        if geo:
-                            resolved_lat, resolved_lon, resolved_label = geo
-                            logger.info(f"📍 Auto-located user via IP {client_ip}: {resolved_label} ({resolved_lat},{resolved_lon})")
-                except ValueError:
-                    pass  # Ignore invalid IPs
-
-        if not current_weather or not weather_forecast:
-            location_str = resolved_label if (resolved_lat is not None and resolved_lon is not None) else "Davao City (default)"
-            logger.info(f"🌤️ Auto-fetching weather for {location_str}...")
-            
-            api_weather, api_forecast = get_weather_forecast(
-                lat=resolved_lat,
-                lon=resolved_lon,
-                location_name=location_str
-            )
-            
-            if not current_weather and api_weather:
-                current_weather = api_weather
-                logger.info(f"   ✅ Current weather: {current_weather}")
-            
-            if not weather_forecast and api_forecast:
-                weather_forecast = api_forecast
-                logger.info(f"   ✅ Forecast retrieved")
+        # Resolve location and fetch weather data if not provided
+        current_weather, weather_forecast, resolved_lat, resolved_lon = await _resolve_weather_context(
+            request, http_request
+        )
         
-        # Get AI-generated treatment advice with weather forecast (in thread pool)
+        # Get AI-generated treatment advice with weather forecast (native async)
         logger.info(f"🤖 Generating RAG treatment advice for {disease_name}...")
-        loop = asyncio.get_event_loop()
-        advice_dict = await loop.run_in_executor(
-            _executor,
-            lambda: get_agri_advice(
-                disease_name, 
-                weather_condition=current_weather,
-                weather_forecast=weather_forecast
-            )
+        advice_dict = await get_agri_advice_async(
+            disease_name, 
+            weather_condition=current_weather,
+            weather_forecast=weather_forecast,
+            latitude=resolved_lat,
+            longitude=resolved_lon,
         )
         
         # Extract latency_breakdown before constructing Pydantic model
@@ -813,6 +922,89 @@ async def predict(request: PredictRequest, http_request: Request):
         )
 
 
+def _sse(event: str, data: Any) -> bytes:
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8")
+
+
+@app.post("/predict/stream", tags=["Prediction"])
+async def predict_stream(request: PredictRequest, http_request: Request):
+    """
+    🔍 Streaming variant of /predict (Server-Sent Events).
+    
+    Same request body as /predict. The response is `text/event-stream`
+    with these events, in order:
+    
+    - **retrieval**: source citations and retrieval/rerank latency, sent as
+      soon as the knowledge base has been searched (the weather lookup runs
+      at the same time; only the LLM call waits for it)
+    - **token**: `{"text": ...}` raw LLM output as it is generated
+    - **advice**: the final parsed `TreatmentAdvice`
+    - **done**: disease, weather, `response_time_ms` and timestamp
+    - **error**: `{"detail": ...}` if the request fails mid-stream
+    
+    Cached advice skips the token events.
+    
+    ### Example
+    ```bash
+    curl -N -X POST "http://localhost:8000/predict/stream" \\
+      -H "Content-Type: application/json" \\
+      -d '{"disease": "Early Blight", "confidence": 0.92}'
+    ```
+    """
+    start_time = time.time()
+    
+    if request.disease not in DISEASE_CLASSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown disease '{request.disease}'. Valid classes: {DISEASE_CLASSES}"
+        )
+    
+    disease_name = request.disease
+    logger.info(f"📱 On-device detection (stream): {disease_name} ({request.confidence:.2%}) via {request.model_used}")
+    
+    async def event_stream():
+        # Geolocation + weather run alongside retrieval; only generation waits for them
+        weather_task = asyncio.create_task(_resolve_weather_context(request, http_request))
+        try:
+            async for item in stream_agri_advice(disease_name, weather_context=weather_task):
+                if item["event"] != "advice":
+                    yield _sse(item["event"], item["data"])
+                    continue
+                
+                advice_dict = dict(item["data"])
+                latency_raw = advice_dict.pop('latency_breakdown', None)
+                advice = TreatmentAdvice(**advice_dict)
+                if latency_raw:
+                    advice.latency_breakdown = LatencyBreakdown(**latency_raw)
+                yield _sse("advice", advice.model_dump())
+            
+            current_weather = weather_task.result()[0]
+            response_time = (time.time() - start_time) * 1000
+            logger.info(f"✅ Advice streamed in {response_time:.0f}ms")
+            yield _sse("done", {
+                "success": True,
+                "disease": disease_name,
+                "confidence": request.confidence,
+                "is_healthy": disease_name.lower() == "healthy",
+                "model_used": request.model_used,
+                "weather": current_weather,
+                "response_time_ms": round(response_time, 2),
+                "timestamp": datetime.utcnow().isoformat(),
+            })
+        except Exception as e:
+            logger.error(f"Streaming advice failed: {str(e)}", exc_info=True)
+            yield _sse("error", {"detail": f"Advice generation failed: {str(e)}"})
+        finally:
+            weather_task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/predict/image", response_model=PredictionResponse, tags=["Prediction"])
 async def predict_image(
     http_request: Request,
@@ -925,15 +1117,14 @@ async def predict_image(
             logger.warning(f"Weather fetch failed: {e}")
             current_weather = current_weather or "Unknown"
 
-    # --- 5. Generate RAG advice (blocking → thread pool) ---
+    # --- 5. Generate RAG advice (native async) ---
     try:
-        advice_dict = await loop.run_in_executor(
-            _executor,
-            lambda: get_agri_advice(
-                disease_name,
-                weather_condition=current_weather,
-                weather_forecast=weather_forecast
-            )
+        advice_dict = await get_agri_advice_async(
+            disease_name,
+            weather_condition=current_weather,
+            weather_forecast=weather_forecast,
+            latitude=resolved_lat,
+            longitude=resolved_lon,
         )
         # Extract latency_breakdown before constructing Pydantic model
         latency_raw = advice_dict.pop('latency_breakdown', None)
@@ -980,6 +1171,12 @@ class MotorDirection(str, Enum):
     STOP = "stop"
 
 
+class ScanStrategy(str, Enum):
+    SERPENTINE = "serpentine"
+    COARSE_TO_FINE = "coarse_to_fine"
+    HOTSPOTS = "hotspots"
+
+
 class ESP32ConnectRequest(BaseModel):
     """Request to connect to an ESP32-CAM device"""
     ip_address: str = Field(..., description="ESP32-CAM IP address (e.g., '192.168.1.100')")
@@ -1001,6 +1198,12 @@ class AutoScanRequest(BaseModel):
     tilt_min: int = Field(default=30, ge=0, le=180, description="Minimum tilt angle")
     tilt_max: int = Field(default=120, ge=0, le=180, description="Maximum tilt angle")
     step_size: int = Field(default=15, ge=5, le=45, description="Degrees between scan positions")
+    crop_to_classify: bool = Field(default=True, description="Classify each detected leaf crop instead of the full frame")
+    crop_padding: float = Field(default=0.15, ge=0.0, le=1.0, description="Padding around each leaf box (fraction of box size)")
+    max_leaves: int = Field(default=8, ge=1, le=32, description="Maximum leaves classified per frame")
+    pipelined: bool = Field(default=True, description="Move to the next position while the previous frame is analyzed; advice arrives asynchronously")
+    strategy: Optional[ScanStrategy] = Field(default=None, description="Path planner: serpentine, coarse_to_fine, or hotspots (revisit the last scan's detections); default SCAN_PLANNER")
+    hotspot_radius: Optional[int] = Field(default=None, ge=0, le=90, description="Degrees around each hotspot to revisit (default: step_size)")
 
 
 class SetPositionRequest(BaseModel):
@@ -1028,11 +1231,58 @@ def _guard_robotics():
         )
 
 
+DEVICE_ID_QUERY = Query(default=DEFAULT_DEVICE_ID, description="Camera rig id (see GET /esp32/devices)")
+
+
+def _robotics_device(device_id: str) -> "RoboticsDevice":
+    """Registered device by id (501 in rag_only mode, 404 if unknown)."""
+    _guard_robotics()
+    device = app.state.devices.get(device_id)
+    if device is None:
+        raise HTTPException(status_code=404, detail=f"Unknown device '{device_id}'")
+    return device
+
+
+@app.get("/esp32/devices", tags=["Robotics"])
+async def list_devices():
+    """
+    Registered camera rigs with connection, scan and stream state, plus
+    the back-ends they share (YOLO cross-camera batching, CPU / network pools).
+    """
+    _guard_robotics()
+    yolo: YOLODetector = app.state.yolo
+    return {
+        "status": "ok",
+        **app.state.devices.get_stats(),
+        "shared": {
+            "yolo_batching": yolo.get_batch_stats(),
+            "cpu_pool": app.state.cpu_pool.get_stats(),
+            "net_pool": app.state.net_pool.get_stats(),
+        },
+    }
+
+
+@app.delete("/esp32/devices/{device_id}", tags=["Robotics"])
+async def remove_device(device_id: str):
+    """Stop a device's scan, close its WebSocket sessions, disconnect and unregister it."""
+    _guard_robotics()
+    try:
+        removed = await app.state.devices.remove(device_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Unknown device '{device_id}'")
+    return {"success": True, "message": f"Device '{device_id}' removed"}
+
+
 @app.post("/esp32/connect", tags=["Robotics"])
-async def connect_esp32(request: ESP32ConnectRequest):
-    """Connect to an ESP32-CAM device over WiFi."""
+async def connect_esp32(request: ESP32ConnectRequest, device_id: str = DEVICE_ID_QUERY):
+    """Connect to an ESP32-CAM device over WiFi (registers device_id on first connect)."""
     _guard_robotics()
-    esp32: ESP32Client = app.state.esp32_client
+    try:
+        esp32: ESP32Client = app.state.devices.get_or_create(device_id).client
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     connected = await esp32.connect(request.ip_address, request.port)
     if connected:
         return {"success": True, "message": f"Connected to ESP32-CAM at {request.ip_address}:{request.port}"}
@@ -1040,20 +1290,19 @@ async def connect_esp32(request: ESP32ConnectRequest):
 
 
 @app.post("/esp32/disconnect", tags=["Robotics"])
-async def disconnect_esp32():
+async def disconnect_esp32(device_id: str = DEVICE_ID_QUERY):
     """Disconnect from ESP32-CAM."""
-    _guard_robotics()
-    esp32: ESP32Client = app.state.esp32_client
+    esp32: ESP32Client = _robotics_device(device_id).client
     await esp32.disconnect()
     return {"success": True, "message": "Disconnected from ESP32-CAM"}
 
 
 @app.get("/esp32/status", tags=["Robotics"])
-async def esp32_status():
+async def esp32_status(device_id: str = DEVICE_ID_QUERY):
     """Get ESP32-CAM connection and scanner status."""
-    _guard_robotics()
-    esp32: ESP32Client = app.state.esp32_client
-    scanner: RoboticsScanner = app.state.scanner
+    device = _robotics_device(device_id)
+    esp32: ESP32Client = device.client
+    scanner: RoboticsScanner = device.scanner
     yolo: YOLODetector = app.state.yolo
 
     result = {
@@ -1062,7 +1311,8 @@ async def esp32_status():
         "scan_state": scanner.state.value,
         "yolo_loaded": yolo.is_loaded,
         "vision_engine_loaded": app.state.vision_engine is not None,
-        "scan_results_count": len(scanner.scan_results),
+        "device_id": device.device_id,
+        "scan_results_count": scanner.results_count,
     }
 
     if esp32.is_connected:
@@ -1076,50 +1326,47 @@ async def esp32_status():
 
 
 @app.post("/esp32/motor", tags=["Robotics"])
-async def control_motor(request: MotorControlRequest):
+async def control_motor(request: MotorControlRequest, device_id: str = DEVICE_ID_QUERY):
     """Send motor control command to ESP32-CAM pan-tilt servos."""
-    _guard_robotics()
-    esp32: ESP32Client = app.state.esp32_client
+    esp32: ESP32Client = _robotics_device(device_id).client
     if not esp32.is_connected:
         raise HTTPException(status_code=503, detail="ESP32-CAM not connected")
 
-    if request.direction == MotorDirection.LEFT:
-        ok = await esp32.motor_left(request.step)
-    elif request.direction == MotorDirection.RIGHT:
-        ok = await esp32.motor_right(request.step)
-    elif request.direction == MotorDirection.UP:
-        ok = await esp32.motor_up(request.step)
-    elif request.direction == MotorDirection.DOWN:
-        ok = await esp32.motor_down(request.step)
-    elif request.direction == MotorDirection.CENTER:
-        ok = await esp32.motor_center()
+    # Queued on the device's scheduler: rapid jogs collapse into one request
+    if request.direction in (MotorDirection.CENTER, MotorDirection.STOP):
+        ack = await esp32.motors.submit(f"motor_{request.direction.value}")
     else:
-        ok = await esp32.motor_stop()
+        ack = await esp32.motors.submit(f"motor_{request.direction.value}", step=request.step)
 
-    if ok:
-        return {"success": True, "direction": request.direction.value, "step": request.step}
+    if ack["success"]:
+        return {"success": True, "direction": request.direction.value, "step": request.step, **ack}
     raise HTTPException(status_code=500, detail="Motor command failed")
 
 
 @app.post("/esp32/motor/position", tags=["Robotics"])
-async def set_servo_position(request: SetPositionRequest):
+async def set_servo_position(request: SetPositionRequest, device_id: str = DEVICE_ID_QUERY):
     """Set absolute servo positions."""
-    _guard_robotics()
-    esp32: ESP32Client = app.state.esp32_client
+    esp32: ESP32Client = _robotics_device(device_id).client
     if not esp32.is_connected:
         raise HTTPException(status_code=503, detail="ESP32-CAM not connected")
 
-    ok = await esp32.set_position(request.pan, request.tilt)
-    if ok:
-        return {"success": True, "pan": request.pan, "tilt": request.tilt}
+    ack = await esp32.motors.submit("set_position", pan=request.pan, tilt=request.tilt)
+    if ack["success"]:
+        return {"success": True, "pan": request.pan, "tilt": request.tilt, **ack}
     raise HTTPException(status_code=500, detail="Position command failed")
 
 
+@app.get("/esp32/motor/stats", tags=["Robotics"])
+async def get_motor_stats(device_id: str = DEVICE_ID_QUERY):
+    """Motor command scheduler: queue depth, requests sent vs. commands submitted, latency."""
+    esp32: ESP32Client = _robotics_device(device_id).client
+    return {"status": "ok", **esp32.motors.get_stats()}
+
+
 @app.get("/esp32/motor/position", tags=["Robotics"])
-async def get_servo_position():
+async def get_servo_position(device_id: str = DEVICE_ID_QUERY):
     """Get current servo positions."""
-    _guard_robotics()
-    esp32: ESP32Client = app.state.esp32_client
+    esp32: ESP32Client = _robotics_device(device_id).client
     if not esp32.is_connected:
         raise HTTPException(status_code=503, detail="ESP32-CAM not connected")
 
@@ -1127,10 +1374,9 @@ async def get_servo_position():
 
 
 @app.get("/esp32/stream", tags=["Robotics"])
-async def proxy_esp32_stream():
-    """Proxy the ESP32-CAM MJPEG video stream."""
-    _guard_robotics()
-    esp32: ESP32Client = app.state.esp32_client
+async def proxy_esp32_stream(device_id: str = DEVICE_ID_QUERY):
+    """Proxy the ESP32-CAM MJPEG video stream (one shared upstream connection for all viewers)."""
+    esp32: ESP32Client = _robotics_device(device_id).client
     if not esp32.is_connected:
         raise HTTPException(status_code=503, detail="ESP32-CAM not connected")
 
@@ -1140,27 +1386,40 @@ async def proxy_esp32_stream():
     )
 
 
+@app.get("/esp32/stream/stats", tags=["Robotics"])
+async def esp32_stream_stats(device_id: str = DEVICE_ID_QUERY):
+    """Shared MJPEG reader: viewers, fps, upstream connects, and stills served from the stream vs the device."""
+    esp32: ESP32Client = _robotics_device(device_id).client
+    return {"status": "ok", **esp32.get_stream_stats()}
+
+
 @app.get("/esp32/capture", tags=["Robotics"])
-async def capture_esp32_still():
-    """Capture a single high-resolution still from ESP32-CAM."""
-    _guard_robotics()
-    esp32: ESP32Client = app.state.esp32_client
+async def capture_esp32_still(
+    max_age_s: float = Query(default=0.5, ge=0.0, le=10.0, description="Serve the live stream's latest frame if at most this old"),
+    device_id: str = DEVICE_ID_QUERY,
+):
+    """
+    Capture a single still from ESP32-CAM.
+
+    While the shared stream is running, a recent stream frame is returned
+    instead of making a second request to the camera; otherwise the device's
+    high-resolution /capture is used.
+    """
+    esp32: ESP32Client = _robotics_device(device_id).client
     if not esp32.is_connected:
         raise HTTPException(status_code=503, detail="ESP32-CAM not connected")
 
     try:
-        image_bytes = await esp32.capture_still()
-        from fastapi.responses import Response
+        image_bytes = await esp32.capture_frame(max_age_s=max_age_s)
         return Response(content=image_bytes, media_type="image/jpeg")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Capture failed: {e}")
 
 
 @app.post("/esp32/detect", tags=["Robotics"])
-async def detect_leaves():
+async def detect_leaves(device_id: str = DEVICE_ID_QUERY):
     """Capture frame from ESP32-CAM and run YOLO leaf detection."""
-    _guard_robotics()
-    esp32: ESP32Client = app.state.esp32_client
+    esp32: ESP32Client = _robotics_device(device_id).client
     yolo: YOLODetector = app.state.yolo
 
     if not esp32.is_connected:
@@ -1169,8 +1428,9 @@ async def detect_leaves():
         raise HTTPException(status_code=503, detail="YOLO model not loaded")
 
     try:
-        image_bytes = await esp32.capture_still()
-        detections, inference_ms = yolo.detect_with_timing(image_bytes)
+        image_bytes = await esp32.capture_frame()
+        # Shares the scanner's bounded inference pool instead of blocking the event loop
+        detections, inference_ms = await app.state.cpu_pool.run(yolo.detect_with_timing, image_bytes)
         return {
             "detections": [d.to_dict() for d in detections],
             "count": len(detections),
@@ -1181,12 +1441,12 @@ async def detect_leaves():
 
 
 @app.post("/esp32/classify", tags=["Robotics"])
-async def classify_from_esp32(model_type: str = "mobilenet"):
+async def classify_from_esp32(model_type: str = "mobilenet", device_id: str = DEVICE_ID_QUERY):
     """Capture still from ESP32-CAM, classify disease, and get RAG advice."""
-    _guard_robotics()
-    scanner: RoboticsScanner = app.state.scanner
+    device = _robotics_device(device_id)
+    scanner: RoboticsScanner = device.scanner
 
-    if not app.state.esp32_client.is_connected:
+    if not device.client.is_connected:
         raise HTTPException(status_code=503, detail="ESP32-CAM not connected")
     if app.state.vision_engine is None:
         raise HTTPException(status_code=503, detail="Disease classification models not loaded")
@@ -1201,16 +1461,16 @@ async def classify_from_esp32(model_type: str = "mobilenet"):
 
 
 @app.post("/esp32/scan/start", tags=["Robotics"])
-async def start_auto_scan(request: AutoScanRequest):
+async def start_auto_scan(request: AutoScanRequest, device_id: str = DEVICE_ID_QUERY):
     """Start automated ESP32-CAM scanning: motor moves, YOLO detects, classify on detection."""
-    _guard_robotics()
-    scanner: RoboticsScanner = app.state.scanner
+    device = _robotics_device(device_id)
+    scanner: RoboticsScanner = device.scanner
 
-    if not app.state.esp32_client.is_connected:
+    if not device.client.is_connected:
         raise HTTPException(status_code=503, detail="ESP32-CAM not connected")
     if not app.state.yolo.is_loaded:
         raise HTTPException(status_code=503, detail="YOLO model not loaded")
-    if scanner.state == ScanState.SCANNING:
+    if scanner.is_scanning:
         raise HTTPException(status_code=409, detail="Auto-scan already running")
 
     try:
@@ -1222,6 +1482,12 @@ async def start_auto_scan(request: AutoScanRequest):
             tilt_min=request.tilt_min,
             tilt_max=request.tilt_max,
             step_size=request.step_size,
+            crop_to_classify=request.crop_to_classify,
+            crop_padding=request.crop_padding,
+            max_leaves=request.max_leaves,
+            pipelined=request.pipelined,
+            strategy=request.strategy.value if request.strategy else None,
+            hotspot_radius=request.hotspot_radius,
         )
         return {"success": True, "message": "Raster scan started", "state": scanner.state.value}
     except Exception as e:
@@ -1229,55 +1495,160 @@ async def start_auto_scan(request: AutoScanRequest):
 
 
 @app.post("/esp32/scan/stop", tags=["Robotics"])
-async def stop_auto_scan():
+async def stop_auto_scan(device_id: str = DEVICE_ID_QUERY):
     """Stop automated ESP32-CAM scanning."""
-    _guard_robotics()
-    scanner: RoboticsScanner = app.state.scanner
+    scanner: RoboticsScanner = _robotics_device(device_id).scanner
     await scanner.stop_scan()
     return {"success": True, "message": "Auto-scan stopped", "state": scanner.state.value}
 
 
 @app.get("/esp32/scan/results", tags=["Robotics"])
-async def get_scan_results():
-    """Get all results from the current/last scan session."""
-    _guard_robotics()
-    scanner: RoboticsScanner = app.state.scanner
+async def get_scan_results(
+    device_id: str = DEVICE_ID_QUERY,
+    include_images: bool = Query(default=False, description="Also inline image_base64 per result (slower)"),
+):
+    """
+    Get all results from the current/last scan session.
+    
+    Each result carries its frame_id and an image_url to fetch the JPEG
+    from /esp32/frames/{frame_id}. include_images=true adds image_base64
+    as well (encoded on the scanner's CPU pool).
+    """
+    scanner: RoboticsScanner = _robotics_device(device_id).scanner
+    results = scanner.scan_results
+    for r in results:
+        frame_id = r.get("frame_id")
+        r["image_url"] = f"/esp32/frames/{frame_id}?device_id={device_id}" if frame_id is not None else None
+    if include_images:
+        for r, image in zip(results, await scanner.scan_result_images(results)):
+            r["image_base64"] = image
     return {
-        "results": scanner.scan_results,
-        "count": len(scanner.scan_results),
+        "results": results,
+        "count": len(results),
         "state": scanner.state.value,
     }
 
 
+@app.get("/esp32/frames/{frame_id}", tags=["Robotics"])
+async def get_scan_frame(
+    frame_id: int,
+    max_width: int = Query(default=0, ge=0, le=4096, description="Downscale to this width (0 = original)"),
+    quality: int = Query(default=0, ge=0, le=100, description="JPEG quality (0 = original encoding)"),
+    device_id: str = DEVICE_ID_QUERY,
+):
+    """JPEG of a recent scan frame or scan result, by the frame_id carried in scan events."""
+    scanner: RoboticsScanner = _robotics_device(device_id).scanner
+    options = FrameOptions(max_width=max_width, quality=quality)
+    jpeg = await scanner.cpu_pool.run(scanner.frames.variant, frame_id, options)
+    if jpeg is None:
+        raise HTTPException(status_code=404, detail=f"Frame {frame_id} is no longer available")
+    return Response(content=jpeg, media_type="image/jpeg", headers={"Cache-Control": "private, max-age=3600"})
+
+
+@app.get("/esp32/scan/stats", tags=["Robotics"])
+async def get_scan_stats(device_id: str = DEVICE_ID_QUERY):
+    """
+    Scanner executor and event-loop metrics.
+    
+    Per pool (cpu: decode/YOLO/classification, net: weather/advice):
+    in-flight and waiting jobs, slot wait, queue wait and run time.
+    loop_lag reports how late the event loop ran timers during the
+    current or last scan (avg / p95 / max ms). subscribers lists each
+    WebSocket's backlog, coalesced frames and send rate.
+    """
+    scanner: RoboticsScanner = _robotics_device(device_id).scanner
+    return {"status": "ok", **scanner.get_stats()}
+
+
 @app.websocket("/ws/scan")
 async def scan_websocket(websocket: WebSocket):
+    """WebSocket for the default device's scan events (see /ws/scan/{device_id})."""
+    await _serve_scan_websocket(websocket, DEFAULT_DEVICE_ID)
+
+
+@app.websocket("/ws/scan/{device_id}")
+async def device_scan_websocket(websocket: WebSocket, device_id: str):
     """
-    WebSocket for real-time ESP32-CAM scan events.
+    WebSocket for real-time ESP32-CAM scan events of one camera rig.
 
     Pushes events: state_change, detection, classification, advice, frame, error.
-    Accepts commands: start_scan, stop_scan, motor_left, motor_right, motor_stop.
+    Accepts commands: start_scan, stop_scan, motor_left, motor_right, motor_up,
+    motor_down, motor_center, motor_stop, set_position, set_frame_options.
+
+    Motor commands are queued on the device's MotorCommandScheduler and do
+    not block the receive loop; their ack (success, coalesced, latency_ms,
+    queue_depth, and the command's "id" if one was sent) follows once the
+    device confirms the request that carried them.
+
+    Frames: events reference images by frame_id. With ?frames=binary each
+    frame is sent once as a binary message (b"AGF1" + uint32 frame_id +
+    JPEG) right before the first event that references it; otherwise the
+    event carries frame_base64 / image_base64 as before. max_width and
+    quality request a downscaled / re-encoded variant, e.g.
+    /ws/scan/rig-1?frames=binary&max_width=640&quality=70
     """
+    await _serve_scan_websocket(websocket, device_id)
+
+
+async def _serve_scan_websocket(websocket: WebSocket, device_id: str):
     if _is_rag_only:
         await websocket.close(code=4001, reason="Robotics not available in RAG-only deployment")
         return
+    device = app.state.devices.get(device_id)
+    if device is None:
+        await websocket.close(code=4004, reason=f"Unknown device '{device_id}'")
+        return
     await websocket.accept()
-    scanner: RoboticsScanner = app.state.scanner
-    esp32: ESP32Client = app.state.esp32_client
+    scanner: RoboticsScanner = device.scanner
+    esp32: ESP32Client = device.client
+
+    try:
+        frame_options = FrameOptions.from_params(websocket.query_params)
+    except ValueError:
+        await websocket.close(code=4002, reason="Invalid frame options")
+        return
+    sender = FrameSender(websocket, scanner.frames, frame_options, scanner.cpu_pool.run)
 
-    queue = scanner.subscribe()
+    client = websocket.client
+    subscriber = scanner.subscribe(name=f"{device_id}/{client.host}:{client.port}" if client else device_id)
 
     async def send_events():
-        """Forward scan events to the WebSocket client."""
+        """Forward scan events to the WebSocket client (frames latest-wins, other events in order)."""
         try:
             while True:
-                event = await queue.get()
-                await websocket.send_json(event.to_dict() if hasattr(event, 'to_dict') else event)
+                event = await subscriber.get()
+                if event is None:
+                    if app.state.devices.get(device_id) is not device:
+                        await websocket.close(code=1001, reason=f"Device '{device_id}' removed")
+                    else:
+                        # Dropped by the scanner after falling too far behind on reliable events
+                        await websocket.close(code=1013, reason="Subscriber fell too far behind")
+                    break
+                start = time.perf_counter()
+                nbytes = await sender.send(event)
+                subscriber.record_send(nbytes, (time.perf_counter() - start) * 1000)
         except asyncio.CancelledError:
             pass
         except Exception:
             pass
 
     sender_task = asyncio.create_task(send_events())
+    ack_tasks = set()
+
+    def ack_when_confirmed(data: dict, ack_future):
+        """Send the motor command's ack once the scheduler resolves it."""
+        async def send_ack():
+            try:
+                ack = await ack_future
+                reply = {"type": "ack", "command": data.get("command"), **ack}
+                if "id" in data:
+                    reply["id"] = data["id"]
+                await websocket.send_json(reply)
+            except Exception:
+                pass
+        task = asyncio.create_task(send_ack())
+        ack_tasks.add(task)
+        task.add_done_callback(ack_tasks.discard)
 
     try:
         while True:
@@ -1293,54 +1664,45 @@ async def scan_websocket(websocket: WebSocket):
                 except Exception as e:
                     await websocket.send_json({"type": "ack", "command": command, "success": False, "error": str(e)})
 
+            elif command == "set_frame_options":
+                try:
+                    sender.options = FrameOptions.from_params(data)
+                    await websocket.send_json({"type": "ack", "command": command, "success": True})
+                except (TypeError, ValueError) as e:
+                    await websocket.send_json({"type": "ack", "command": command, "success": False, "error": str(e)})
+
             elif command == "stop_scan":
                 await scanner.stop_scan()
                 await websocket.send_json({"type": "ack", "command": command, "success": True})
 
-            elif command == "motor_left":
-                step = data.get("step", 5)
-                ok = await esp32.motor_left(step) if esp32.is_connected else False
-                await websocket.send_json({"type": "ack", "command": command, "success": ok})
-
-            elif command == "motor_right":
-                step = data.get("step", 5)
-                ok = await esp32.motor_right(step) if esp32.is_connected else False
-                await websocket.send_json({"type": "ack", "command": command, "success": ok})
-
-            elif command == "motor_up":
-                step = data.get("step", 5)
-                ok = await esp32.motor_up(step) if esp32.is_connected else False
-                await websocket.send_json({"type": "ack", "command": command, "success": ok})
-
-            elif command == "motor_down":
-                step = data.get("step", 5)
-                ok = await esp32.motor_down(step) if esp32.is_connected else False
-                await websocket.send_json({"type": "ack", "command": command, "success": ok})
-
-            elif command == "motor_center":
-                ok = await esp32.motor_center() if esp32.is_connected else False
-                await websocket.send_json({"type": "ack", "command": command, "success": ok})
-
-            elif command == "motor_stop":
-                ok = await esp32.motor_stop() if esp32.is_connected else False
-                await websocket.send_json({"type": "ack", "command": command, "success": ok})
-
-            elif command == "set_position":
-                pan = data.get("pan", 90)
-                tilt = data.get("tilt", 75)
-                ok = await esp32.set_position(pan, tilt) if esp32.is_connected else False
-                await websocket.send_json({"type": "ack", "command": command, "success": ok})
+            elif command in ("motor_left", "motor_right", "motor_up", "motor_down", "motor_center", "motor_stop", "set_position"):
+                if not esp32.is_connected:
+                    await websocket.send_json({"type": "ack", "command": command, "success": False, "error": "ESP32-CAM not connected"})
+                    continue
+                try:
+                    if command == "set_position":
+                        args = {"pan": int(data.get("pan", 90)), "tilt": int(data.get("tilt", 75))}
+                    elif command in ("motor_center", "motor_stop"):
+                        args = {}
+                    else:
+                        args = {"step": int(data.get("step", 5))}
+                except (TypeError, ValueError) as e:
+                    await websocket.send_json({"type": "ack", "command": command, "success": False, "error": str(e)})
+                    continue
+                ack_when_confirmed(data, esp32.motors.submit(command, **args))
 
             else:
                 await websocket.send_json({"type": "error", "message": f"Unknown command: {command}"})
 
     except WebSocketDisconnect:
-        logger.info("WebSocket client disconnected")
+        logger.info(f"WebSocket client disconnected ({device_id})")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
         sender_task.cancel()
-        scanner.unsubscribe(queue)
+        for task in list(ack_tasks):
+            task.cancel()
+        scanner.unsubscribe(subscriber)
 
 
 # =============================================================================
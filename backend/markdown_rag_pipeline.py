@@ -7,6 +7,8 @@ Uses LangChain's document processing with:
 3. YAML Frontmatter Parsing — metadata from document headers
 4. Parent-Child Chunk Strategy — small chunks for search, large for context
 5. Cross-Encoder Reranking — precision boost on retrieved results
+6. Persistent Embedding/Rerank Cache — SQLite, shared across workers and restarts
+7. Precomputed Retrieval — top-k contexts for the fixed disease vocabulary
 
 This replaces the JSON-based pipeline with the industry standard:
   Markdown → Header-Aware Chunking → Embedding → ChromaDB → Retrieval + Reranking
@@ -28,6 +30,13 @@ if TYPE_CHECKING:
 
 from langchain_core.documents import Document
 
+# Persistent (SQLite) cache for query embeddings + cross-encoder scores
+from retrieval_cache import PersistentScoreCache, CachedEmbeddings, CACHE_ENABLED as SCORE_CACHE_ENABLED
+
+# Micro-batching front-end for the cross-encoder (concurrent requests share a pass)
+from rerank_batcher import MicroBatchReranker, BATCH_ENABLED as RERANK_BATCH_ENABLED
+from disease_classes import DISEASE_NAMES
+
 # Disable ChromaDB telemetry
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
 
@@ -452,6 +461,26 @@ class IndustryChunker:
 # 3. Vector Store with Industry Features
 # =============================================================================
 
+RERANKER_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+
+# Written next to the Chroma files; identifies one build of the collection
+COLLECTION_META_FILE = "agrisense_collection_meta.json"
+
+# Precomputed retrieval results for the fixed disease vocabulary (same directory)
+PRECOMPUTED_FILE = "agrisense_precomputed.json"
+
+# Retrieval query used by rag_agent.retrieve_context for a detected disease
+DISEASE_QUERY_TEMPLATE = "treatment symptoms prevention management {disease} tomato"
+
+# Classes that reach retrieval (Healthy is answered without RAG)
+DISEASE_VOCABULARY = DISEASE_NAMES
+
+PRECOMPUTE_ENABLED = os.getenv("RAG_PRECOMPUTE_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+PRECOMPUTE_K_VALUES = tuple(
+    int(k) for k in os.getenv("RAG_PRECOMPUTE_K", "5").split(",") if k.strip()
+)
+
+
 class IndustryVectorStore:
     """
     Production-grade vector store with:
@@ -492,10 +521,12 @@ class IndustryVectorStore:
             openai_model = os.getenv("RAG_OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
             logger.info(f"🧠 Loading OpenAI embedding model: {openai_model}")
             self.embeddings = _OpenAIEmbeddings(model=openai_model)
+            self.embedding_model_name = f"openai/{openai_model}"
         elif self.embedding_provider == "fastembed":
             fastembed_model = os.getenv("RAG_FASTEMBED_MODEL", "BAAI/bge-small-en-v1.5")
             logger.info(f"🧠 Loading FastEmbed model: {fastembed_model}")
             self.embeddings = _FastEmbedEmbeddings(model_name=fastembed_model)
+            self.embedding_model_name = f"fastembed/{fastembed_model}"
         else:
             logger.info(f"🧠 Loading HuggingFace embedding model: {embedding_model}")
             self.embeddings = _HuggingFaceEmbeddings(
@@ -503,21 +534,36 @@ class IndustryVectorStore:
                 model_kwargs={'device': 'cpu'},
                 encode_kwargs={'normalize_embeddings': True},
             )
+            self.embedding_model_name = f"huggingface/{embedding_model}"
+        
+        # Persistent cache shared across workers/restarts: query embeddings
+        # (via the embeddings wrapper Chroma calls) and rerank pair scores
+        self._score_cache: Optional[PersistentScoreCache] = None
+        if SCORE_CACHE_ENABLED:
+            self._score_cache = PersistentScoreCache()
+            if self._score_cache.available:
+                self.embeddings = CachedEmbeddings(self.embeddings, self.embedding_model_name, self._score_cache)
+            else:
+                self._score_cache = None
         
         self.vectorstore: Optional[Chroma] = None
         self._query_cache: Dict[str, Any] = {}
+        self.collection_version: Optional[str] = None
         
         # Try loading cross-encoder for reranking
         self._reranker = None
+        self._rerank_batcher: Optional[MicroBatchReranker] = None
         if self._reranking_enabled:
             try:
                 from sentence_transformers import CrossEncoder
                 logger.info("🔄 Loading cross-encoder reranker...")
                 self._reranker = CrossEncoder(
-                    'cross-encoder/ms-marco-MiniLM-L-6-v2',
+                    RERANKER_MODEL,
                     max_length=512,
                 )
                 logger.info("✅ Cross-encoder reranker ready")
+                if RERANK_BATCH_ENABLED:
+                    self._rerank_batcher = MicroBatchReranker(self._reranker)
             except Exception as e:
                 logger.warning(f"⚠️ Cross-encoder not available: {e}")
                 logger.warning("   Retrieval will work without reranking (slightly lower precision)")
@@ -558,6 +604,13 @@ class IndustryVectorStore:
             count = self.vectorstore._collection.count()
             logger.info(f"✅ Vector store built with {count} chunks")
             logger.info(f"💾 Persisted to: {self.persist_directory}")
+            
+            # New collection version → cached embeddings/scores are stale
+            import hashlib
+            digest = hashlib.sha1(self.embedding_model_name.encode())
+            for content in sorted(c.page_content for c in clean_chunks):
+                digest.update(content.encode())
+            self._set_collection_version(digest.hexdigest()[:16], count, write=True)
             return True
             
         except Exception as e:
@@ -580,12 +633,44 @@ class IndustryVectorStore:
             
             count = self.vectorstore._collection.count()
             logger.info(f"✅ Loaded vector store with {count} chunks")
+            
+            meta = self._read_collection_meta()
+            version = meta.get("version") or f"legacy:{self.collection_name}:{count}"
+            self._set_collection_version(version, count, write=False)
             return True
             
         except Exception as e:
             logger.error(f"❌ Failed to load vector store: {e}")
             return False
     
+    def _read_collection_meta(self) -> Dict[str, Any]:
+        meta_path = Path(self.persist_directory) / COLLECTION_META_FILE
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _set_collection_version(self, version: str, count: int, write: bool):
+        """Record the collection version and invalidate caches computed against another one."""
+        self.collection_version = version
+        self._query_cache.clear()
+        if write:
+            meta = {
+                "version": version,
+                "collection_name": self.collection_name,
+                "embedding_model": self.embedding_model_name,
+                "chunk_count": count,
+                "built_at": datetime.now().isoformat(),
+            }
+            try:
+                with open(Path(self.persist_directory) / COLLECTION_META_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f, indent=2)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not write collection metadata: {e}")
+        if self._score_cache:
+            self._score_cache.ensure_collection_version(version)
+    
     def retrieve(
         self,
         query: str,
@@ -605,7 +690,8 @@ class IndustryVectorStore:
         
         Returns:
             Tuple of (results_list, latency_breakdown_dict)
-            latency_breakdown keys: retrieval_ms, rerank_ms, total_ms
+            latency_breakdown keys: retrieval_ms, rerank_ms, total_ms, plus
+            rerank_batch_size / rerank_queue_wait_ms when the batcher ran
         """
         import time as _time
         latency = {'retrieval_ms': 0.0, 'rerank_ms': 0.0, 'total_ms': 0.0}
@@ -657,7 +743,7 @@ class IndustryVectorStore:
             # Step 3: Rerank with cross-encoder
             t_rerank = _time.time()
             if use_reranking and self._reranker and len(docs_with_scores) > 1:
-                results = self._rerank(query, docs_with_scores, k)
+                results = self._rerank(query, docs_with_scores, k, latency)
             else:
                 # Without reranking, just take top-k by similarity
                 results = [
@@ -714,6 +800,7 @@ class IndustryVectorStore:
         query: str,
         docs_with_scores: List[Tuple],
         k: int,
+        latency: Optional[Dict[str, float]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Cross-encoder reranking — the industry standard for precision.
@@ -723,11 +810,30 @@ class IndustryVectorStore:
         
         Pipeline: Bi-encoder retrieves candidates → Cross-encoder reranks them
         """
-        # Prepare pairs for cross-encoder
-        pairs = [(query, doc.page_content) for doc, _ in docs_with_scores]
-        
-        # Score with cross-encoder
-        rerank_scores = self._reranker.predict(pairs)
+        documents = [doc.page_content for doc, _ in docs_with_scores]
+        
+        # Reuse persisted scores; only unseen (query, chunk) pairs hit the model
+        rerank_scores: List[Optional[float]] = [None] * len(documents)
+        if self._score_cache:
+            for i, score in self._score_cache.get_pair_scores(RERANKER_MODEL, query, documents).items():
+                rerank_scores[i] = score
+        
+        missing = [i for i, score in enumerate(rerank_scores) if score is None]
+        if missing:
+            # Score with cross-encoder (batched with concurrent requests if enabled)
+            pairs = [(query, documents[i]) for i in missing]
+            if self._rerank_batcher:
+                predicted, batch_info = self._rerank_batcher.predict(pairs)
+                if latency is not None:
+                    latency.update(batch_info)
+            else:
+                predicted = self._reranker.predict(pairs)
+            for i, score in zip(missing, predicted):
+                rerank_scores[i] = float(score)
+            if self._score_cache:
+                self._score_cache.set_pair_scores(
+                    RERANKER_MODEL, query, [(documents[i], rerank_scores[i]) for i in missing]
+                )
         
         # Combine original docs with rerank scores
         scored = list(zip(docs_with_scores, rerank_scores))
@@ -791,6 +897,9 @@ class IndustryVectorStore:
                 "collection_name": self.collection_name,
                 "persist_directory": self.persist_directory,
                 "reranker_available": self._reranker is not None,
+                "collection_version": self.collection_version,
+                "score_cache": self._score_cache.get_stats() if self._score_cache else {"available": False},
+                "rerank_batcher": self._rerank_batcher.get_stats() if self._rerank_batcher else None,
                 "format": "markdown",
                 "version": "2.0",
             }
@@ -834,6 +943,7 @@ class MarkdownRAGPipeline:
             collection_name=collection_name,
         )
         self.is_ready = False
+        self._precomputed: Dict[Tuple[str, int, bool], Tuple[str, List[Dict[str, Any]]]] = {}
     
     def build(self, kb_directory: str, force_rebuild: bool = False) -> bool:
         """
@@ -846,6 +956,7 @@ class MarkdownRAGPipeline:
         # Check if existing store can be loaded
         if not force_rebuild and self.vector_store.load_existing():
             self.is_ready = True
+            self.precompute()
             return True
         
         logger.info("=" * 60)
@@ -883,6 +994,7 @@ class MarkdownRAGPipeline:
             logger.info(f"   Reranker: {'✅' if stats.get('reranker_available') else '❌'}")
             logger.info(f"   Format: Markdown (Industry Standard)")
             logger.info("=" * 60)
+            self.precompute()
         
         return success
     
@@ -895,6 +1007,7 @@ class MarkdownRAGPipeline:
         """
         if not force_rebuild and self.vector_store.load_existing():
             self.is_ready = True
+            self.precompute()
             return True
         
         logger.info("📦 Loading from legacy JSON format...")
@@ -933,6 +1046,7 @@ class MarkdownRAGPipeline:
             
             if success:
                 self.is_ready = True
+                self.precompute()
             
             return success
             
@@ -993,9 +1107,96 @@ class MarkdownRAGPipeline:
         
         return context_str, results, latency
     
+    # -------------------------------------------------------------------------
+    # Precomputed retrieval for the fixed disease vocabulary
+    # -------------------------------------------------------------------------
+    
+    def _precompute_signature(self) -> Dict[str, Any]:
+        """Everything the precomputed results depend on besides (disease, k, reranker)."""
+        return {
+            "collection_version": self.vector_store.collection_version,
+            "reranker_available": self.vector_store._reranker is not None,
+            "query_template": DISEASE_QUERY_TEMPLATE,
+            "diseases": list(DISEASE_VOCABULARY),
+            "k_values": list(PRECOMPUTE_K_VALUES),
+        }
+    
+    def precompute(self) -> int:
+        """
+        Materialize retrieval results for every disease × k × reranker flag.
+        
+        retrieve_context() always queries DISEASE_QUERY_TEMPLATE for one of
+        the DISEASE_VOCABULARY classes, so its output only changes when the
+        collection does. Results are loaded from PRECOMPUTED_FILE when its
+        signature matches the current collection, otherwise recomputed and
+        written back (best effort: the store may be on a read-only mount).
+        
+        Returns:
+            Number of precomputed entries
+        """
+        self._precomputed = {}
+        if not PRECOMPUTE_ENABLED or not self.is_ready:
+            return 0
+        
+        signature = self._precompute_signature()
+        path = Path(self.vector_store.persist_directory) / PRECOMPUTED_FILE
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get("signature") == signature:
+                for entry in stored.get("entries", []):
+                    key = (entry["disease"], int(entry["k"]), bool(entry["use_reranking"]))
+                    self._precomputed[key] = (entry["context"], entry["results"])
+                logger.info(f"⚡ Loaded {len(self._precomputed)} precomputed retrievals")
+                return len(self._precomputed)
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        import time as _time
+        t_start = _time.time()
+        entries = []
+        for disease in DISEASE_VOCABULARY:
+            question = DISEASE_QUERY_TEMPLATE.format(disease=disease)
+            for k in PRECOMPUTE_K_VALUES:
+                for use_reranking in (True, False):
+                    context_str, results, _ = self.query(
+                        question, disease=disease, k=k,
+                        use_reranking=use_reranking, skip_cache=True,
+                    )
+                    if not results:
+                        continue
+                    self._precomputed[(disease.lower(), k, use_reranking)] = (context_str, results)
+                    entries.append({
+                        "disease": disease.lower(),
+                        "k": k,
+                        "use_reranking": use_reranking,
+                        "context": context_str,
+                        "results": results,
+                    })
+        logger.info(
+            f"⚡ Precomputed {len(entries)} retrievals in {(_time.time() - t_start):.1f}s"
+        )
+        
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"signature": signature, "entries": entries}, f, default=str)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not persist precomputed retrievals: {e}")
+        
+        return len(entries)
+    
+    def get_precomputed(
+        self, disease: str, k: int = 5, use_reranking: bool = True,
+    ) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """O(1) lookup of (context_str, results) for a vocabulary disease, or None."""
+        return self._precomputed.get((disease.strip().lower(), k, use_reranking))
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get pipeline statistics."""
-        return self.vector_store.get_stats()
+        stats = self.vector_store.get_stats()
+        stats["precomputed_entries"] = len(self._precomputed)
+        return stats
 
 
 # =============================================================================
@@ -0,0 +1,355 @@
+"""
+AgriSense MJPEG Stream - Single Shared Upstream Reader per Camera
+
+Every /esp32/stream viewer used to open its own HTTP stream to the
+ESP32-CAM, and the camera's web server stalls after two or three
+concurrent clients. Now one background task per camera reads the device
+stream, parses each frame once, and fans it out.
+
+Features:
+- One upstream connection no matter how many viewers; started by the
+  first viewer, closed ESP32_STREAM_IDLE_S after the last one leaves
+- Latest-wins fan-out: a slow viewer skips frames instead of buffering
+  them or slowing down the reader
+- latest() / next_frame() let the scanner and still-capture requests use
+  a frame from the running stream instead of making a second request to
+  the device
+- Automatic reconnect with backoff while viewers are attached
+- Stats: viewers, fps, frames read, reconnects, last-frame age
+- MJPEGParser: linear-time multipart/JPEG parser over a reusable
+  bytearray. It uses each part's Content-Length when present and falls
+  back to a resumable SOI/EOI marker search, returning frames as
+  memoryviews into its buffer
+
+Configuration (environment):
+- ESP32_STREAM_IDLE_S: keep the upstream open this long after the last viewer (default 5)
+- ESP32_STREAM_FRAME_TIMEOUT_S: max wait for the next frame (default 2)
+- ESP32_STREAM_RECONNECT_S: initial reconnect delay, doubled up to 10 s (default 1)
+"""
+
+import os
+import re
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional
+
+logger = logging.getLogger("AgriSense.MJPEG")
+
+
+SHARED_STREAM_IDLE_S = float(os.getenv("ESP32_STREAM_IDLE_S", "5"))
+FRAME_TIMEOUT_S = float(os.getenv("ESP32_STREAM_FRAME_TIMEOUT_S", "2"))
+RECONNECT_S = float(os.getenv("ESP32_STREAM_RECONNECT_S", "1"))
+_MAX_RECONNECT_S = 10.0
+
+_SOI = b"\xff\xd8"
+_EOI = b"\xff\xd9"
+_HEADER_END = b"\r\n\r\n"
+_CONTENT_LENGTH = re.compile(rb"content-length:\s*(\d+)", re.IGNORECASE)
+# Part headers are short; anything longer is treated as headerless JPEG data
+_MAX_HEADER = 512
+# Compact the buffer once this much consumed data sits at its front
+_COMPACT_AT = 256 * 1024
+
+
+# =============================================================================
+# Parser
+# =============================================================================
+
+class MJPEGParser:
+    """
+    Incremental parser for multipart/x-mixed-replace JPEG streams.
+
+    feed() appends a chunk and returns the frames it completed. Work per
+    byte is constant: marker and header searches resume where the last
+    search stopped, and consumed data is dropped in amortized batches
+    instead of re-slicing the buffer per frame.
+
+    Parts with a Content-Length header (the ESP32-CAM sketch sends one) are
+    cut by length, so an 0xFFD9 inside the JPEG (e.g. an EXIF thumbnail)
+    cannot end a frame early. Headerless streams use SOI/EOI markers.
+
+    The returned memoryviews point into the parser's buffer and are only
+    valid until the next feed() call; copy (bytes(view)) to keep a frame.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0  # start of unconsumed data
+        self._scan = 0  # where the pending header / marker search resumes
+        self._body_start = -1  # Content-Length mode: start of the current body
+        self._body_len = -1
+        self._soi = -1  # marker mode: SOI of the current frame
+        self._views: List[memoryview] = []
+
+        self.frames = 0
+        self.length_framed = 0
+        self.marker_framed = 0
+        self.resyncs = 0
+
+    def feed(self, chunk: bytes) -> List[memoryview]:
+        """Add a chunk; return the frames completed by it (views valid until the next feed)."""
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._compact()
+        self._buf += chunk
+
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                break
+            self._views.append(frame)
+            self.frames += 1
+        return self._views
+
+    def _compact(self):
+        if self._pos >= _COMPACT_AT and self._pos * 2 >= len(self._buf):
+            del self._buf[:self._pos]
+            shift = self._pos
+            self._pos = 0
+            self._scan = max(0, self._scan - shift)
+            if self._body_start >= 0:
+                self._body_start -= shift
+            if self._soi >= 0:
+                self._soi -= shift
+
+    def _next_frame(self) -> Optional[memoryview]:
+        buf = self._buf
+        if self._body_start < 0 and self._soi < 0:
+            # Part headers, if the stream has them; they always end before the JPEG's SOI
+            soi = buf.find(_SOI, self._pos, self._pos + _MAX_HEADER)
+            limit = soi if soi != -1 else self._pos + _MAX_HEADER
+            header_end = buf.find(_HEADER_END, max(self._scan, self._pos), limit)
+            if header_end != -1:
+                match = _CONTENT_LENGTH.search(buf, self._pos, header_end)
+                if match:
+                    self._body_start = header_end + len(_HEADER_END)
+                    self._body_len = int(match.group(1))
+                else:
+                    self._pos = self._scan = header_end + len(_HEADER_END)
+            elif soi == -1 and len(buf) - self._pos < _MAX_HEADER:
+                # Headers may still be arriving
+                self._scan = max(self._pos, len(buf) - len(_HEADER_END) + 1)
+                return None
+
+        if self._body_start >= 0:
+            end = self._body_start + self._body_len
+            if len(buf) < end:
+                return None
+            start, self._body_start, self._body_len = self._body_start, -1, -1
+            if buf[start:start + 2] == _SOI:
+                self._pos = self._scan = end
+                self.length_framed += 1
+                return memoryview(buf)[start:end]
+            # Length does not frame a JPEG; resynchronise on markers
+            self.resyncs += 1
+            self._pos = self._scan = start
+
+        return self._next_marker_frame()
+
+    def _next_marker_frame(self) -> Optional[memoryview]:
+        buf = self._buf
+        if self._soi < 0:
+            soi = buf.find(_SOI, max(self._scan, self._pos))
+            if soi == -1:
+                # Keep a trailing 0xFF that may start the marker
+                self._scan = max(self._pos, len(buf) - 1)
+                return None
+            self._soi = soi
+            self._scan = soi + 2
+        eoi = buf.find(_EOI, self._scan)
+        if eoi == -1:
+            self._scan = max(self._soi + 2, len(buf) - 1)
+            return None
+        start, end = self._soi, eoi + 2
+        self._soi = -1
+        self._pos = self._scan = end
+        self.marker_framed += 1
+        return memoryview(buf)[start:end]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "frames": self.frames,
+            "length_framed": self.length_framed,
+            "marker_framed": self.marker_framed,
+            "resyncs": self.resyncs,
+            "buffer_kb": round(len(self._buf) / 1024, 1),
+        }
+
+
+class SharedMJPEGReader:
+    """
+    Background reader that owns the single upstream MJPEG connection.
+
+    Args:
+        source: Callable returning an async iterator of JPEG frames
+            (ESP32Client.stream_frames)
+        name: Label for logs and stats
+    """
+
+    def __init__(
+        self,
+        source: Callable[[], AsyncIterator[bytes]],
+        name: str = "esp32",
+        idle_s: float = SHARED_STREAM_IDLE_S,
+        frame_timeout_s: float = FRAME_TIMEOUT_S,
+        reconnect_s: float = RECONNECT_S,
+    ):
+        self._source = source
+        self.name = name
+        self.idle_s = idle_s
+        self.frame_timeout_s = frame_timeout_s
+        self.reconnect_s = reconnect_s
+
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._frame: Optional[bytes] = None
+        self._frame_time = 0.0  # time.monotonic() when the frame finished arriving
+        self._seq = 0
+        self._new_frame: Optional[asyncio.Event] = None
+        self._viewers = 0
+        self._idle_since = time.monotonic()
+
+        self._connects = 0
+        self._errors = 0
+        self._last_error: Optional[str] = None
+        self._recent: deque = deque(maxlen=30)  # frame times for fps
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def viewers(self) -> int:
+        return self._viewers
+
+    def _event(self) -> asyncio.Event:
+        if self._new_frame is None:
+            self._new_frame = asyncio.Event()
+        return self._new_frame
+
+    def _ensure_running(self):
+        self._closed = False
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    def _publish(self, frame: bytes):
+        self._frame = frame
+        self._frame_time = time.monotonic()
+        self._seq += 1
+        self._recent.append(self._frame_time)
+        # Wake everyone waiting on this frame; later waiters get a fresh event
+        event, self._new_frame = self._event(), asyncio.Event()
+        event.set()
+
+    async def _run(self):
+        delay = self.reconnect_s
+        try:
+            while not self._closed:
+                try:
+                    self._connects += 1
+                    logger.info(f"📡 Opening shared MJPEG stream ({self.name}, {self._viewers} viewers)")
+                    async for frame in self._source():
+                        self._publish(frame)
+                        delay = self.reconnect_s
+                        if self._viewers == 0 and time.monotonic() - self._idle_since > self.idle_s:
+                            logger.info(f"📴 No stream viewers for {self.idle_s:.0f}s, closing upstream ({self.name})")
+                            return
+                    logger.warning(f"⚠️ MJPEG stream ended ({self.name})")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._errors += 1
+                    self._last_error = str(e)
+                    logger.error(f"MJPEG stream error ({self.name}): {e}")
+
+                if self._viewers == 0:
+                    return
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _MAX_RECONNECT_S)
+        finally:
+            # Let waiters notice the reader is gone
+            self._event().set()
+            self._new_frame = None
+
+    async def _wait_newer(self, seq: int, timeout: float) -> bool:
+        """Wait until a frame newer than seq exists. False on timeout or stop."""
+        deadline = time.monotonic() + timeout
+        while self._seq <= seq:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._closed or not self.running:
+                return False
+            try:
+                await asyncio.wait_for(self._event().wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        """
+        Frames for one viewer (latest-wins: frames published while the
+        viewer was busy are skipped). Ends when the reader is stopped.
+        """
+        # Start from the current frame of a live stream; never a stale one from an earlier session
+        seen = self._seq - 1 if self.running and self._frame is not None else self._seq
+        self._viewers += 1
+        self._ensure_running()
+        try:
+            while not self._closed:
+                if not await self._wait_newer(seen, self.frame_timeout_s):
+                    if not self.running and not self._closed:
+                        self._ensure_running()
+                    continue
+                seen = self._seq
+                yield self._frame
+        finally:
+            self._viewers -= 1
+            if self._viewers == 0:
+                self._idle_since = time.monotonic()
+
+    def latest(self, max_age_s: float) -> Optional[bytes]:
+        """Most recent stream frame if the reader is running and it is at most max_age_s old."""
+        if self.running and self._frame is not None and time.monotonic() - self._frame_time <= max_age_s:
+            return self._frame
+        return None
+
+    async def next_frame(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """
+        The next frame to finish arriving after this call (e.g. once the
+        servos have settled). None if the reader is not running or times out.
+        """
+        if not self.running:
+            return None
+        if await self._wait_newer(self._seq, timeout or self.frame_timeout_s):
+            return self._frame
+        return None
+
+    async def stop(self):
+        """Close the upstream connection and end all viewer iterators."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._frame = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        recent = list(self._recent)
+        fps = (len(recent) - 1) / (recent[-1] - recent[0]) if len(recent) > 1 and recent[-1] > recent[0] else 0.0
+        return {
+            "running": self.running,
+            "viewers": self._viewers,
+            "fps": round(fps, 1),
+            "frames_read": self._seq,
+            "last_frame_age_s": round(now - self._frame_time, 2) if self._frame is not None else None,
+            "last_frame_bytes": len(self._frame) if self._frame is not None else 0,
+            "upstream_connects": self._connects,
+            "errors": self._errors,
+            "last_error": self._last_error,
+        }
@@ -0,0 +1,288 @@
+"""
+AgriSense Model Registry - Lazy Loading with a Memory Budget
+
+vision_engine used to load every classifier into every worker at startup.
+The registry loads a model the first time it is requested, tracks its
+resident size, and evicts the least-recently-used idle models when the
+configured memory budget would be exceeded.
+
+Features:
+- Load on first use; concurrent first requests wait for a single load
+- Pin/unpin around inference so a model is never evicted mid-request
+- LRU eviction of idle models to stay under the budget (soft limit: if
+  everything else is pinned the new model still loads, with a warning)
+- Failed loads are retried after a cool-down instead of on every request
+- Victims are unloaded outside the registry lock (state evicting), so a
+  slow unload (gc.collect) never blocks pins, status or other loads
+- Per-model state (unloaded / loading / ready / failed / evicting /
+  evicted) with size, load time, last use and load/eviction counters for
+  readiness checks
+
+Configuration (environment):
+- VISION_MEMORY_BUDGET_MB: resident budget for all classifiers (default 0 = unlimited)
+- VISION_LOAD_RETRY_S: cool-down before retrying a failed load (default 30)
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger("ModelRegistry")
+
+
+MEMORY_BUDGET_MB = float(os.getenv("VISION_MEMORY_BUDGET_MB", "0"))
+LOAD_RETRY_S = float(os.getenv("VISION_LOAD_RETRY_S", "30"))
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+EVICTING = "evicting"  # chosen for eviction, unload_fn still running
+EVICTED = "evicted"
+
+
+class _Entry:
+    __slots__ = (
+        "state", "size_bytes", "last_used", "pins", "loads", "evictions",
+        "load_ms", "error", "failed_at", "lock",
+    )
+
+    def __init__(self):
+        self.state = UNLOADED
+        self.size_bytes = 0
+        self.last_used = 0.0
+        self.pins = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_ms = None
+        self.error = None
+        self.failed_at = 0.0
+        self.lock = threading.Lock()  # serializes loads of this model
+
+
+class ModelRegistry:
+    """
+    On-demand loader for a fixed set of models.
+
+    Args:
+        names: Model names managed by the registry
+        load_fn: load_fn(name) loads the model into the caller's storage and
+            returns its resident size in bytes; raises on failure
+        unload_fn: unload_fn(name) drops the caller's references
+        budget_mb: Memory budget in MB (0 = unlimited)
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        load_fn: Callable[[str], int],
+        unload_fn: Callable[[str], None],
+        budget_mb: float = MEMORY_BUDGET_MB,
+        retry_s: float = LOAD_RETRY_S,
+    ):
+        self._entries: Dict[str, _Entry] = {name: _Entry() for name in names}
+        self._load_fn = load_fn
+        self._unload_fn = unload_fn
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.retry_s = retry_s
+        self._lock = threading.Lock()  # guards states, pins and sizes
+        self._evicted = threading.Condition(self._lock)  # notified when an unload finishes
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def is_ready(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.state == READY
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(e.size_bytes for e in self._entries.values() if e.state in (READY, EVICTING))
+
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+
+    def ensure_loaded(self, name: str) -> bool:
+        """Load the model if needed. Returns True if it is ready."""
+        entry = self._entries[name]
+        with self._lock:
+            if entry.state == READY:
+                entry.last_used = time.time()
+                return True
+
+        with entry.lock:
+            # Another thread may have finished the load while we waited
+            with self._lock:
+                # Never reload a model while its unload is still running
+                while entry.state == EVICTING:
+                    self._evicted.wait()
+                if entry.state == READY:
+                    entry.last_used = time.time()
+                    return True
+                if entry.state == FAILED and time.time() - entry.failed_at < self.retry_s:
+                    return False
+                # Make room using the size seen on a previous load, if any
+                victims = self._evict_for(name, entry.size_bytes)
+                entry.state = LOADING
+            self._unload(victims, name)
+
+            start = time.perf_counter()
+            try:
+                size = int(self._load_fn(name))
+            except Exception as e:
+                with self._lock:
+                    entry.state = FAILED
+                    entry.error = str(e)
+                    entry.failed_at = time.time()
+                logger.error(f"❌ Failed to load {name} model: {e}")
+                return False
+
+            with self._lock:
+                entry.state = READY
+                entry.size_bytes = size
+                entry.loads += 1
+                entry.error = None
+                entry.load_ms = round((time.perf_counter() - start) * 1000, 1)
+                entry.last_used = time.time()
+                victims = self._evict_for(name, 0)
+            self._unload(victims, name)
+            logger.info(
+                f"📥 {name} resident ({size / (1024 * 1024):.0f} MB, "
+                f"total {self.resident_bytes() / (1024 * 1024):.0f} MB)"
+            )
+            return True
+
+    @contextmanager
+    def acquire(self, name: str) -> Iterator[bool]:
+        """
+        Load (if needed) and pin a model for the duration of the block.
+
+        Yields True if the model is ready; a pinned model is never evicted.
+        """
+        entry = self._entries[name]
+        ready = self.ensure_loaded(name)
+        if ready:
+            with self._lock:
+                # It may have been evicted between load and pin; reload once
+                ready = entry.state == READY
+                if ready:
+                    entry.pins += 1
+            if not ready and self.ensure_loaded(name):
+                with self._lock:
+                    ready = entry.state == READY
+                    if ready:
+                        entry.pins += 1
+        try:
+            yield ready
+        finally:
+            if ready:
+                with self._lock:
+                    entry.pins -= 1
+                    entry.last_used = time.time()
+
+    def preload(self, names: Iterable[str]) -> Dict[str, bool]:
+        """Load the given models now (e.g. at startup)."""
+        return {name: self.ensure_loaded(name) for name in names if name in self._entries}
+
+    # -------------------------------------------------------------------------
+    # Eviction
+    # -------------------------------------------------------------------------
+
+    def _evict_for(self, incoming: str, incoming_bytes: int) -> List[str]:
+        """
+        Pick idle LRU models to evict until incoming_bytes fits and mark them
+        EVICTING. Caller holds self._lock and passes the result to _unload()
+        after releasing it.
+        """
+        if self.budget_bytes <= 0:
+            return []
+        # Models already EVICTING are on their way out and do not count
+        resident = sum(e.size_bytes for e in self._entries.values() if e.state == READY)
+        if incoming_bytes and self._entries[incoming].state != READY:
+            resident += incoming_bytes
+        candidates = sorted(
+            (
+                (e.last_used, name) for name, e in self._entries.items()
+                if name != incoming and e.state == READY and e.pins == 0
+            )
+        )
+        victims = []
+        for _, name in candidates:
+            if resident <= self.budget_bytes:
+                break
+            self._entries[name].state = EVICTING
+            resident -= self._entries[name].size_bytes
+            victims.append(name)
+        if resident > self.budget_bytes:
+            logger.warning(
+                f"⚠️ Model memory {resident / (1024 * 1024):.0f} MB exceeds budget "
+                f"{self.budget_bytes / (1024 * 1024):.0f} MB (remaining models are in use)"
+            )
+        return victims
+
+    def _unload(self, victims: List[str], reason: str = ""):
+        """Run unload_fn for EVICTING models without holding self._lock."""
+        for name in victims:
+            entry = self._entries[name]
+            try:
+                self._unload_fn(name)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to unload {name}: {e}")
+                unloaded = False
+            else:
+                unloaded = True
+            with self._lock:
+                if unloaded:
+                    entry.state = EVICTED
+                    entry.evictions += 1
+                else:
+                    entry.state = READY
+                self._evicted.notify_all()
+            if unloaded and reason:
+                logger.info(f"📤 Evicted {name} ({entry.size_bytes / (1024 * 1024):.0f} MB, LRU) to make room for {reason}")
+
+    def evict(self, name: str) -> bool:
+        """Unload an idle model explicitly. Returns False if it is pinned or not loaded."""
+        entry = self._entries[name]
+        with self._lock:
+            if entry.state != READY or entry.pins:
+                return False
+            entry.state = EVICTING
+        self._unload([name])
+        return entry.state == EVICTED
+
+    # -------------------------------------------------------------------------
+    # Status
+    # -------------------------------------------------------------------------
+
+    def get_status(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """Per-model state for readiness checks (one model if name is given)."""
+        now = time.time()
+        with self._lock:
+            status = {
+                model: {
+                    "state": e.state,
+                    "resident_mb": round(e.size_bytes / (1024 * 1024), 1) if e.state in (READY, EVICTING) else 0.0,
+                    "load_time_ms": e.load_ms,
+                    "idle_s": round(now - e.last_used, 1) if e.last_used else None,
+                    "in_flight": e.pins,
+                    "loads": e.loads,
+                    "evictions": e.evictions,
+                    "error": e.error,
+                }
+                for model, e in self._entries.items()
+                if name is None or model == name
+            }
+        return status
+
+    def get_stats(self) -> Dict[str, Any]:
+        resident = self.resident_bytes()
+        return {
+            "budget_mb": round(self.budget_bytes / (1024 * 1024), 1) if self.budget_bytes else None,
+            "resident_mb": round(resident / (1024 * 1024), 1),
+            "models": self.get_status(),
+        }
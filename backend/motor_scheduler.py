@@ -0,0 +1,245 @@
+"""
+AgriSense Motor Scheduler - Per-Device Servo Command Queue with Coalescing
+
+Manual jogging (/ws/scan motor_* commands and POST /esp32/motor) used to
+await one HTTP request to the ESP32-CAM per command inline. Held-down jog
+buttons queued requests behind each other, the WebSocket receive loop
+stalled until each one returned, and the servos lagged far behind the
+controls.
+
+Features:
+- One scheduler per ESP32Client: at most one motor request in flight to
+  the device
+- Commands queued while a request is in flight are collapsed before the
+  next send:
+  - relative jogs (left/right/up/down) sum to one net step per axis
+  - an absolute command (center, stop, set_position) supersedes
+    everything queued before it
+- submit() returns at once; its future resolves when the device has
+  confirmed the request that carried the command (the ack)
+- Requests are spaced at least MOTOR_MIN_INTERVAL_S apart so the servos
+  can follow
+- Stats: queue depth, submitted / requests / coalesced, device and ack latency
+
+Configuration (environment):
+- MOTOR_MIN_INTERVAL_S: minimum time between motor requests to the device (default 0.06)
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("AgriSense.MotorScheduler")
+
+
+MIN_INTERVAL_S = float(os.getenv("MOTOR_MIN_INTERVAL_S", "0.06"))
+
+# Relative jog -> (pan sign, tilt sign); matches the sketch (left = pan - step, up = tilt + step)
+RELATIVE_COMMANDS: Dict[str, Tuple[int, int]] = {
+    "motor_left": (-1, 0),
+    "motor_right": (1, 0),
+    "motor_up": (0, 1),
+    "motor_down": (0, -1),
+}
+ABSOLUTE_COMMANDS = frozenset({"motor_center", "motor_stop", "set_position"})
+COMMANDS = frozenset(RELATIVE_COMMANDS) | ABSOLUTE_COMMANDS
+
+
+@dataclass
+class MotorCommand:
+    """A queued command and the future its ack resolves."""
+    command: str
+    args: Dict[str, int]
+    future: asyncio.Future
+    submitted_at: float = field(default_factory=time.perf_counter)
+
+
+class MotorCommandScheduler:
+    """
+    Serializes and coalesces motor commands for one ESP32-CAM.
+
+    Args:
+        esp32: The device's ESP32Client
+        min_interval_s: Minimum spacing between requests to the device
+    """
+
+    def __init__(self, esp32, min_interval_s: float = MIN_INTERVAL_S):
+        self.esp32 = esp32
+        self.min_interval_s = max(0.0, min_interval_s)
+        self._queue: List[MotorCommand] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_send = 0.0
+        self._in_flight = False
+
+        self._submitted = 0
+        self._requests = 0
+        self._coalesced = 0
+        self._failed = 0
+        self._max_depth = 0
+        self._device_ms: deque = deque(maxlen=100)
+        self._ack_ms: deque = deque(maxlen=100)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def submit(self, command: str, **args: int) -> asyncio.Future:
+        """
+        Queue a command without waiting for the device.
+
+        The returned future resolves to an ack dict: success, coalesced
+        (merged with or superseded by other commands), latency_ms
+        (submit to device confirmation) and queue_depth.
+
+        Raises:
+            ValueError: If the command is unknown
+        """
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown motor command '{command}'. Use one of: {', '.join(sorted(COMMANDS))}")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append(MotorCommand(command, args, future))
+        self._submitted += 1
+        self._max_depth = max(self._max_depth, len(self._queue))
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    @staticmethod
+    def collapse(batch: List[MotorCommand]) -> List[Tuple[str, Dict[str, int]]]:
+        """
+        Device requests for a batch of queued commands, in order: the last
+        absolute command (if any), then one net jog per axis for the
+        relative commands after it.
+        """
+        absolute: Optional[Tuple[str, Dict[str, int]]] = None
+        pan = tilt = 0
+        for cmd in batch:
+            if cmd.command in ABSOLUTE_COMMANDS:
+                absolute = (cmd.command, cmd.args)
+                pan = tilt = 0
+            else:
+                pan_sign, tilt_sign = RELATIVE_COMMANDS[cmd.command]
+                step = int(cmd.args.get("step", 5))
+                pan += pan_sign * step
+                tilt += tilt_sign * step
+
+        requests = [absolute] if absolute else []
+        if pan:
+            requests.append(("motor_right" if pan > 0 else "motor_left", {"step": abs(pan)}))
+        if tilt:
+            requests.append(("motor_up" if tilt > 0 else "motor_down", {"step": abs(tilt)}))
+        return requests
+
+    @staticmethod
+    def folded(batch: List[MotorCommand]) -> List[bool]:
+        """
+        Per command of a batch: True if collapse() folded it into a request
+        other commands produced (superseded by a later absolute command, or
+        a jog merged with other jogs on the same axis).
+        """
+        last_absolute = max((i for i, cmd in enumerate(batch) if cmd.command in ABSOLUTE_COMMANDS), default=-1)
+        def axis(cmd: MotorCommand) -> str:
+            return "pan" if RELATIVE_COMMANDS[cmd.command][0] else "tilt"
+
+        jogs_per_axis = {"pan": 0, "tilt": 0}
+        for cmd in batch[last_absolute + 1:]:
+            jogs_per_axis[axis(cmd)] += 1
+
+        flags = []
+        for i, cmd in enumerate(batch):
+            if i < last_absolute:
+                flags.append(True)
+            elif i == last_absolute:
+                flags.append(False)
+            else:
+                flags.append(jogs_per_axis[axis(cmd)] > 1)
+        return flags
+
+    async def _send(self, command: str, args: Dict[str, int]) -> bool:
+        wait = self._last_send + self.min_interval_s - time.perf_counter()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_send = start = time.perf_counter()
+        self._in_flight = True
+        try:
+            if not self.esp32.is_connected:
+                return False
+            return bool(await getattr(self.esp32, command)(**args))
+        finally:
+            self._in_flight = False
+            self._requests += 1
+            self._device_ms.append((time.perf_counter() - start) * 1000)
+
+    async def _run(self):
+        while True:
+            if not self._queue:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            batch, self._queue = self._queue, []
+            requests = self.collapse(batch)
+            self._coalesced += len(batch) - len(requests)
+            ok = True
+            try:
+                for command, args in requests:
+                    ok = await self._send(command, args) and ok
+            except asyncio.CancelledError:
+                self._resolve(batch, False)
+                raise
+            except Exception as e:
+                logger.error(f"Motor command failed: {e}")
+                ok = False
+
+            if not ok:
+                self._failed += 1
+            self._resolve(batch, ok)
+
+    def _resolve(self, batch: List[MotorCommand], ok: bool):
+        now = time.perf_counter()
+        for cmd, folded in zip(batch, self.folded(batch)):
+            latency_ms = (now - cmd.submitted_at) * 1000
+            self._ack_ms.append(latency_ms)
+            if not cmd.future.done():
+                cmd.future.set_result({
+                    "success": ok,
+                    "coalesced": folded,
+                    "latency_ms": round(latency_ms, 1),
+                    "queue_depth": len(self._queue),
+                })
+
+    async def stop(self):
+        """Fail pending commands and stop the worker (on disconnect)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        pending, self._queue = self._queue, []
+        self._resolve(pending, False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        def avg(values) -> float:
+            return round(sum(values) / len(values), 1) if values else 0.0
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self._max_depth,
+            "in_flight": self._in_flight,
+            "submitted": self._submitted,
+            "requests": self._requests,
+            "coalesced": self._coalesced,
+            "failed_batches": self._failed,
+            "avg_device_ms": avg(self._device_ms),
+            "avg_ack_ms": avg(self._ack_ms),
+            "min_interval_s": self.min_interval_s,
+        }
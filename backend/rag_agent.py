@@ -9,6 +9,7 @@ Features:
 - Robust error handling with fallback responses
 - Configurable LLM backend (Groq)
 - Timeout protection for API calls
+- Native asyncio path (get_agri_advice_async) for the FastAPI event loop
 
 Compatible with CrewAI 1.9.x
 """
@@ -31,7 +32,7 @@ import logging
 import time
 import asyncio
 import concurrent.futures
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Tuple
 from dotenv import load_dotenv
 
 # Configure logging
@@ -45,17 +46,50 @@ load_dotenv()
 from crewai import Agent, Task, Crew, Process, LLM
 
 # Industry-Standard Markdown RAG Pipeline (replaces legacy JSON pipeline)
-from markdown_rag_pipeline import MarkdownRAGPipeline
+from markdown_rag_pipeline import MarkdownRAGPipeline, DISEASE_QUERY_TEMPLATE
+
+# Bounded LRU + TTL cache for generated advice
+from advice_cache import AdviceCache, make_advice_key
+
+# Single-flight coalescing for concurrent identical requests
+from request_coalescer import SingleFlight, AsyncSingleFlight
 
 
 # =============================================================================
 # LLM Configuration (The Brain)
 # =============================================================================
 
+# Groq model used by both the CrewAI (sync) and native async paths
+LLM_MODEL = "groq/llama-3.1-8b-instant"
+
+# Generation timeout and async concurrency limits (per worker process)
+ADVICE_TIMEOUT_SECONDS = float(os.getenv("ADVICE_TIMEOUT_SECONDS", "30"))
+ADVICE_MAX_CONCURRENCY = int(os.getenv("ADVICE_MAX_CONCURRENCY", "200"))
+RAG_RETRIEVAL_WORKERS = int(os.getenv("RAG_RETRIEVAL_WORKERS", "4"))
+
 # Cache for LLM instance
 _llm_instance: Optional[LLM] = None
 
 
+def _get_groq_api_key() -> str:
+    """
+    Read the Groq API key from the environment (.env reloaded).
+    
+    Raises:
+        ValueError: If GROQ_API_KEY is not set
+    """
+    load_dotenv(override=True)
+    api_key = os.getenv("GROQ_API_KEY")
+    
+    if not api_key:
+        logger.error("GROQ_API_KEY not found in environment variables")
+        raise ValueError(
+            "GROQ_API_KEY not found. Please set your Groq API key in the .env file. "
+            "Get your free API key at: https://console.groq.com"
+        )
+    return api_key
+
+
 def get_llm() -> LLM:
     """
     Initialize Groq LLM using CrewAI's native LLM class.
@@ -73,21 +107,13 @@ def get_llm() -> LLM:
     if _llm_instance is not None:
         return _llm_instance
     
-    load_dotenv(override=True)
-    api_key = os.getenv("GROQ_API_KEY")
-    
-    if not api_key:
-        logger.error("GROQ_API_KEY not found in environment variables")
-        raise ValueError(
-            "GROQ_API_KEY not found. Please set your Groq API key in the .env file. "
-            "Get your free API key at: https://console.groq.com"
-        )
+    api_key = _get_groq_api_key()
     
     logger.info("🧠 Initializing Groq LLM (llama-3.1-8b-instant)")
     
     # CrewAI native LLM configuration for Groq - using faster 8B model
     _llm_instance = LLM(
-        model="groq/llama-3.1-8b-instant",
+        model=LLM_MODEL,
         api_key=api_key,
         temperature=0
     )
@@ -100,6 +126,7 @@ _rag_pipeline: Optional[MarkdownRAGPipeline] = None
 _rag_init_info: dict = {}  # Diagnostic info for debug endpoint
 _rag_init_lock = None  # Will be set below
 _rag_init_started = False
+_retrieval_flight = SingleFlight(name="retrieval")
 
 
 def _init_rag_sync():
@@ -230,6 +257,7 @@ def retrieve_context(disease_name: str, k: int = 5, use_reranker: bool = True, s
     Retrieve relevant agricultural documents using the industry-standard pipeline.
     
     Pipeline: Query → Expand → Over-fetch → Rerank → Top-K
+    (or an O(1) lookup of the precomputed result for a known disease)
     
     Args:
         disease_name: Name of the disease to search for
@@ -248,15 +276,33 @@ def retrieve_context(disease_name: str, k: int = 5, use_reranker: bool = True, s
         return "", [], empty_latency
     
     try:
+        # Fixed disease vocabulary: served from results precomputed at load time
+        if not skip_cache:
+            precomputed = pipeline.get_precomputed(disease_name, k=k, use_reranking=use_reranker)
+            if precomputed is not None:
+                context_str, docs = precomputed
+                logger.info(f"⚡ Using precomputed retrieval for {disease_name} ({len(docs)} documents)")
+                return context_str, docs, empty_latency
+        
         # Use the pipeline's query method with disease filtering
-        query = f"treatment symptoms prevention management {disease_name} tomato"
-        context_str, docs, latency = pipeline.query(
-            question=query,
-            disease=disease_name,
-            k=k,
-            use_reranking=use_reranker,
-            skip_cache=skip_cache,
-        )
+        query = DISEASE_QUERY_TEMPLATE.format(disease=disease_name)
+        
+        def run_query():
+            return pipeline.query(
+                question=query,
+                disease=disease_name,
+                k=k,
+                use_reranking=use_reranker,
+                skip_cache=skip_cache,
+            )
+        
+        if skip_cache:
+            context_str, docs, latency = run_query()
+        else:
+            # Concurrent identical retrievals share one embed + rerank pass
+            context_str, docs, latency = _retrieval_flight.do(
+                (disease_name.lower(), k, use_reranker), run_query
+            )
         
         if not docs:
             logger.info(f"📚 No documents found for {disease_name} - using LLM knowledge")
@@ -275,18 +321,23 @@ def retrieve_context(disease_name: str, k: int = 5, use_reranker: bool = True, s
 # Agent Definitions (The Crew)
 # =============================================================================
 
+ADVISOR_ROLE = 'Agricultural Treatment Advisor'
+ADVISOR_GOAL = 'Provide complete disease treatment advice with weather-aware safety recommendations'
+ADVISOR_BACKSTORY = '''You are an expert agricultural advisor combining deep knowledge of 
+        tomato plant pathology with practical field experience. You provide evidence-based 
+        treatment recommendations (both organic and chemical), adapt them for current weather 
+        conditions, and always include critical safety protocols including PPE requirements 
+        and harvest safety intervals. You deliver concise, actionable advice.'''
+
+
 def create_agents(llm):
     """Create the single unified agent for agricultural advice"""
     
     # Single unified agent combining pathology and field expertise
     advisor = Agent(
-        role='Agricultural Treatment Advisor',
-        goal='Provide complete disease treatment advice with weather-aware safety recommendations',
-        backstory='''You are an expert agricultural advisor combining deep knowledge of 
-        tomato plant pathology with practical field experience. You provide evidence-based 
-        treatment recommendations (both organic and chemical), adapt them for current weather 
-        conditions, and always include critical safety protocols including PPE requirements 
-        and harvest safety intervals. You deliver concise, actionable advice.''',
+        role=ADVISOR_ROLE,
+        goal=ADVISOR_GOAL,
+        backstory=ADVISOR_BACKSTORY,
         allow_delegation=False,
         verbose=False,
         llm=llm
@@ -299,8 +350,11 @@ def create_agents(llm):
 # Task Definitions
 # =============================================================================
 
-def create_tasks(advisor, disease_name: str, weather: str, retrieved_context: str = "", weather_forecast: str = ""):
-    """Create single unified task for the advisor agent"""
+EXPECTED_OUTPUT = 'A JSON object with severity, action_plan, safety_warning, and weather_advisory keys.'
+
+
+def build_task_description(disease_name: str, weather: str, retrieved_context: str = "", weather_forecast: str = "") -> str:
+    """Build the advisor task prompt (shared by the CrewAI and async LLM paths)"""
     
     # Build context-aware description
     context_section = ""
@@ -318,9 +372,7 @@ Use the above retrieved documents as your PRIMARY source of information.
     if weather_forecast:
         weather_context += f"\n\n7-DAY WEATHER FORECAST:\n{weather_forecast}"
     
-    # Single unified task
-    task_advise = Task(
-        description=f'''You are advising on the specific tomato disease "{disease_name}". 
+    return f'''You are advising on the specific tomato disease "{disease_name}". 
 Your treatment MUST be specific to THIS disease — do NOT give generic advice.
 {context_section}
 {weather_context}
@@ -356,20 +408,74 @@ IMPORTANT FORMATTING RULES for weather_advisory:
 - State which days are safe for treatment and which to avoid
 
 OUTPUT FORMAT: Respond with ONLY a valid JSON object (no markdown, no code fences):
-{{"severity": "Low|Medium|High", "action_plan": "1. First treatment step\\n2. Second treatment step\\n3. Third treatment step\\nPREVENTION:\\n1. First prevention step\\n2. Second prevention step", "safety_warning": "PPE and safety notes in one paragraph", "weather_advisory": "Day-specific weather timing advice referencing the forecast"}}''',
-        expected_output='A JSON object with severity, action_plan, safety_warning, and weather_advisory keys.',
+{{"severity": "Low|Medium|High", "action_plan": "1. First treatment step\\n2. Second treatment step\\n3. Third treatment step\\nPREVENTION:\\n1. First prevention step\\n2. Second prevention step", "safety_warning": "PPE and safety notes in one paragraph", "weather_advisory": "Day-specific weather timing advice referencing the forecast"}}'''
+
+
+def create_tasks(advisor, disease_name: str, weather: str, retrieved_context: str = "", weather_forecast: str = ""):
+    """Create single unified task for the advisor agent"""
+    
+    # Single unified task
+    task_advise = Task(
+        description=build_task_description(disease_name, weather, retrieved_context, weather_forecast),
+        expected_output=EXPECTED_OUTPUT,
         agent=advisor
     )
     
     return [task_advise]
 
 
+def build_advice_messages(disease_name: str, weather: str, retrieved_context: str = "", weather_forecast: str = "") -> list[dict]:
+    """
+    Chat messages equivalent to the single-agent crew, for direct LLM calls.
+    
+    Mirrors CrewAI's agent/task prompt layout so the async path produces the
+    same JSON contract that parse_crew_response() expects.
+    """
+    system_prompt = (
+        f"You are {ADVISOR_ROLE}. {ADVISOR_BACKSTORY}\n"
+        f"Your personal goal is: {ADVISOR_GOAL}"
+    )
+    user_prompt = (
+        f"Current Task: {build_task_description(disease_name, weather, retrieved_context, weather_forecast)}\n\n"
+        f"This is the expected criteria for your final answer: {EXPECTED_OUTPUT}"
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
 # =============================================================================
 # Main Interface Function
 # =============================================================================
 
-# Treatment response cache for common diseases
-_advice_cache: Dict[str, Dict[str, Any]] = {}
+# Treatment response cache for common diseases (bounded LRU with per-entry TTL)
+_advice_cache = AdviceCache()
+
+# Single-flight groups: concurrent identical requests share one execution
+_advice_flight = SingleFlight(name="advice")
+
+# Shared pool for sync crew.kickoff() calls, capped like the async path. Kickoffs
+# beyond ADVICE_MAX_CONCURRENCY queue for a thread (and count against their timeout)
+_kickoff_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=max(1, ADVICE_MAX_CONCURRENCY), thread_name_prefix="crew-kickoff"
+)
+
+
+def get_advice_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters of the advice cache (for the stats endpoint)."""
+    stats = _advice_cache.get_stats()
+    stats["single_flight"] = {
+        "advice": _advice_flight.get_stats(),
+        "advice_async": _async_advice_flight.get_stats(),
+        "retrieval": _retrieval_flight.get_stats(),
+    }
+    return stats
+
+
+def clear_advice_cache():
+    """Drop all cached advice (e.g. after the knowledge base is rebuilt)."""
+    _advice_cache.clear()
 
 
 def get_agri_advice(
@@ -379,6 +485,8 @@ def get_agri_advice(
     rag_enabled: bool = True,
     use_reranker: bool = True,
     use_cache: bool = True,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
 ) -> Dict[str, Any]:
     """
     Get agricultural treatment advice using CrewAI agent with RAG retrieval.
@@ -393,6 +501,8 @@ def get_agri_advice(
         rag_enabled: If False, skip retrieval entirely (LLM-only baseline for ablation)
         use_reranker: If False, skip cross-encoder reranking (ablation experiment)
         use_cache: If False, bypass response cache (for evaluation runs)
+        latitude: Optional latitude the forecast was fetched for (cache key bucket)
+        longitude: Optional longitude the forecast was fetched for (cache key bucket)
     
     Returns:
         Dictionary with:
@@ -401,30 +511,63 @@ def get_agri_advice(
         - rag_enabled: Boolean indicating if RAG retrieval was successful
         - latency_breakdown: Dict with retrieval_ms, rerank_ms, generation_ms, total_ms
     """
-    start_time = time.time()
-    latency = {'retrieval_ms': 0.0, 'rerank_ms': 0.0, 'generation_ms': 0.0, 'total_ms': 0.0}
-    
     # Normalize inputs
     disease_name = disease_name.strip()
-    weather_condition = weather_condition.strip()
+    weather_condition = (weather_condition or "Unknown").strip()
+    
+    # Check cache first (skip if use_cache=False for eval runs).
+    # The key includes the forecast fingerprint and location bucket so advice
+    # generated against yesterday's forecast is never served today.
+    cache_key = make_advice_key(
+        disease_name, weather_condition, weather_forecast,
+        latitude=latitude, longitude=longitude,
+        rag_enabled=rag_enabled, use_reranker=use_reranker,
+    )
+    if use_cache:
+        cached = _advice_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"📦 Returning cached advice for: {disease_name}")
+            return cached
+        
+        # Single-flight: concurrent identical misses share one generation
+        return _advice_flight.do(
+            cache_key,
+            lambda: _generate_advice(
+                disease_name, weather_condition, weather_forecast,
+                rag_enabled, use_reranker, use_cache, cache_key,
+            ),
+        )
     
-    # Check cache first (skip if use_cache=False for eval runs)
-    cache_key = f"{disease_name.lower()}:{weather_condition.lower()}"
-    if use_cache and cache_key in _advice_cache:
-        logger.info(f"📦 Returning cached advice for: {disease_name}")
-        return _advice_cache[cache_key]
+    return _generate_advice(
+        disease_name, weather_condition, weather_forecast,
+        rag_enabled, use_reranker, use_cache, cache_key,
+    )
+
+
+def _generate_advice(
+    disease_name: str,
+    weather_condition: str,
+    weather_forecast: Optional[str],
+    rag_enabled: bool,
+    use_reranker: bool,
+    use_cache: bool,
+    cache_key: str,
+) -> Dict[str, Any]:
+    """Generate (and cache) advice on a cache miss. Called once per in-flight key."""
+    start_time = time.time()
+    latency = {'retrieval_ms': 0.0, 'rerank_ms': 0.0, 'generation_ms': 0.0, 'total_ms': 0.0}
+    
+    # Another flight may have filled the cache between our lookup and now
+    if use_cache:
+        cached = _advice_cache.get(cache_key)
+        if cached is not None:
+            return cached
     
     # Handle healthy plants - no need to invoke agents
-    if disease_name.lower() == "healthy" or disease_name == "Model Not Loaded":
-        response = {
-            "severity": "None",
-            "action_plan": "No treatment needed. Your tomato plant appears healthy! Continue regular care including adequate watering, proper spacing for air circulation, and monitoring for early signs of disease.",
-            "safety_warning": "Maintain good garden hygiene. Remove any fallen leaves or debris to prevent disease. Inspect plants weekly for early detection.",
-            "weather_advisory": f"Current weather: {weather_condition}. Adjust watering schedule based on conditions - water deeply but less frequently in humid weather.",
-            "latency_breakdown": latency,
-        }
+    if _is_healthy(disease_name):
+        response = _healthy_advice(weather_condition, latency)
         if use_cache:
-            _advice_cache[cache_key] = response
+            _advice_cache.set(cache_key, response)
         return response
     
     try:
@@ -441,8 +584,7 @@ def get_agri_advice(
                 use_reranker=use_reranker,
                 skip_cache=not use_cache,
             )
-            latency['retrieval_ms'] = retrieval_latency.get('retrieval_ms', 0.0)
-            latency['rerank_ms'] = retrieval_latency.get('rerank_ms', 0.0)
+            _merge_retrieval_latency(latency, retrieval_latency)
         else:
             logger.info("📚 RAG disabled (LLM-only baseline mode)")
         
@@ -463,48 +605,37 @@ def get_agri_advice(
             verbose=False,
         )
         
-        # Execute the crew with timeout protection (30 seconds max)
-        logger.info("⏳ Executing crew (30s timeout)...")
+        # Execute the crew with timeout protection. The shared executor is not
+        # shut down per call, so a timed-out kickoff no longer blocks the caller
+        # until it finishes (the old `with ThreadPoolExecutor()` did).
+        logger.info(f"⏳ Executing crew ({ADVICE_TIMEOUT_SECONDS:.0f}s timeout)...")
         t_gen_start = time.time()
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future = executor.submit(crew.kickoff)
-            try:
-                result = future.result(timeout=30)  # 30 second timeout
-            except concurrent.futures.TimeoutError:
-                logger.error("❌ Crew execution timed out after 30 seconds")
-                latency['generation_ms'] = (time.time() - t_gen_start) * 1000
-                latency['total_ms'] = (time.time() - start_time) * 1000
-                fb = get_fallback_advice(disease_name, weather_condition)
-                fb['latency_breakdown'] = latency
-                return fb
+        future = _kickoff_executor.submit(crew.kickoff)
+        try:
+            result = future.result(timeout=ADVICE_TIMEOUT_SECONDS)
+        except concurrent.futures.TimeoutError:
+            # Drops a kickoff still queued for a thread; one already running
+            # cannot be interrupted and finishes in the background, discarded
+            future.cancel()
+            logger.error(f"❌ Crew execution timed out after {ADVICE_TIMEOUT_SECONDS:.0f} seconds")
+            latency['generation_ms'] = (time.time() - t_gen_start) * 1000
+            latency['total_ms'] = (time.time() - start_time) * 1000
+            fb = get_fallback_advice(disease_name, weather_condition)
+            fb['latency_breakdown'] = latency
+            return fb
         latency['generation_ms'] = (time.time() - t_gen_start) * 1000
         
-        # Parse the result
+        # Parse the result and add source citations
         result_text = str(result).strip()
         response = parse_crew_response(result_text, disease_name, weather_condition)
-        
-        # Add source citations if available (now includes doc_id)
-        if source_docs:
-            response['sources'] = [
-                {
-                    'doc_id': doc.get('doc_id', 'unknown'),
-                    'source': doc['source'],
-                    'content_type': doc['content_type'],
-                    'confidence': doc['confidence'],
-                }
-                for doc in source_docs
-            ]
-            response['rag_enabled'] = True
-        else:
-            response['sources'] = []
-            response['rag_enabled'] = False
+        _attach_sources(response, source_docs)
         
         latency['total_ms'] = (time.time() - start_time) * 1000
         response['latency_breakdown'] = latency
         
         # Cache successful response
         if use_cache:
-            _advice_cache[cache_key] = response
+            _advice_cache.set(cache_key, response)
         
         logger.info(
             f"✅ Advice generated in {latency['total_ms']:.0f}ms "
@@ -520,13 +651,7 @@ def get_agri_advice(
         # API key issues
         logger.error(f"Configuration error: {str(e)}")
         latency['total_ms'] = (time.time() - start_time) * 1000
-        return {
-            "severity": "Unknown",
-            "action_plan": f"AI advisor unavailable: {str(e)}. Please consult a local agricultural extension service for treatment of {disease_name}.",
-            "safety_warning": "Always wear protective equipment when handling any pesticides or fungicides.",
-            "weather_advisory": f"Current weather: {weather_condition}. Monitor conditions before applying any treatments.",
-            "latency_breakdown": latency,
-        }
+        return _unavailable_advice(e, disease_name, weather_condition, latency)
     except Exception as e:
         # Other errors - provide helpful fallback
         logger.error(f"❌ CrewAI error: {str(e)}")
@@ -536,6 +661,457 @@ def get_agri_advice(
         return fb
 
 
+# =============================================================================
+# Response Helpers (shared by the sync and async paths)
+# =============================================================================
+
+def _is_healthy(disease_name: str) -> bool:
+    return disease_name.lower() == "healthy" or disease_name == "Model Not Loaded"
+
+
+def _healthy_advice(weather_condition: str, latency: dict) -> Dict[str, Any]:
+    return {
+        "severity": "None",
+        "action_plan": "No treatment needed. Your tomato plant appears healthy! Continue regular care including adequate watering, proper spacing for air circulation, and monitoring for early signs of disease.",
+        "safety_warning": "Maintain good garden hygiene. Remove any fallen leaves or debris to prevent disease. Inspect plants weekly for early detection.",
+        "weather_advisory": f"Current weather: {weather_condition}. Adjust watering schedule based on conditions - water deeply but less frequently in humid weather.",
+        "latency_breakdown": latency,
+    }
+
+
+def _unavailable_advice(error: Exception, disease_name: str, weather_condition: str, latency: dict) -> Dict[str, Any]:
+    return {
+        "severity": "Unknown",
+        "action_plan": f"AI advisor unavailable: {str(error)}. Please consult a local agricultural extension service for treatment of {disease_name}.",
+        "safety_warning": "Always wear protective equipment when handling any pesticides or fungicides.",
+        "weather_advisory": f"Current weather: {weather_condition}. Monitor conditions before applying any treatments.",
+        "latency_breakdown": latency,
+    }
+
+
+# Rerank micro-batch details passed through to latency_breakdown when present
+_RERANK_BATCH_KEYS = ('rerank_batch_size', 'rerank_batch_requests', 'rerank_queue_wait_ms')
+
+
+def _merge_retrieval_latency(latency: dict, retrieval_latency: dict):
+    """Copy retrieval/rerank timings (and rerank batch details) into the advice latency."""
+    latency['retrieval_ms'] = retrieval_latency.get('retrieval_ms', 0.0)
+    latency['rerank_ms'] = retrieval_latency.get('rerank_ms', 0.0)
+    for key in _RERANK_BATCH_KEYS:
+        if key in retrieval_latency:
+            latency[key] = retrieval_latency[key]
+
+
+def _format_sources(source_docs: list[dict]) -> list[dict]:
+    """Source citations (with doc_id) as returned to the client."""
+    return [
+        {
+            'doc_id': doc.get('doc_id', 'unknown'),
+            'source': doc['source'],
+            'content_type': doc['content_type'],
+            'confidence': doc['confidence'],
+        }
+        for doc in source_docs
+    ]
+
+
+def _attach_sources(response: dict, source_docs: list[dict]):
+    """Add source citations and the rag_enabled flag to a parsed response."""
+    response['sources'] = _format_sources(source_docs) if source_docs else []
+    response['rag_enabled'] = bool(source_docs)
+
+
+# =============================================================================
+# Async Interface (native asyncio, no nested thread pools)
+# =============================================================================
+
+# Async single-flight group (coroutine callers share one generation per key)
+_async_advice_flight = AsyncSingleFlight(name="advice_async")
+
+# Chroma + cross-encoder are blocking; run them on a small dedicated pool
+_retrieval_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=RAG_RETRIEVAL_WORKERS, thread_name_prefix="rag-retrieval"
+)
+
+# Caps concurrent Groq requests; created lazily inside the running loop
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+_async_api_key: Optional[str] = None
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(ADVICE_MAX_CONCURRENCY)
+    return _llm_semaphore
+
+
+async def retrieve_context_async(
+    disease_name: str, k: int = 5, use_reranker: bool = True, skip_cache: bool = False
+) -> tuple[str, list[dict], dict]:
+    """retrieve_context() offloaded to the retrieval pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _retrieval_executor,
+        lambda: retrieve_context(disease_name, k=k, use_reranker=use_reranker, skip_cache=skip_cache),
+    )
+
+
+async def _acomplete(messages: list[dict]) -> str:
+    """One Groq chat completion through litellm's native async client."""
+    global _async_api_key
+    import litellm  # installed with crewai; imported lazily like the other heavy deps
+    
+    # Resolve once, like get_llm(): avoids re-reading .env on the event loop
+    if _async_api_key is None:
+        _async_api_key = _get_groq_api_key()
+    
+    response = await litellm.acompletion(
+        model=LLM_MODEL,
+        api_key=_async_api_key,
+        messages=messages,
+        temperature=0,
+    )
+    return (response.choices[0].message.content or "").strip()
+
+
+async def get_agri_advice_async(
+    disease_name: str, 
+    weather_condition: str = "Partly Cloudy",
+    weather_forecast: Optional[str] = None,
+    rag_enabled: bool = True,
+    use_reranker: bool = True,
+    use_cache: bool = True,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Async counterpart of get_agri_advice() for the FastAPI event loop.
+    
+    Same arguments, cache and response shape as get_agri_advice(), but the
+    LLM call is a native coroutine bounded by ADVICE_MAX_CONCURRENCY and
+    ADVICE_TIMEOUT_SECONDS, and retrieval runs on a dedicated thread pool,
+    so hundreds of requests can be in flight without a thread each.
+    """
+    disease_name = disease_name.strip()
+    weather_condition = (weather_condition or "Unknown").strip()
+    
+    cache_key = make_advice_key(
+        disease_name, weather_condition, weather_forecast,
+        latitude=latitude, longitude=longitude,
+        rag_enabled=rag_enabled, use_reranker=use_reranker,
+    )
+    if use_cache:
+        cached = _advice_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"📦 Returning cached advice for: {disease_name}")
+            return cached
+        
+        return await _async_advice_flight.do(
+            cache_key,
+            lambda: _generate_advice_async(
+                disease_name, weather_condition, weather_forecast,
+                rag_enabled, use_reranker, use_cache, cache_key,
+            ),
+        )
+    
+    return await _generate_advice_async(
+        disease_name, weather_condition, weather_forecast,
+        rag_enabled, use_reranker, use_cache, cache_key,
+    )
+
+
+async def _generate_advice_async(
+    disease_name: str,
+    weather_condition: str,
+    weather_forecast: Optional[str],
+    rag_enabled: bool,
+    use_reranker: bool,
+    use_cache: bool,
+    cache_key: str,
+) -> Dict[str, Any]:
+    """Async cache-miss path: offloaded retrieval + native async LLM call."""
+    start_time = time.time()
+    latency = {'retrieval_ms': 0.0, 'rerank_ms': 0.0, 'generation_ms': 0.0, 'total_ms': 0.0}
+    
+    if use_cache:
+        cached = _advice_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    if _is_healthy(disease_name):
+        response = _healthy_advice(weather_condition, latency)
+        if use_cache:
+            _advice_cache.set(cache_key, response)
+        return response
+    
+    t_gen_start = time.time()
+    try:
+        logger.info(f"🌱 Generating treatment advice (async) for: {disease_name}")
+        
+        retrieved_context = ""
+        source_docs = []
+        if rag_enabled:
+            retrieved_context, source_docs, retrieval_latency = await retrieve_context_async(
+                disease_name, k=5,
+                use_reranker=use_reranker,
+                skip_cache=not use_cache,
+            )
+            _merge_retrieval_latency(latency, retrieval_latency)
+        
+        messages = build_advice_messages(
+            disease_name, weather_condition, retrieved_context, weather_forecast or ""
+        )
+        
+        async with _get_llm_semaphore():
+            t_gen_start = time.time()
+            result_text = await asyncio.wait_for(_acomplete(messages), timeout=ADVICE_TIMEOUT_SECONDS)
+        latency['generation_ms'] = (time.time() - t_gen_start) * 1000
+        
+        response = parse_crew_response(result_text, disease_name, weather_condition)
+        _attach_sources(response, source_docs)
+        
+        latency['total_ms'] = (time.time() - start_time) * 1000
+        response['latency_breakdown'] = latency
+        
+        if use_cache:
+            _advice_cache.set(cache_key, response)
+        
+        logger.info(
+            f"✅ Advice generated (async) in {latency['total_ms']:.0f}ms "
+            f"(retrieval={latency['retrieval_ms']:.0f}ms "
+            f"rerank={latency['rerank_ms']:.0f}ms "
+            f"generation={latency['generation_ms']:.0f}ms "
+            f"RAG={'ON' if source_docs else 'OFF'})"
+        )
+        return response
+    
+    except asyncio.TimeoutError:
+        logger.error(f"❌ LLM call timed out after {ADVICE_TIMEOUT_SECONDS:.0f} seconds")
+        latency['generation_ms'] = (time.time() - t_gen_start) * 1000
+        latency['total_ms'] = (time.time() - start_time) * 1000
+        fb = get_fallback_advice(disease_name, weather_condition)
+        fb['latency_breakdown'] = latency
+        return fb
+    except ValueError as e:
+        logger.error(f"Configuration error: {str(e)}")
+        latency['total_ms'] = (time.time() - start_time) * 1000
+        return _unavailable_advice(e, disease_name, weather_condition, latency)
+    except Exception as e:
+        logger.error(f"❌ Async LLM error: {str(e)}")
+        latency['total_ms'] = (time.time() - start_time) * 1000
+        fb = get_fallback_advice(disease_name, weather_condition)
+        fb['latency_breakdown'] = latency
+        return fb
+
+
+# =============================================================================
+# Streaming Interface (Server-Sent Events)
+# =============================================================================
+
+async def _astream_completion(messages: list[dict], timeout: float) -> AsyncIterator[str]:
+    """Stream Groq tokens through litellm; the whole stream shares one deadline."""
+    global _async_api_key
+    import litellm
+    
+    if _async_api_key is None:
+        _async_api_key = _get_groq_api_key()
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    
+    stream = await asyncio.wait_for(
+        litellm.acompletion(
+            model=LLM_MODEL,
+            api_key=_async_api_key,
+            messages=messages,
+            temperature=0,
+            stream=True,
+        ),
+        timeout=timeout,
+    )
+    chunks = stream.__aiter__()
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        try:
+            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+        except StopAsyncIteration:
+            return
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+async def _pump_completion(messages: list[dict], timeout: float, queue: asyncio.Queue) -> float:
+    """
+    Stream the completion into queue while holding an LLM slot.
+    
+    The slot is released as soon as Groq finishes, not when the client has
+    read the last token, so a slow SSE reader cannot starve other requests.
+    Returns the time generation started (after the slot was acquired).
+    """
+    try:
+        async with _get_llm_semaphore():
+            started = time.time()
+            async for delta in _astream_completion(messages, timeout):
+                queue.put_nowait(delta)
+            return started
+    finally:
+        queue.put_nowait(None)
+
+
+async def stream_agri_advice(
+    disease_name: str,
+    weather_condition: str = "Partly Cloudy",
+    weather_forecast: Optional[str] = None,
+    rag_enabled: bool = True,
+    use_reranker: bool = True,
+    use_cache: bool = True,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    weather_context: Optional[Awaitable[Tuple[Optional[str], Optional[str], Optional[float], Optional[float]]]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Incremental version of get_agri_advice_async() for the SSE endpoint.
+    
+    Yields events as {"event": name, "data": payload}:
+    - retrieval: source citations + retrieval/rerank latency (sent before the LLM call)
+    - token: {"text": ...} raw LLM output deltas
+    - advice: the final parsed response (same shape as get_agri_advice_async)
+    
+    Cache hits and healthy plants skip straight to retrieval + advice.
+    
+    weather_context, if given, resolves to (weather_condition,
+    weather_forecast, latitude, longitude) and replaces those arguments.
+    The knowledge base is searched (and the retrieval event sent) while it
+    is pending; only the cache lookup and generation wait for the weather.
+    """
+    start_time = time.time()
+    latency = {'retrieval_ms': 0.0, 'rerank_ms': 0.0, 'generation_ms': 0.0, 'total_ms': 0.0}
+    disease_name = disease_name.strip()
+    
+    async def retrieve() -> tuple[str, list[dict]]:
+        try:
+            context, docs, retrieval_latency = await retrieve_context_async(
+                disease_name, k=5,
+                use_reranker=use_reranker,
+                skip_cache=not use_cache,
+            )
+            _merge_retrieval_latency(latency, retrieval_latency)
+            return context, docs
+        except Exception as e:
+            logger.warning(f"⚠️ Retrieval failed, continuing without RAG: {e}")
+            return "", []
+    
+    def retrieval_event(source_docs: list[dict]) -> Dict[str, Any]:
+        return {"event": "retrieval", "data": {
+            "sources": _format_sources(source_docs) if source_docs else [],
+            "rag_enabled": bool(source_docs),
+            "cached": False,
+            "retrieval_ms": latency['retrieval_ms'],
+            "rerank_ms": latency['rerank_ms'],
+            **{key: latency[key] for key in _RERANK_BATCH_KEYS if key in latency},
+        }}
+    
+    retrieved_context = ""
+    source_docs = []
+    retrieval_sent = False
+    if weather_context is not None:
+        # The weather lookup is still running: search the knowledge base meanwhile
+        if rag_enabled and not _is_healthy(disease_name):
+            retrieved_context, source_docs = await retrieve()
+            yield retrieval_event(source_docs)
+            retrieval_sent = True
+        weather_condition, weather_forecast, latitude, longitude = await weather_context
+    weather_condition = (weather_condition or "Unknown").strip()
+    
+    cache_key = make_advice_key(
+        disease_name, weather_condition, weather_forecast,
+        latitude=latitude, longitude=longitude,
+        rag_enabled=rag_enabled, use_reranker=use_reranker,
+    )
+    if use_cache:
+        cached = _advice_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"📦 Streaming cached advice for: {disease_name}")
+            if not retrieval_sent:
+                yield {"event": "retrieval", "data": {
+                    "sources": cached.get("sources", []),
+                    "rag_enabled": cached.get("rag_enabled", False),
+                    "cached": True,
+                }}
+            yield {"event": "advice", "data": cached}
+            return
+    
+    if _is_healthy(disease_name):
+        response = _healthy_advice(weather_condition, latency)
+        if use_cache:
+            _advice_cache.set(cache_key, response)
+        yield {"event": "retrieval", "data": {"sources": [], "rag_enabled": False, "cached": False}}
+        yield {"event": "advice", "data": response}
+        return
+    
+    # --- Retrieval (first bytes to the client) ---
+    if not retrieval_sent:
+        if rag_enabled:
+            retrieved_context, source_docs = await retrieve()
+        yield retrieval_event(source_docs)
+    
+    # --- Generation (token stream) ---
+    messages = build_advice_messages(
+        disease_name, weather_condition, retrieved_context, weather_forecast or ""
+    )
+    t_gen_start = time.time()
+    parts = []
+    deltas: asyncio.Queue = asyncio.Queue()
+    producer = asyncio.create_task(_pump_completion(messages, ADVICE_TIMEOUT_SECONDS, deltas))
+    try:
+        try:
+            while (delta := await deltas.get()) is not None:
+                parts.append(delta)
+                yield {"event": "token", "data": {"text": delta}}
+            t_gen_start = await producer
+        finally:
+            # Client went away mid-stream: stop the upstream request
+            if not producer.done():
+                producer.cancel()
+        latency['generation_ms'] = (time.time() - t_gen_start) * 1000
+        
+        response = parse_crew_response("".join(parts).strip(), disease_name, weather_condition)
+        _attach_sources(response, source_docs)
+        latency['total_ms'] = (time.time() - start_time) * 1000
+        response['latency_breakdown'] = latency
+        if use_cache:
+            _advice_cache.set(cache_key, response)
+        logger.info(
+            f"✅ Advice streamed in {latency['total_ms']:.0f}ms "
+            f"(retrieval={latency['retrieval_ms']:.0f}ms "
+            f"rerank={latency['rerank_ms']:.0f}ms "
+            f"generation={latency['generation_ms']:.0f}ms "
+            f"RAG={'ON' if source_docs else 'OFF'})"
+        )
+    except asyncio.TimeoutError:
+        logger.error(f"❌ LLM stream timed out after {ADVICE_TIMEOUT_SECONDS:.0f} seconds")
+        latency['generation_ms'] = (time.time() - t_gen_start) * 1000
+        latency['total_ms'] = (time.time() - start_time) * 1000
+        response = get_fallback_advice(disease_name, weather_condition)
+        response['latency_breakdown'] = latency
+    except ValueError as e:
+        logger.error(f"Configuration error: {str(e)}")
+        latency['total_ms'] = (time.time() - start_time) * 1000
+        response = _unavailable_advice(e, disease_name, weather_condition, latency)
+    except Exception as e:
+        logger.error(f"❌ LLM stream error: {str(e)}")
+        latency['total_ms'] = (time.time() - start_time) * 1000
+        response = get_fallback_advice(disease_name, weather_condition)
+        response['latency_breakdown'] = latency
+    
+    yield {"event": "advice", "data": response}
+
+
 def get_fallback_advice(disease_name: str, weather_condition: str) -> Dict[str, Any]:
     """
     Provide fallback treatment advice when AI system is unavailable.
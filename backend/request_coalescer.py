@@ -0,0 +1,172 @@
+"""
+AgriSense Request Coalescer - Single-Flight for Expensive Calls
+
+When a field crew scans a row of infected plants, many identical advice
+requests arrive within seconds and all miss the advice cache at once.
+SingleFlight lets the first caller for a key (the "leader") run the work
+while every concurrent caller with the same key waits and receives the
+leader's result instead of launching its own Groq/Chroma call.
+
+Features:
+- Thread-safe SingleFlight for executor-thread callers
+- AsyncSingleFlight for coroutine callers (native asyncio path)
+- Exceptions raised by the leader are re-raised in every waiter
+- Each waiter gets its own deep copy of the result (no shared mutation)
+- Leader / coalesced counters for monitoring
+"""
+
+import copy
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger("RequestCoalescer")
+
+
+class _Call:
+    """In-flight call shared by the leader and its waiters."""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution."""
+
+    def __init__(self, name: str = "default", copy_results: bool = True):
+        self.name = name
+        self.copy_results = copy_results
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        self._leaders = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn() once per key among concurrent callers.
+
+        Args:
+            key: Identity of the work (e.g. the advice cache key)
+            fn: Zero-argument callable doing the actual work
+
+        Returns:
+            fn()'s result (a deep copy for waiters when copy_results=True)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._leaders += 1
+                leader = True
+
+        if not leader:
+            logger.info(f"🔗 [{self.name}] Joining in-flight call for: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result) if self.copy_results else call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+            if call.waiters:
+                logger.info(f"🔗 [{self.name}] Shared result with {call.waiters} waiter(s) for: {key}")
+
+        return copy.deepcopy(call.result) if (self.copy_results and call.waiters) else call.result
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed."""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Leader / coalesced counters."""
+        with self._lock:
+            total = self._leaders + self._coalesced
+            return {
+                "in_flight": len(self._calls),
+                "executions": self._leaders,
+                "coalesced": self._coalesced,
+                "coalesce_rate": round(self._coalesced / total, 4) if total else 0.0,
+            }
+
+
+class AsyncSingleFlight:
+    """
+    asyncio flavour of SingleFlight for coroutine callers.
+
+    The shared work runs in its own Task, so a caller that is cancelled
+    (e.g. the HTTP client disconnected) does not cancel the generation the
+    other waiters are relying on.
+    """
+
+    def __init__(self, name: str = "default", copy_results: bool = True):
+        self.name = name
+        self.copy_results = copy_results
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+        self._leaders = 0
+        self._coalesced = 0
+
+    async def do(self, key: Hashable, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await coro_fn() once per key among concurrent callers.
+
+        Args:
+            key: Identity of the work (e.g. the advice cache key)
+            coro_fn: Zero-argument callable returning an awaitable
+
+        Returns:
+            The shared result (a deep copy per caller when copy_results=True)
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn())
+            self._calls[key] = task
+            self._leaders += 1
+            task.add_done_callback(lambda t, k=key: self._on_done(k, t))
+        else:
+            self._coalesced += 1
+            logger.info(f"🔗 [{self.name}] Joining in-flight call for: {key}")
+
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result) if self.copy_results else result
+
+    def _on_done(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed."""
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Leader / coalesced counters."""
+        total = self._leaders + self._coalesced
+        return {
+            "in_flight": len(self._calls),
+            "executions": self._leaders,
+            "coalesced": self._coalesced,
+            "coalesce_rate": round(self._coalesced / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,165 @@
+"""
+AgriSense Rerank Batcher - Micro-Batching Cross-Encoder Service
+
+IndustryVectorStore._rerank scores one query's (query, chunk) pairs at a
+time. When many requests arrive together the MiniLM cross-encoder runs
+many small forward passes instead of one efficient batched pass.
+
+MicroBatchReranker puts a single background worker in front of the model:
+callers enqueue their pairs and block; the worker collects requests for up
+to RERANK_BATCH_MAX_WAIT_MS or RERANK_BATCH_MAX_PAIRS, runs one batched
+predict() and fans the scores back out.
+
+Features:
+- Drop-in for CrossEncoder.predict(pairs) (returns per-request scores)
+- Per-request batch info (pairs in batch, requests in batch, queue wait)
+- Cumulative batch-size / queue-wait counters for tuning the window
+- A model error fails every request in that batch (callers fall back)
+
+Configuration (environment):
+- RERANK_BATCH_ENABLED: "false" scores each request directly (default true)
+- RERANK_BATCH_MAX_WAIT_MS: collection window after the first request (default 5)
+- RERANK_BATCH_MAX_PAIRS: flush once this many pairs are queued (default 128)
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger("RerankBatcher")
+
+
+BATCH_ENABLED = os.getenv("RERANK_BATCH_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+DEFAULT_MAX_WAIT_MS = float(os.getenv("RERANK_BATCH_MAX_WAIT_MS", "5"))
+DEFAULT_MAX_PAIRS = int(os.getenv("RERANK_BATCH_MAX_PAIRS", "128"))
+
+
+class _Request:
+    __slots__ = ("pairs", "future", "enqueued_at")
+
+    def __init__(self, pairs: List[Tuple[str, str]]):
+        self.pairs = pairs
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatchReranker:
+    """Collects concurrent rerank requests into batched cross-encoder calls."""
+
+    def __init__(
+        self,
+        model: Any,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        max_batch_pairs: int = DEFAULT_MAX_PAIRS,
+    ):
+        self.model = model
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.max_batch_pairs = max(1, max_batch_pairs)
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._lock = threading.Lock()
+
+        self._batches = 0
+        self._requests = 0
+        self._pairs = 0
+        self._queue_wait_ms_total = 0.0
+        self._max_batch_seen = 0
+
+        self._worker = threading.Thread(target=self._run, name="rerank-batcher", daemon=True)
+        self._worker.start()
+        logger.info(
+            f"🔄 Rerank batcher ready (window={max_wait_ms:.0f}ms, max_pairs={self.max_batch_pairs})"
+        )
+
+    def predict(self, pairs: Sequence[Tuple[str, str]]) -> Tuple[List[float], Dict[str, float]]:
+        """
+        Score pairs through the shared batch.
+
+        Returns:
+            (scores, batch_info) where batch_info has rerank_batch_size
+            (pairs in the batch this request rode in), rerank_batch_requests
+            and rerank_queue_wait_ms
+        """
+        if not pairs:
+            return [], {"rerank_batch_size": 0, "rerank_batch_requests": 0, "rerank_queue_wait_ms": 0.0}
+        request = _Request(list(pairs))
+        self._queue.put(request)
+        return request.future.result()
+
+    def _collect(self) -> List[_Request]:
+        """Block for the first request, then gather more until the window closes or the batch is full."""
+        batch = [self._queue.get()]
+        n_pairs = len(batch[0].pairs)
+        deadline = time.perf_counter() + self.max_wait_s
+        while n_pairs < self.max_batch_pairs:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            n_pairs += len(request.pairs)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            all_pairs = [pair for request in batch for pair in request.pairs]
+
+            try:
+                scores = self.model.predict(all_pairs, batch_size=len(all_pairs))
+            except Exception as e:
+                logger.error(f"❌ Batched rerank failed ({len(all_pairs)} pairs): {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                n = len(request.pairs)
+                queue_wait_ms = (started - request.enqueued_at) * 1000
+                request.future.set_result((
+                    [float(s) for s in scores[offset:offset + n]],
+                    {
+                        "rerank_batch_size": len(all_pairs),
+                        "rerank_batch_requests": len(batch),
+                        "rerank_queue_wait_ms": round(queue_wait_ms, 3),
+                    },
+                ))
+                offset += n
+                with self._lock:
+                    self._queue_wait_ms_total += queue_wait_ms
+
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._pairs += len(all_pairs)
+                self._max_batch_seen = max(self._max_batch_seen, len(all_pairs))
+
+            if len(batch) > 1:
+                logger.debug(
+                    f"Reranked {len(all_pairs)} pairs for {len(batch)} requests in "
+                    f"{(time.perf_counter() - started) * 1000:.0f}ms"
+                )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batch-size and queue-wait counters."""
+        with self._lock:
+            return {
+                "max_wait_ms": self.max_wait_s * 1000,
+                "max_batch_pairs": self.max_batch_pairs,
+                "batches": self._batches,
+                "requests": self._requests,
+                "pairs": self._pairs,
+                "avg_batch_pairs": round(self._pairs / self._batches, 2) if self._batches else 0.0,
+                "avg_batch_requests": round(self._requests / self._batches, 2) if self._batches else 0.0,
+                "max_batch_pairs_seen": self._max_batch_seen,
+                "avg_queue_wait_ms": round(self._queue_wait_ms_total / self._requests, 3) if self._requests else 0.0,
+                "queue_depth": self._queue.qsize(),
+            }
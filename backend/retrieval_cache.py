@@ -0,0 +1,353 @@
+"""
+AgriSense Retrieval Cache - Persistent Embedding and Rerank Score Cache
+
+The in-memory `_query_cache` of IndustryVectorStore dies with the process,
+so every deploy (and every extra Uvicorn worker) pays the full query
+embedding and cross-encoder cost again for the same popular queries.
+This module keeps those two pure functions on disk in SQLite:
+
+    embed(model, text)              -> vector
+    rerank(model, query, document)  -> score
+
+Features:
+- Keyed by model name + SHA-1 of the text (no raw text stored)
+- SQLite in WAL mode: shared safely across worker processes and restarts
+- Per-table row limits with least-recently-used pruning
+- Invalidation when the Chroma collection is rebuilt (collection version)
+- Fails open: any SQLite error just means a cache miss
+- CachedEmbeddings wrapper for LangChain / Chroma query embeddings
+
+Configuration (environment):
+- RAG_SCORE_CACHE_ENABLED: "false" disables the cache (default true)
+- RAG_SCORE_CACHE_PATH: SQLite file (default ./.rag_cache/scores.sqlite3)
+- RAG_SCORE_CACHE_MAX_EMBEDDINGS: max cached query vectors (default 10000)
+- RAG_SCORE_CACHE_MAX_PAIRS: max cached (query, chunk) scores (default 200000)
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger("RetrievalCache")
+
+
+CACHE_ENABLED = os.getenv("RAG_SCORE_CACHE_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+DEFAULT_CACHE_PATH = os.getenv("RAG_SCORE_CACHE_PATH", "./.rag_cache/scores.sqlite3")
+DEFAULT_MAX_EMBEDDINGS = int(os.getenv("RAG_SCORE_CACHE_MAX_EMBEDDINGS", "10000"))
+DEFAULT_MAX_PAIRS = int(os.getenv("RAG_SCORE_CACHE_MAX_PAIRS", "200000"))
+
+# Prune at most once per this many inserts (COUNT(*) is not free)
+_PRUNE_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS embeddings (
+    model     TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector    BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+CREATE TABLE IF NOT EXISTS pair_scores (
+    model      TEXT NOT NULL,
+    query_hash TEXT NOT NULL,
+    doc_hash   TEXT NOT NULL,
+    score      REAL NOT NULL,
+    last_used  REAL NOT NULL,
+    PRIMARY KEY (model, query_hash, doc_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_lru ON embeddings (last_used);
+CREATE INDEX IF NOT EXISTS idx_pair_scores_lru ON pair_scores (last_used);
+"""
+
+
+def text_hash(text: str) -> str:
+    """Stable key for a piece of text."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+# =============================================================================
+# SQLite Store
+# =============================================================================
+
+class PersistentScoreCache:
+    """SQLite-backed cache for query embeddings and cross-encoder pair scores."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_embeddings: int = DEFAULT_MAX_EMBEDDINGS,
+        max_pairs: int = DEFAULT_MAX_PAIRS,
+    ):
+        self.path = path
+        self.max_embeddings = max(1, max_embeddings)
+        self.max_pairs = max(1, max_pairs)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._available = True
+
+        self._writes_since_prune = 0
+        self._embedding_hits = 0
+        self._embedding_misses = 0
+        self._pair_hits = 0
+        self._pair_misses = 0
+
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn().executescript(_SCHEMA)
+            logger.info(f"💾 Retrieval score cache at {path}")
+        except Exception as e:
+            logger.warning(f"⚠️ Retrieval score cache disabled ({path}): {e}")
+            self._available = False
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not thread-safe)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @property
+    def available(self) -> bool:
+        return self._available
+
+    # -------------------------------------------------------------------------
+    # Collection versioning
+    # -------------------------------------------------------------------------
+
+    def ensure_collection_version(self, version: str) -> bool:
+        """
+        Drop all cached entries if they were computed against another collection.
+
+        Returns True if the cache was invalidated.
+        """
+        if not self._available:
+            return False
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value FROM meta WHERE key = 'collection_version'").fetchone()
+            if row and row[0] == version:
+                return False
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM embeddings")
+                conn.execute("DELETE FROM pair_scores")
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('collection_version', ?)",
+                    (version,),
+                )
+            if row:
+                logger.info(f"🗑️ Retrieval score cache invalidated (collection {row[0]} → {version})")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Retrieval score cache version check failed: {e}")
+            return False
+
+    # -------------------------------------------------------------------------
+    # Query embeddings
+    # -------------------------------------------------------------------------
+
+    def get_embedding(self, model: str, text: str) -> Optional[List[float]]:
+        if not self._available:
+            return None
+        key = text_hash(text)
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT vector FROM embeddings WHERE model = ? AND text_hash = ?",
+                (model, key),
+            ).fetchone()
+            if row is None:
+                self._embedding_misses += 1
+                return None
+            conn.execute(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                (time.time(), model, key),
+            )
+            self._embedding_hits += 1
+            return np.frombuffer(row[0], dtype=np.float32).tolist()
+        except Exception as e:
+            logger.debug(f"Embedding cache read failed: {e}")
+            return None
+
+    def set_embedding(self, model: str, text: str, vector: Sequence[float]):
+        if not self._available:
+            return
+        try:
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            self._conn().execute(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                (model, text_hash(text), blob, time.time()),
+            )
+            self._after_write(1)
+        except Exception as e:
+            logger.debug(f"Embedding cache write failed: {e}")
+
+    # -------------------------------------------------------------------------
+    # Cross-encoder pair scores
+    # -------------------------------------------------------------------------
+
+    def get_pair_scores(self, model: str, query: str, documents: Sequence[str]) -> Dict[int, float]:
+        """
+        Look up cached scores for (query, documents[i]).
+
+        Returns:
+            {index: score} for the documents that were cached
+        """
+        if not self._available or not documents:
+            return {}
+        q_hash = text_hash(query)
+        doc_hashes = [text_hash(d) for d in documents]
+        try:
+            conn = self._conn()
+            placeholders = ",".join("?" * len(doc_hashes))
+            rows = conn.execute(
+                f"SELECT doc_hash, score FROM pair_scores "
+                f"WHERE model = ? AND query_hash = ? AND doc_hash IN ({placeholders})",
+                (model, q_hash, *doc_hashes),
+            ).fetchall()
+            by_hash = dict(rows)
+            if by_hash:
+                conn.execute(
+                    f"UPDATE pair_scores SET last_used = ? "
+                    f"WHERE model = ? AND query_hash = ? AND doc_hash IN ({placeholders})",
+                    (time.time(), model, q_hash, *doc_hashes),
+                )
+            found = {i: by_hash[h] for i, h in enumerate(doc_hashes) if h in by_hash}
+            self._pair_hits += len(found)
+            self._pair_misses += len(documents) - len(found)
+            return found
+        except Exception as e:
+            logger.debug(f"Pair score cache read failed: {e}")
+            return {}
+
+    def set_pair_scores(self, model: str, query: str, scored: Sequence[Tuple[str, float]]):
+        """Store [(document, score), ...] for one query."""
+        if not self._available or not scored:
+            return
+        q_hash = text_hash(query)
+        now = time.time()
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO pair_scores (model, query_hash, doc_hash, score, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(model, q_hash, text_hash(doc), float(score), now) for doc, score in scored],
+                )
+            self._after_write(len(scored))
+        except Exception as e:
+            logger.debug(f"Pair score cache write failed: {e}")
+
+    # -------------------------------------------------------------------------
+    # Size limits
+    # -------------------------------------------------------------------------
+
+    def _after_write(self, n: int):
+        with self._lock:
+            self._writes_since_prune += n
+            if self._writes_since_prune < _PRUNE_EVERY:
+                return
+            self._writes_since_prune = 0
+        self.prune()
+
+    def prune(self) -> int:
+        """Delete least-recently-used rows above the size limits. Returns rows removed."""
+        if not self._available:
+            return 0
+        removed = 0
+        try:
+            conn = self._conn()
+            for table, limit in (("embeddings", self.max_embeddings), ("pair_scores", self.max_pairs)):
+                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                excess = count - limit
+                if excess > 0:
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE rowid IN "
+                        f"(SELECT rowid FROM {table} ORDER BY last_used ASC LIMIT ?)",
+                        (excess,),
+                    )
+                    removed += excess
+            if removed:
+                logger.debug(f"Pruned {removed} retrieval cache rows")
+        except Exception as e:
+            logger.debug(f"Retrieval cache prune failed: {e}")
+        return removed
+
+    def clear(self):
+        """Drop all cached embeddings and scores."""
+        if not self._available:
+            return
+        try:
+            conn = self._conn()
+            conn.execute("DELETE FROM embeddings")
+            conn.execute("DELETE FROM pair_scores")
+        except Exception as e:
+            logger.warning(f"⚠️ Retrieval cache clear failed: {e}")
+
+    def get_stats(self) -> Dict[str, object]:
+        """Row counts and hit/miss counters (counters are per process)."""
+        stats: Dict[str, object] = {
+            "available": self._available,
+            "path": self.path,
+            "max_embeddings": self.max_embeddings,
+            "max_pairs": self.max_pairs,
+            "embedding_hits": self._embedding_hits,
+            "embedding_misses": self._embedding_misses,
+            "pair_hits": self._pair_hits,
+            "pair_misses": self._pair_misses,
+        }
+        if self._available:
+            try:
+                conn = self._conn()
+                stats["embeddings"] = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                stats["pair_scores"] = conn.execute("SELECT COUNT(*) FROM pair_scores").fetchone()[0]
+                row = conn.execute("SELECT value FROM meta WHERE key = 'collection_version'").fetchone()
+                stats["collection_version"] = row[0] if row else None
+            except Exception as e:
+                stats["error"] = str(e)
+        return stats
+
+
+# =============================================================================
+# LangChain Embeddings Wrapper
+# =============================================================================
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wrap an Embeddings object so embed_query() is served from the score cache.
+
+    embed_documents() is passed through untouched: document vectors are
+    computed once at build time and already persisted by Chroma.
+    """
+
+    def __init__(self, inner: Embeddings, model_name: str, cache: PersistentScoreCache):
+        self.inner = inner
+        self.model_name = model_name
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get_embedding(self.model_name, text)
+        if vector is not None:
+            return vector
+        vector = self.inner.embed_query(text)
+        self.cache.set_embedding(self.model_name, text, vector)
+        return vector
@@ -6,20 +6,47 @@ State machine that orchestrates the full ESP32-CAM scanning pipeline:
   Disease classification -> RAG advice -> Result broadcast -> Resume
 
 Uses an event pub/sub system to push real-time updates to WebSocket consumers.
+Blocking work never runs on the event loop: decode/YOLO/classification go to
+a bounded CPU pool and weather/sync advice to a bounded network pool
+(scan_executors), with event-loop lag measured while a scan runs.
+
+Scans are pipelined by default: moving to position N+1 and settling overlaps
+inference on frame N, advice is fetched in the background and attached to
+the stored result when ready, and settle time scales with servo travel
+instead of fixed sleeps, so a sweep is bounded by servo travel rather than
+inference and LLM latency.
+
+Scan paths come from a pluggable planner (scan_planner): a full serpentine,
+coarse-to-fine (dense only around detections of a coarse pass) or a
+revisit of the previous scan's hotspots.
+
+Configuration (environment):
+- SCAN_MAX_INFLIGHT_FRAMES: frames analyzed concurrently while pipelined (default 2)
 """
 
+import os
 import asyncio
 import logging
 import time
+import json
 import base64
 from datetime import datetime
 from dataclasses import dataclass, field, asdict
 from enum import Enum
-from typing import List, Optional, Callable, Any, Dict, Tuple
+from typing import List, Optional, Callable, Any, Dict, Hashable, Tuple
+
+from image_preprocessing import DecodedImage, decode_image, crop_box, CLASSIFIER_SIZE
+from scan_executors import BoundedExecutor, LoopLagMonitor, cpu_executor, net_executor
+from frame_channel import FrameStore
+from scan_subscribers import ScanSubscriber, SubscriberHub
+from scan_planner import ScanPlanner, create_planner, settle_time, travel
 
 logger = logging.getLogger("AgriSense.Scanner")
 
 
+MAX_INFLIGHT_FRAMES = max(1, int(os.getenv("SCAN_MAX_INFLIGHT_FRAMES", "2")))
+
+
 class ScanState(str, Enum):
     IDLE = "idle"
     CONNECTING = "connecting"
@@ -39,9 +66,24 @@ class ScanEvent:
     state: str
     data: dict = field(default_factory=dict)
     timestamp: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    # JSON per payload variant, shared by every subscriber the event is fanned out to
+    _encoded: dict = field(default_factory=dict, init=False, repr=False, compare=False)
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        return {"event_type": self.event_type, "state": self.state, "data": self.data, "timestamp": self.timestamp}
+
+    def to_json(self, variant: Hashable = None, extra_data: dict = None) -> str:
+        """
+        Serialized event, encoded once per variant (e.g. with a base64 frame
+        added for legacy subscribers) no matter how many subscribers send it.
+        """
+        encoded = self._encoded.get(variant)
+        if encoded is None:
+            payload = self.to_dict()
+            if extra_data:
+                payload["data"] = {**self.data, **extra_data}
+            encoded = self._encoded[variant] = json.dumps(payload, separators=(",", ":"))
+        return encoded
 
 
 @dataclass
@@ -53,8 +95,11 @@ class ScanResult:
     disease_confidence: Optional[float] = None
     classification_model: Optional[str] = None
     all_predictions: Optional[dict] = None
+    leaves: Optional[list] = None  # Per-leaf crop classifications (crop-to-classify)
     advice: Optional[dict] = None
-    image_base64: Optional[str] = None
+    advice_pending: bool = False  # Pipelined scans attach advice after the result is stored
+    position: Optional[dict] = None  # {"pan", "tilt"} where the leaf was found (hotspot revisits)
+    frame_id: Optional[int] = None  # Frame in the scanner's FrameStore (pinned for the scan)
     timestamp: str = field(default_factory=lambda: datetime.utcnow().isoformat())
 
     def to_dict(self) -> dict:
@@ -69,8 +114,13 @@ class RoboticsScanner:
     - esp32_client: ESP32Client for hardware communication
     - yolo_detector: YOLODetector for leaf detection
     - classify_fn: Callable for disease classification (vision_engine.predict_disease)
-    - advice_fn: Callable for RAG advice (get_agri_advice)
+    - classify_batch_fn: Optional batch classifier for leaf crops (vision_engine.predict_batch);
+      without it the full frame is classified
+    - advice_fn: Callable for RAG advice (get_agri_advice_async or get_agri_advice)
     - weather_fn: Callable for weather data (get_weather_forecast)
+    - cpu_pool / net_pool: BoundedExecutors for inference and network calls
+      (default: new pools sized from SCAN_* environment variables)
+    - frame_store: FrameStore holding captured frames that events reference by id
     """
 
     def __init__(
@@ -80,28 +130,49 @@ class RoboticsScanner:
         classify_fn: Callable,
         advice_fn: Callable,
         weather_fn: Callable = None,
+        classify_batch_fn: Callable = None,
+        cpu_pool: BoundedExecutor = None,
+        net_pool: BoundedExecutor = None,
+        frame_store: FrameStore = None,
     ):
         self.esp32 = esp32_client
         self.yolo = yolo_detector
         self.classify = classify_fn
+        self.classify_batch = classify_batch_fn
+        self.cpu_pool = cpu_pool or cpu_executor()
+        self.net_pool = net_pool or net_executor()
+        self._loop_lag = LoopLagMonitor()
+        self.frames = frame_store or FrameStore()
         self.get_advice = advice_fn
         self.get_weather = weather_fn
 
         self.state = ScanState.IDLE
         self._scan_task: Optional[asyncio.Task] = None
-        self._subscribers: List[asyncio.Queue] = []
+        self._subscribers = SubscriberHub()
         self._results: List[ScanResult] = []
         self._model_type: str = "mobilenet"
         self._detection_confidence: float = 0.25
         self._scan_index: int = 0
 
+        # Crop-to-classify: classify each detected leaf instead of the whole frame
+        self._crop_to_classify: bool = True
+        self._crop_padding: float = 0.15
+        self._max_leaves: int = 8
+
         # Raster scan configuration
         self._pan_min: int = 0
         self._pan_max: int = 180
         self._tilt_min: int = 30
         self._tilt_max: int = 120
         self._scan_step: int = 15
-        self._settle_delay: float = 0.3
+        self._planner: Optional[ScanPlanner] = None
+        self._hits: List[Tuple[int, int]] = []  # Positions with a confident detection in the current pass
+        self._travel_deg: int = 0
+
+        # Pipelined scanning: keep moving while earlier frames are analyzed
+        self._pipelined: bool = True
+        self._max_inflight_frames: int = MAX_INFLIGHT_FRAMES
+        self._pending: set = set()
 
         # Scan state tracking
         self._scan_positions: List[Tuple[int, int]] = []
@@ -109,32 +180,74 @@ class RoboticsScanner:
 
     @property
     def scan_results(self) -> List[dict]:
-        return [r.to_dict() for r in self._results]
+        """Stored results in scan order; images are referenced by frame_id (GET /esp32/frames/{frame_id})."""
+        # Pipelined analyses can finish out of order
+        return [r.to_dict() for r in sorted(self._results, key=lambda r: r.scan_index)]
+
+    async def scan_result_images(self, results: List[dict]) -> List[Optional[str]]:
+        """Base64 JPEG per scan_results entry, encoded on the CPU pool instead of the event loop."""
+        frame_ids = [r.get("frame_id") for r in results]
+        return await self.cpu_pool.run(
+            lambda: [self.frames.base64(f) if f is not None else None for f in frame_ids]
+        )
+
+    @property
+    def is_scanning(self) -> bool:
+        return self._scan_task is not None and not self._scan_task.done()
+
+    @property
+    def results_count(self) -> int:
+        return len(self._results)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Executor queue/latency counters and event-loop lag during the current or last scan."""
+        return {
+            "state": self.state.value,
+            "cpu_pool": self.cpu_pool.get_stats(),
+            "net_pool": self.net_pool.get_stats(),
+            "loop_lag": self._loop_lag.get_stats(),
+            "frames": self.frames.get_stats(),
+            "subscribers": self._subscribers.get_stats(),
+            "planner": self._planner_stats(),
+        }
+
+    def _planner_stats(self) -> Optional[Dict[str, Any]]:
+        if self._planner is None:
+            return None
+        return {
+            "strategy": self._planner.name,
+            "passes": self._planner.passes,
+            "positions_planned": len(self._scan_positions),
+            "positions_visited": self._current_position_index,
+            "travel_deg": self._travel_deg,
+        }
 
-    def subscribe(self) -> asyncio.Queue:
-        """Subscribe to scan events. Returns a queue that receives ScanEvent dicts."""
-        q: asyncio.Queue = asyncio.Queue(maxsize=100)
-        self._subscribers.append(q)
+    def subscribe(self, name: str = "") -> ScanSubscriber:
+        """
+        Subscribe to scan events. Returns a ScanSubscriber whose get() yields
+        ScanEvents: frame events are latest-wins, all others are delivered
+        in order (scan_subscribers).
+        """
+        sub = self._subscribers.subscribe(name)
         logger.info(f"WebSocket subscriber added. Total: {len(self._subscribers)}")
-        return q
+        return sub
 
-    def unsubscribe(self, q: asyncio.Queue):
-        """Remove a subscriber queue."""
-        if q in self._subscribers:
-            self._subscribers.remove(q)
+    def unsubscribe(self, sub: ScanSubscriber):
+        """Remove a subscriber."""
+        if self._subscribers.unsubscribe(sub):
             logger.info(f"WebSocket subscriber removed. Total: {len(self._subscribers)}")
 
+    def unsubscribe_all(self):
+        """Close every subscriber (their get() returns None), e.g. when the device is removed."""
+        self._subscribers.close_all()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
     async def _broadcast(self, event: ScanEvent):
-        """Push event to all subscriber queues."""
-        dead_queues = []
-        for q in self._subscribers:
-            try:
-                q.put_nowait(event)
-            except asyncio.QueueFull:
-                dead_queues.append(q)
-                logger.warning("Subscriber queue full, dropping subscriber")
-        for q in dead_queues:
-            self._subscribers.remove(q)
+        """Push event to all subscribers (never blocks; stalled subscribers are dropped)."""
+        self._subscribers.publish(event)
 
     async def _set_state(self, new_state: ScanState, data: dict = None):
         """Transition to a new state and broadcast the change."""
@@ -145,39 +258,6 @@ class RoboticsScanner:
             data=data or {},
         ))
 
-    # =========================================================================
-    # Raster Pattern
-    # =========================================================================
-
-    def _generate_raster_pattern(self) -> List[Tuple[int, int]]:
-        """
-        Generate raster scan positions: sweep pan left-to-right, step tilt down,
-        sweep right-to-left, step tilt down, repeat.
-
-        Returns list of (pan, tilt) tuples.
-        """
-        positions = []
-        tilt = self._tilt_min
-        left_to_right = True
-
-        while tilt <= self._tilt_max:
-            if left_to_right:
-                pan = self._pan_min
-                while pan <= self._pan_max:
-                    positions.append((pan, tilt))
-                    pan += self._scan_step
-            else:
-                pan = self._pan_max
-                while pan >= self._pan_min:
-                    positions.append((pan, tilt))
-                    pan -= self._scan_step
-
-            tilt += self._scan_step
-            left_to_right = not left_to_right
-
-        logger.info(f"Generated raster pattern with {len(positions)} positions")
-        return positions
-
     # =========================================================================
     # Public API
     # =========================================================================
@@ -191,9 +271,29 @@ class RoboticsScanner:
         tilt_min: int = 30,
         tilt_max: int = 120,
         step_size: int = 15,
+        crop_to_classify: bool = True,
+        crop_padding: float = 0.15,
+        max_leaves: int = 8,
+        pipelined: bool = True,
+        strategy: Optional[str] = None,
+        hotspot_radius: Optional[int] = None,
     ):
-        """Start the automated raster scanning loop."""
-        if self.state == ScanState.SCANNING:
+        """
+        Start the automated raster scanning loop.
+
+        With pipelined=True (default) the servos move to the next position
+        while the previous frame is analyzed, and advice is attached to
+        results asynchronously; pipelined=False runs each stage in turn.
+
+        strategy selects the path planner ('serpentine', 'coarse_to_fine' or
+        'hotspots'; default SCAN_PLANNER). 'hotspots' revisits the
+        positions of the previous scan's results within hotspot_radius
+        degrees (default: one step).
+
+        Raises:
+            ValueError: If the strategy is unknown
+        """
+        if self.is_scanning:
             logger.warning("Auto-scan already running")
             return
 
@@ -202,6 +302,12 @@ class RoboticsScanner:
         if not self.yolo.is_loaded:
             raise RuntimeError("YOLO detector not loaded")
 
+        hotspots = [(r.position["pan"], r.position["tilt"]) for r in self._results if r.position]
+        planner = create_planner(
+            strategy, pan_min, pan_max, tilt_min, tilt_max, step_size,
+            hotspots=hotspots, hotspot_radius=hotspot_radius,
+        )
+
         self._model_type = model_type
         self._detection_confidence = detection_confidence
         self._pan_min = pan_min
@@ -209,17 +315,25 @@ class RoboticsScanner:
         self._tilt_min = tilt_min
         self._tilt_max = tilt_max
         self._scan_step = step_size
+        self._crop_to_classify = crop_to_classify
+        self._crop_padding = crop_padding
+        self._max_leaves = max_leaves
+        self._pipelined = pipelined
         self._results = []
+        self.frames.unpin_all()
         self._scan_index = 0
 
-        # Generate raster scan positions
-        self._scan_positions = self._generate_raster_pattern()
+        # Positions are planned pass by pass as the scan runs
+        self._planner = planner
+        self._scan_positions = []
         self._current_position_index = 0
+        self._travel_deg = 0
 
         self._scan_task = asyncio.create_task(self._raster_scan_loop())
         logger.info(
-            f"Raster scan started: {len(self._scan_positions)} positions, "
-            f"model={model_type}, conf={detection_confidence}"
+            f"Raster scan started: {planner.name}, ~{planner.estimate_positions()} positions in the first pass, "
+            f"model={model_type}, conf={detection_confidence}, "
+            f"{'pipelined' if pipelined else 'sequential'}"
         )
 
     async def stop_scan(self):
@@ -230,6 +344,7 @@ class RoboticsScanner:
                 await self._scan_task
             except asyncio.CancelledError:
                 pass
+        self._settle_cancelled_advice()
 
         # Return servos to center position
         try:
@@ -245,8 +360,8 @@ class RoboticsScanner:
         if not self.esp32.is_connected:
             raise ConnectionError("ESP32-CAM not connected")
 
-        image_bytes = await self.esp32.capture_still()
-        detections = self.yolo.detect(image_bytes)
+        image_bytes = await self.esp32.capture_frame()
+        detections = await self.cpu_pool.run(self.yolo.detect, image_bytes)
         return [d.to_dict() for d in detections]
 
     async def manual_classify(self, model_type: str = "mobilenet") -> dict:
@@ -254,25 +369,17 @@ class RoboticsScanner:
         if not self.esp32.is_connected:
             raise ConnectionError("ESP32-CAM not connected")
 
-        image_bytes = await self.esp32.capture_still()
+        image_bytes = await self.esp32.capture_frame()
 
         # Run disease classification
-        result = self.classify(image_bytes, model_type=model_type)
+        result = await self.cpu_pool.run(self.classify, image_bytes, model_type=model_type)
 
         # Get RAG advice if disease detected
         advice = None
         disease_name = result.get("class", "")
         if disease_name and disease_name.lower() != "healthy":
             try:
-                weather_condition = None
-                weather_forecast = None
-                if self.get_weather:
-                    weather_condition, weather_forecast = self.get_weather()
-                advice = self.get_advice(
-                    disease_name,
-                    weather_condition=weather_condition,
-                    weather_forecast=weather_forecast,
-                )
+                advice = await self._fetch_advice(disease_name)
             except Exception as e:
                 logger.error(f"RAG advice failed: {e}")
 
@@ -283,76 +390,108 @@ class RoboticsScanner:
             "timestamp": datetime.utcnow().isoformat(),
         }
 
+    async def _fetch_advice(self, disease_name: str) -> dict:
+        """
+        Weather lookup + RAG advice without blocking the event loop.
+
+        advice_fn may be a coroutine function (get_agri_advice_async) or a
+        plain callable (get_agri_advice), which is run on the network pool.
+        """
+        weather_condition = None
+        weather_forecast = None
+        if self.get_weather:
+            weather_condition, weather_forecast = await self.net_pool.run(self.get_weather)
+
+        if asyncio.iscoroutinefunction(self.get_advice):
+            return await self.get_advice(
+                disease_name,
+                weather_condition=weather_condition,
+                weather_forecast=weather_forecast,
+            )
+        return await self.net_pool.run(
+            self.get_advice,
+            disease_name,
+            weather_condition=weather_condition,
+            weather_forecast=weather_forecast,
+        )
+
     # =========================================================================
     # Raster Scan Loop
     # =========================================================================
 
     async def _raster_scan_loop(self):
-        """Core raster scan loop: move to position, settle, capture, detect, classify if needed."""
+        """
+        Core raster scan loop: move to position, settle, capture, then analyze.
+
+        Pipelined mode hands each frame to a background analysis task and
+        moves on immediately, so servo travel to N+1 overlaps detection and
+        classification of frame N. At most max_inflight_frames analyses run
+        at once; the loop waits for a slot instead of queuing frames.
+        """
+        self._loop_lag.start()
+        inflight = asyncio.Semaphore(self._max_inflight_frames)
+        scan_start = time.perf_counter()
         try:
             await self._set_state(ScanState.SCANNING)
 
-            # Move to starting position
-            start_pan, start_tilt = self._scan_positions[0]
-            await self.esp32.set_position(start_pan, start_tilt)
-            await asyncio.sleep(1.0)  # Initial settle
+            previous = None
+            positions = self._planner.next_pass([], previous)
+            while positions:
+                self._scan_positions.extend(positions)
+                self._hits = []
+                frame_tasks = []
+
+                while self._current_position_index < len(self._scan_positions):
+                    index = self._current_position_index
+                    pan, tilt = self._scan_positions[index]
+
+                    # 1. Move to position and wait for it to settle
+                    await self._move_and_settle(previous, (pan, tilt))
+                    previous = (pan, tilt)
+
+                    # 2. Capture frame
+                    try:
+                        # Next stream frame after settling when a viewer keeps the stream open
+                        frame_bytes = await self.esp32.capture_frame(fresh=True)
+                    except Exception as e:
+                        logger.error(f"Capture failed at ({pan}, {tilt}): {e}")
+                        self._current_position_index += 1
+                        continue
+
+                    # 3. Detect / classify / advise (in the background when pipelined)
+                    if self._pipelined:
+                        await inflight.acquire()
+                        frame_tasks.append(
+                            self._spawn(self._analyze_frame(index, pan, tilt, frame_bytes), inflight.release)
+                        )
+                    else:
+                        await self._analyze_frame(index, pan, tilt, frame_bytes)
 
-            while self._current_position_index < len(self._scan_positions):
-                pan, tilt = self._scan_positions[self._current_position_index]
-
-                # 1. Move to position
-                await self.esp32.set_position(pan, tilt)
-                await asyncio.sleep(self._settle_delay)
-
-                # 2. Capture frame
-                try:
-                    frame_bytes = await self.esp32.capture_still()
-                except Exception as e:
-                    logger.error(f"Capture failed at ({pan}, {tilt}): {e}")
                     self._current_position_index += 1
-                    continue
 
-                # 3. Run YOLO detection
-                try:
-                    detections = self.yolo.detect(frame_bytes)
-                except Exception as e:
-                    logger.error(f"YOLO detection error: {e}")
-                    self._current_position_index += 1
-                    continue
-
-                # 4. Broadcast position + detections
-                frame_b64 = base64.b64encode(frame_bytes).decode("utf-8")
-                await self._broadcast(ScanEvent(
-                    event_type="frame",
-                    state=self.state.value,
-                    data={
-                        "frame_base64": frame_b64,
-                        "detections": [d.to_dict() for d in detections],
-                        "position": {"pan": pan, "tilt": tilt},
-                        "progress": f"{self._current_position_index + 1}/{len(self._scan_positions)}",
-                    },
-                ))
-
-                # 5. If leaf detected with sufficient confidence, classify
-                if detections:
-                    best = max(detections, key=lambda d: d.confidence)
-                    if best.confidence >= self._detection_confidence:
-                        await self._process_detection(detections, pan, tilt, frame_bytes)
-
-                        # Resume scanning state after processing
-                        if self.state != ScanState.ERROR:
-                            await self._set_state(ScanState.SCANNING)
-
-                self._current_position_index += 1
-                await asyncio.sleep(0.1)
+                # The next pass depends on where this one found leaves
+                if frame_tasks:
+                    await asyncio.gather(*frame_tasks, return_exceptions=True)
+                positions = self._planner.next_pass(self._hits, previous)
+
+            # Drain frames and advice still in flight
+            if self._pending:
+                logger.info(f"Waiting for {len(self._pending)} pending analysis/advice tasks")
+            while self._pending:
+                await asyncio.gather(*list(self._pending), return_exceptions=True)
 
             # Scan complete
+            elapsed = time.perf_counter() - scan_start
             await self._set_state(ScanState.IDLE, {
                 "reason": "scan_complete",
                 "total_positions": len(self._scan_positions),
                 "detections_found": len(self._results),
+                "duration_s": round(elapsed, 1),
+                "strategy": self._planner.name,
+                "passes": self._planner.passes,
+                "travel_deg": self._travel_deg,
             })
-            logger.info(f"Raster scan complete: {len(self._results)} detections processed")
+            logger.info(f"Raster scan complete in {elapsed:.1f}s: {len(self._results)} detections processed")
 
         except asyncio.CancelledError:
             logger.info("Raster scan cancelled")
@@ -361,33 +500,135 @@ class RoboticsScanner:
             logger.error(f"Raster scan error: {e}", exc_info=True)
             await self._set_state(ScanState.ERROR, {"message": str(e)})
         finally:
+            self._loop_lag.stop()
+            for task in list(self._pending):
+                task.cancel()
+            self._settle_cancelled_advice()
             # Return to center position
             try:
                 await self.esp32.motor_center()
             except Exception:
                 pass
 
-    async def _process_detection(self, detections: list, pan: int, tilt: int, image_bytes: bytes):
-        """Handle a leaf detection: classify disease, get RAG advice, store result."""
+    def _spawn(self, coro, on_done: Callable = None) -> asyncio.Task:
+        """Run a pipelined stage as a tracked task (drained at scan end, cancelled on stop)."""
+        task = asyncio.create_task(coro)
+        self._pending.add(task)
+
+        def done(t: asyncio.Task):
+            self._pending.discard(t)
+            if on_done is not None:
+                on_done()
+            if not t.cancelled() and t.exception() is not None:
+                logger.error(f"Pipelined scan task failed: {t.exception()}")
+
+        task.add_done_callback(done)
+        return task
+
+    async def _move_and_settle(self, previous: Optional[Tuple[int, int]], target: Tuple[int, int]):
+        """Command the move, then sleep only for whatever settle time the command round-trip did not already cover."""
+        settle = settle_time(previous, target)
+        self._travel_deg += travel(previous, target)
+        start = time.perf_counter()
+        await self.esp32.set_position(*target)
+        remaining = settle - (time.perf_counter() - start)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    async def _analyze_frame(self, index: int, pan: int, tilt: int, frame_bytes: bytes):
+        """Decode + YOLO one frame, broadcast it, and process a confident detection."""
+        # Decode once for both models, then run YOLO detection (CPU pool)
+        try:
+            frame, detections = await self.cpu_pool.run(self._decode_and_detect, frame_bytes)
+        except Exception as e:
+            logger.error(f"YOLO detection error at ({pan}, {tilt}): {e}")
+            return
+
+        # Broadcast position + detections
+        # Stored once; subscribers get it as a binary message or base64 (frame_channel)
+        frame_id = self.frames.put(frame_bytes)
+        await self._broadcast(ScanEvent(
+            event_type="frame",
+            state=self.state.value,
+            data={
+                "frame_id": frame_id,
+                # Detections are in these (original) pixels, whatever size the client receives
+                "frame_size": {"width": frame.orig_w, "height": frame.orig_h},
+                "detections": [d.to_dict() for d in detections],
+                "position": {"pan": pan, "tilt": tilt},
+                "progress": f"{index + 1}/{len(self._scan_positions)}",
+            },
+        ))
+
+        # If leaf detected with sufficient confidence, classify
+        if detections:
+            best = max(detections, key=lambda d: d.confidence)
+            if best.confidence >= self._detection_confidence:
+                self._hits.append((pan, tilt))
+                await self._process_detection(detections, pan, tilt, frame_bytes, frame, frame_id)
+
+                # Resume scanning state after processing
+                if not self._pipelined and self.state != ScanState.ERROR:
+                    await self._set_state(ScanState.SCANNING)
+
+    async def _stage(self, new_state: ScanState, data: dict = None):
+        """
+        Per-detection stage change. Sequential scans transition the state
+        machine; pipelined scans stay SCANNING (the servos keep moving) and
+        report the stage as an event instead.
+        """
+        if not self._pipelined:
+            await self._set_state(new_state, data)
+        elif new_state == ScanState.LEAF_DETECTED:
+            await self._broadcast(ScanEvent(event_type="detection", state=self.state.value, data=data or {}))
+        elif new_state == ScanState.ERROR:
+            await self._broadcast(ScanEvent(event_type="error", state=self.state.value, data=data or {}))
+
+    async def _process_detection(
+        self,
+        detections: list,
+        pan: int,
+        tilt: int,
+        image_bytes: bytes,
+        frame: DecodedImage = None,
+        frame_id: Optional[int] = None,
+    ):
+        """
+        Handle a leaf detection: classify disease, store result, get RAG advice.
+
+        Pipelined scans store the result right after classification and
+        fetch advice in a background task that attaches it when ready.
+        """
         self._scan_index += 1
+        scan_index = self._scan_index
         detection_dicts = [d.to_dict() for d in detections]
+        position = {"pan": pan, "tilt": tilt}
 
         # 1. Leaf detected
-        await self._set_state(ScanState.LEAF_DETECTED, {
+        await self._stage(ScanState.LEAF_DETECTED, {
             "detections": detection_dicts,
-            "scan_index": self._scan_index,
-            "position": {"pan": pan, "tilt": tilt},
+            "scan_index": scan_index,
+            "position": position,
         })
 
-        image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+        if frame_id is None:
+            frame_id = self.frames.put(image_bytes)
+        self.frames.pin(frame_id)
 
-        # 2. Disease classification
-        await self._set_state(ScanState.CLASSIFYING)
+        # 2. Disease classification (per leaf crop when possible, else full frame)
+        await self._stage(ScanState.CLASSIFYING)
+        leaves = None
         try:
-            classification = self.classify(image_bytes, model_type=self._model_type)
+            if self._crop_to_classify and self.classify_batch is not None and frame is not None:
+                leaves = await self._classify_leaves(detections, frame)
+                classification = self._summarize_leaves(leaves)
+            else:
+                classification = await self.cpu_pool.run(
+                    self.classify, frame if frame is not None else image_bytes, model_type=self._model_type
+                )
         except Exception as e:
             logger.error(f"Classification failed: {e}")
-            await self._set_state(ScanState.ERROR, {"message": f"Classification failed: {e}"})
+            await self._stage(ScanState.ERROR, {"message": f"Classification failed: {e}", "scan_index": scan_index})
             return
 
         disease = classification.get("class", "Unknown")
@@ -395,71 +636,139 @@ class RoboticsScanner:
 
         await self._broadcast(ScanEvent(
             event_type="classification",
-            state=ScanState.CLASSIFYING.value,
+            state=self.state.value if self._pipelined else ScanState.CLASSIFYING.value,
             data={
                 "disease": disease,
                 "confidence": confidence,
                 "model": self._model_type,
                 "all_predictions": classification.get("all_predictions"),
+                "leaves": leaves,
                 "inference_time_ms": classification.get("inference_time_ms"),
-                "scan_index": self._scan_index,
-                "position": {"pan": pan, "tilt": tilt},
+                "scan_index": scan_index,
+                "position": position,
             },
         ))
 
-        # 3. Get RAG advice (skip for healthy plants)
-        advice = None
-        if disease.lower() != "healthy":
-            await self._set_state(ScanState.ADVISING)
-            try:
-                weather_condition = None
-                weather_forecast = None
-                if self.get_weather:
-                    weather_condition, weather_forecast = self.get_weather()
-                advice = self.get_advice(
-                    disease,
-                    weather_condition=weather_condition,
-                    weather_forecast=weather_forecast,
-                )
-            except Exception as e:
-                logger.error(f"RAG advice failed: {e}")
-                advice = {"severity": "Unknown", "action_plan": "Advice unavailable", "rag_enabled": False}
-
-        # 4. Store and broadcast result
+        # 3. Store the result; advice is attached when it arrives
         result = ScanResult(
-            scan_index=self._scan_index,
+            scan_index=scan_index,
             detections=detection_dicts,
             disease=disease,
             disease_confidence=confidence,
             classification_model=self._model_type,
             all_predictions=classification.get("all_predictions"),
-            advice=advice,
-            image_base64=image_b64,
+            leaves=leaves,
+            advice_pending=disease.lower() != "healthy",
+            position=position,
+            frame_id=frame_id,
         )
         self._results.append(result)
 
-        await self._set_state(ScanState.RESULT_READY, {
+        # 4. Get RAG advice (skip for healthy plants) and broadcast the result
+        if self._pipelined:
+            self._spawn(self._attach_advice(result, position))
+        else:
+            await self._attach_advice(result, position)
+
+    async def _attach_advice(self, result: ScanResult, position: dict):
+        """Fetch advice for a stored result (if diseased), attach it and broadcast the advice event."""
+        if result.advice_pending:
+            await self._stage(ScanState.ADVISING)
+            try:
+                result.advice = await self._fetch_advice(result.disease)
+            except Exception as e:
+                logger.error(f"RAG advice failed: {e}")
+                result.advice = {"severity": "Unknown", "action_plan": "Advice unavailable", "rag_enabled": False}
+            result.advice_pending = False
+
+        await self._stage(ScanState.RESULT_READY, {
             "result": result.to_dict(),
-            "position": {"pan": pan, "tilt": tilt},
+            "position": position,
         })
 
-        await self._broadcast(ScanEvent(
-            event_type="advice",
-            state=ScanState.RESULT_READY.value,
-            data={
-                "disease": disease,
-                "confidence": confidence,
-                "advice": advice,
-                "scan_index": self._scan_index,
-                "position": {"pan": pan, "tilt": tilt},
-                "image_base64": image_b64,
-            },
+        await self._broadcast(self._advice_event(
+            result, self.state.value if self._pipelined else ScanState.RESULT_READY.value
         ))
 
+        leaves = result.leaves
         logger.info(
-            f"Scan #{self._scan_index} at ({pan}, {tilt}): {disease} ({confidence:.2%}) | "
-            f"Advice: {'Yes' if advice else 'Skipped (healthy)'}"
+            f"Scan #{result.scan_index} at ({position['pan']}, {position['tilt']}): "
+            f"{result.disease} ({result.disease_confidence:.2%})"
+            f"{f' over {len(leaves)} leaves' if leaves else ''} | "
+            f"Advice: {'Yes' if result.advice else 'Skipped (healthy)'}"
         )
 
-        # Brief pause before resuming
-        await asyncio.sleep(1.0)
+    @staticmethod
+    def _advice_event(result: ScanResult, state: str, cancelled: bool = False) -> ScanEvent:
+        data = {
+            "disease": result.disease,
+            "confidence": result.disease_confidence,
+            "advice": result.advice,
+            "scan_index": result.scan_index,
+            "position": result.position,
+            "frame_id": result.frame_id,
+        }
+        if cancelled:
+            data["cancelled"] = True
+        return ScanEvent(event_type="advice", state=state, data=data)
+
+    def _settle_cancelled_advice(self) -> List[int]:
+        """
+        Give results whose advice task was cancelled (scan stopped) a
+        fallback and send their final advice event, so clients stop
+        waiting for it. Returns the affected scan indexes.
+        """
+        cancelled = []
+        for result in self._results:
+            if not result.advice_pending:
+                continue
+            result.advice_pending = False
+            result.advice = {"severity": "Unknown", "action_plan": "Advice cancelled (scan stopped)", "rag_enabled": False}
+            self._subscribers.publish(self._advice_event(result, self.state.value, cancelled=True))
+            cancelled.append(result.scan_index)
+        if cancelled:
+            logger.info(f"Scan stopped before advice arrived for {len(cancelled)} results")
+        return cancelled
+
+    def _decode_and_detect(self, frame_bytes: bytes) -> Tuple[DecodedImage, list]:
+        """Decode a frame once for both models and run YOLO on it (CPU pool)."""
+        frame = decode_image(frame_bytes, min_side=CLASSIFIER_SIZE, long_side=max(self.yolo.input_size))
+        return frame, self.yolo.detect_image(frame)
+
+    async def _classify_leaves(self, detections: list, frame: DecodedImage) -> List[dict]:
+        """Crop the most confident detections (with padding) and classify them in one batch."""
+        leaves = sorted(
+            (d for d in detections if d.confidence >= self._detection_confidence),
+            key=lambda d: d.confidence, reverse=True,
+        )[:self._max_leaves]
+        crops = [crop_box(frame, (d.x1, d.y1, d.x2, d.y2), self._crop_padding) for d in leaves]
+        results = await self.cpu_pool.run(self.classify_batch, crops, model_type=self._model_type)
+        return [
+            {
+                "leaf_index": i,
+                "detection": det.to_dict(),
+                "disease": res.get("class", "Unknown"),
+                "confidence": res.get("confidence", 0.0),
+                "all_predictions": res.get("all_predictions"),
+                "inference_time_ms": res.get("inference_time_ms"),
+            }
+            for i, (det, res) in enumerate(zip(leaves, results))
+        ] if results else []
+
+    @staticmethod
+    def _summarize_leaves(leaves: List[dict]) -> dict:
+        """
+        Frame-level diagnosis from per-leaf results: the most confident
+        diseased leaf if any leaf is diseased, else the most confident leaf.
+        """
+        if not leaves:
+            return {"class": "Unknown", "confidence": 0.0, "all_predictions": None}
+        diseased = [leaf for leaf in leaves if leaf["disease"].lower() not in {"healthy", "model not loaded"}]
+        primary = max(diseased or leaves, key=lambda leaf: leaf["confidence"])
+        return {
+            "class": primary["disease"],
+            "confidence": primary["confidence"],
+            "all_predictions": primary["all_predictions"],
+            "inference_time_ms": primary["inference_time_ms"],
+            "leaf_index": primary["leaf_index"],
+        }
@@ -0,0 +1,192 @@
+"""
+AgriSense Scan Executors - Bounded Worker Pools and Event-Loop Lag Metric
+
+The robotics scanner runs YOLO, the Keras classifiers and advice lookups
+from coroutines. asyncio.to_thread sends all of them to the loop's single
+default executor, where CPU inference and network waits compete for the
+same threads with no limit on how much work piles up.
+
+Features:
+- BoundedExecutor: a named thread pool with a cap on queued + running
+  jobs; callers await a slot, so a slow stage backpressures the scan
+  instead of growing an unbounded queue
+- Separate pools for CPU-bound inference and network-bound advice/weather
+- Per-pool queue depth, queue wait and run time counters
+- LoopLagMonitor: measures how late the event loop wakes a periodic
+  timer (avg / p95 / max lag) while a scan is running
+
+Configuration (environment):
+- SCAN_CPU_WORKERS: inference threads (default 2; raised to one per
+  startup camera + 1 so every rig can have a frame in the YOLO batch)
+- SCAN_CPU_QUEUE: max queued + running inference jobs (default 8)
+- SCAN_NET_WORKERS: advice/weather threads (default 4)
+- SCAN_NET_QUEUE: max queued + running network jobs (default 16)
+- SCAN_LOOP_LAG_INTERVAL_MS: lag probe interval (default 100)
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("AgriSense.ScanExecutors")
+
+
+CPU_WORKERS = int(os.getenv("SCAN_CPU_WORKERS", "2"))
+CPU_QUEUE = int(os.getenv("SCAN_CPU_QUEUE", "8"))
+NET_WORKERS = int(os.getenv("SCAN_NET_WORKERS", "4"))
+NET_QUEUE = int(os.getenv("SCAN_NET_QUEUE", "16"))
+LOOP_LAG_INTERVAL_MS = float(os.getenv("SCAN_LOOP_LAG_INTERVAL_MS", "100"))
+
+# Samples kept for the lag percentiles (~100 s at the default interval)
+_LAG_WINDOW = 1000
+
+
+class BoundedExecutor:
+    """Thread pool whose queued + running jobs are capped; run() awaits a free slot."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(self.max_workers, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"scan-{name}")
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._in_flight = 0
+        self._waiting = 0
+        self._slot_wait_ms_total = 0.0
+        self._queue_wait_ms_total = 0.0
+        self._run_ms_total = 0.0
+        self._max_in_flight = 0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool without blocking the event loop."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_queue)
+
+        wait_start = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        submitted_at = time.perf_counter()
+        self._slot_wait_ms_total += (submitted_at - wait_start) * 1000
+        self._submitted += 1
+        self._in_flight += 1
+        self._max_in_flight = max(self._max_in_flight, self._in_flight)
+
+        timing = {}
+
+        def call():
+            started = time.perf_counter()
+            timing["queue_wait_ms"] = (started - submitted_at) * 1000
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timing["run_ms"] = (time.perf_counter() - started) * 1000
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._pool, call)
+            self._completed += 1
+            return result
+        except BaseException:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._queue_wait_ms_total += timing.get("queue_wait_ms", 0.0)
+            self._run_ms_total += timing.get("run_ms", 0.0)
+            self._slots.release()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        done = self._completed + self._failed
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "waiting_for_slot": self._waiting,
+            "max_in_flight": self._max_in_flight,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "avg_slot_wait_ms": round(self._slot_wait_ms_total / self._submitted, 2) if self._submitted else 0.0,
+            "avg_queue_wait_ms": round(self._queue_wait_ms_total / done, 2) if done else 0.0,
+            "avg_run_ms": round(self._run_ms_total / done, 2) if done else 0.0,
+        }
+
+
+class LoopLagMonitor:
+    """
+    Event-loop responsiveness probe.
+
+    A task sleeps for interval_ms and records how late it wakes up; any
+    blocking call on the loop shows up directly as lag.
+    """
+
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS):
+        self.interval_s = max(1.0, interval_ms) / 1000.0
+        self._task: Optional[asyncio.Task] = None
+        self._samples: deque = deque(maxlen=_LAG_WINDOW)
+        self._max_lag_ms = 0.0
+        self._total_samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start probing (resets the window). No-op if already running."""
+        if self.running:
+            return
+        self._samples.clear()
+        self._max_lag_ms = 0.0
+        self._task = asyncio.create_task(self._probe())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self._samples.append(lag_ms)
+            self._total_samples += 1
+            if lag_ms > self._max_lag_ms:
+                self._max_lag_ms = lag_ms
+            if lag_ms > 250:
+                logger.warning(f"⚠️ Event loop lagged {lag_ms:.0f}ms during scan")
+
+    def get_stats(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))] if samples else 0.0
+        return {
+            "running": self.running,
+            "interval_ms": self.interval_s * 1000,
+            "samples": len(samples),
+            "total_samples": self._total_samples,
+            "avg_lag_ms": round(sum(samples) / len(samples), 2) if samples else 0.0,
+            "p95_lag_ms": round(p95, 2),
+            "max_lag_ms": round(self._max_lag_ms, 2),
+        }
+
+
+def cpu_executor(min_workers: int = 0) -> BoundedExecutor:
+    return BoundedExecutor("cpu", max(CPU_WORKERS, min_workers), CPU_QUEUE)
+
+
+def net_executor() -> BoundedExecutor:
+    return BoundedExecutor("net", NET_WORKERS, NET_QUEUE)
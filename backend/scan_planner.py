@@ -0,0 +1,237 @@
+"""
+AgriSense Scan Planner - Travel-Optimized Pan/Tilt Scan Paths
+
+The robotics scanner used to visit a fixed serpentine over the whole
+pan/tilt rectangle on every scan, even when leaves were found in only a
+few places. Planners produce the scan in passes: the scanner visits one
+pass, reports the positions where YOLO found a leaf, and asks for the
+next pass until the planner returns an empty list.
+
+Features:
+- SerpentinePlanner: the original boustrophedon sweep at the scan step
+- CoarseToFinePlanner: a serpentine at coarse_factor x the step, then only
+  the fine-step grid points around positions that had detections
+- HotspotPlanner: revisits only the neighbourhoods of earlier ScanResult
+  positions (falls back to a serpentine when there are none)
+- Passes after the first are ordered nearest-neighbour by servo travel
+  (Chebyshev distance: pan and tilt move at the same time)
+- settle_time(): settle delay scaled to the angular travel of a move
+
+Configuration (environment):
+- SCAN_PLANNER: default strategy, serpentine | coarse_to_fine | hotspots (default serpentine)
+- SCAN_COARSE_FACTOR: coarse step multiplier for coarse_to_fine (default 2)
+- SCAN_SETTLE_MIN_S: settle time after any move (default 0.15)
+- SCAN_SETTLE_PER_DEG_S: extra settle time per degree of travel (default 0.004)
+"""
+
+import os
+import logging
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger("AgriSense.ScanPlanner")
+
+
+DEFAULT_STRATEGY = os.getenv("SCAN_PLANNER", "serpentine").lower()
+COARSE_FACTOR = max(1, int(os.getenv("SCAN_COARSE_FACTOR", "2")))
+SETTLE_MIN_S = float(os.getenv("SCAN_SETTLE_MIN_S", "0.15"))
+SETTLE_PER_DEG_S = float(os.getenv("SCAN_SETTLE_PER_DEG_S", "0.004"))
+
+# Servo position after motor_center() (PAN_CENTER / TILT_CENTER in the sketch)
+CENTER_POSITION = (90, 75)
+
+Position = Tuple[int, int]
+
+
+def travel(a: Optional[Position], b: Position) -> int:
+    """Degrees the slower servo has to move from a to b (a=None means center)."""
+    a = a if a is not None else CENTER_POSITION
+    return max(abs(b[0] - a[0]), abs(b[1] - a[1]))
+
+
+def settle_time(
+    previous: Optional[Position],
+    target: Position,
+    settle_min: float = SETTLE_MIN_S,
+    per_degree: float = SETTLE_PER_DEG_S,
+) -> float:
+    """Settle time for a move: a fixed minimum plus a per-degree term for the longer axis."""
+    return settle_min + travel(previous, target) * per_degree
+
+
+def path_travel(positions: Sequence[Position], start: Optional[Position] = None) -> int:
+    """Total servo travel in degrees for visiting positions in order."""
+    total, prev = 0, start
+    for pos in positions:
+        total += travel(prev, pos)
+        prev = pos
+    return total
+
+
+def order_by_travel(positions: Iterable[Position], start: Optional[Position] = None) -> List[Position]:
+    """Greedy nearest-neighbour ordering (ties broken by tilt, then pan, for a stable path)."""
+    remaining = set(positions)
+    ordered, current = [], start
+    while remaining:
+        nxt = min(remaining, key=lambda p: (travel(current, p), p[1], p[0]))
+        remaining.remove(nxt)
+        ordered.append(nxt)
+        current = nxt
+    return ordered
+
+
+def _axis(lo: int, hi: int, step: int) -> List[int]:
+    """lo..hi at step; hi is always included so the edge of the range is covered."""
+    values = list(range(lo, hi + 1, step))
+    if not values or values[-1] != hi:
+        values.append(hi)
+    return values
+
+
+class ScanPlanner:
+    """
+    Base planner over a pan/tilt rectangle.
+
+    Args:
+        pan_min, pan_max, tilt_min, tilt_max: Scan bounds in degrees
+        step: Fine scan step in degrees
+    """
+
+    name = "base"
+
+    def __init__(self, pan_min: int, pan_max: int, tilt_min: int, tilt_max: int, step: int):
+        self.pan_min, self.pan_max = min(pan_min, pan_max), max(pan_min, pan_max)
+        self.tilt_min, self.tilt_max = min(tilt_min, tilt_max), max(tilt_min, tilt_max)
+        self.step = max(1, step)
+        self.visited: Set[Position] = set()
+        self.passes = 0
+
+    def next_pass(self, hits: Sequence[Position], current: Optional[Position] = None) -> List[Position]:
+        """
+        Positions for the next pass (empty when the scan is done).
+
+        Args:
+            hits: Positions of the previous pass with a confident detection
+            current: Where the servos are now (None = center)
+        """
+        positions = [p for p in self._plan(self.passes, list(hits), current) if p not in self.visited]
+        self.visited.update(positions)
+        if positions:
+            self.passes += 1
+            logger.info(
+                f"🧭 {self.name} pass {self.passes}: {len(positions)} positions, "
+                f"{path_travel(positions, current)}° travel"
+            )
+        return positions
+
+    def _plan(self, pass_index: int, hits: List[Position], current: Optional[Position]) -> List[Position]:
+        raise NotImplementedError
+
+    def serpentine(self, step: int) -> List[Position]:
+        """
+        Sweep pan left-to-right, step tilt down, sweep right-to-left, repeat.
+        """
+        positions = []
+        for row, tilt in enumerate(_axis(self.tilt_min, self.tilt_max, step)):
+            pans = _axis(self.pan_min, self.pan_max, step)
+            positions.extend((pan, tilt) for pan in (pans if row % 2 == 0 else reversed(pans)))
+        return positions
+
+    def neighbourhood(self, center: Position, radius: int) -> List[Position]:
+        """Fine-grid points within radius degrees of center (inside the bounds)."""
+        pans = [p for p in _axis(self.pan_min, self.pan_max, self.step) if abs(p - center[0]) <= radius]
+        tilts = [t for t in _axis(self.tilt_min, self.tilt_max, self.step) if abs(t - center[1]) <= radius]
+        return [(p, t) for t in tilts for p in pans]
+
+    def estimate_positions(self) -> int:
+        """Positions in the first pass (later passes depend on detections)."""
+        return len(self._plan(0, [], None))
+
+
+class SerpentinePlanner(ScanPlanner):
+    """Single full serpentine at the scan step."""
+
+    name = "serpentine"
+
+    def _plan(self, pass_index, hits, current):
+        return self.serpentine(self.step) if pass_index == 0 else []
+
+
+class CoarseToFinePlanner(ScanPlanner):
+    """
+    Coarse serpentine at coarse_factor x step, then the fine grid around
+    each coarse hit (within one coarse step), ordered by travel.
+    """
+
+    name = "coarse_to_fine"
+
+    def __init__(self, *args, coarse_factor: int = COARSE_FACTOR, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.coarse_step = self.step * max(1, coarse_factor)
+
+    def _plan(self, pass_index, hits, current):
+        if pass_index == 0:
+            return self.serpentine(self.coarse_step)
+        if pass_index == 1 and hits:
+            # Half a coarse step in each direction covers the cells the coarse pass skipped
+            radius = self.coarse_step // 2 + self.step // 2
+            fine = {p for hit in hits for p in self.neighbourhood(hit, radius)}
+            return order_by_travel(fine - self.visited, current)
+        return []
+
+
+class HotspotPlanner(ScanPlanner):
+    """
+    Revisit only the neighbourhoods of earlier detections (e.g. the
+    positions of the previous scan's ScanResults).
+    """
+
+    name = "hotspots"
+
+    def __init__(self, *args, hotspots: Sequence[Position] = (), radius: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hotspots = [tuple(h) for h in hotspots]
+        self.radius = self.step if radius is None else max(0, radius)
+
+    def _plan(self, pass_index, hits, current):
+        if pass_index > 0:
+            return []
+        if not self.hotspots:
+            logger.info("🧭 No prior hotspots, falling back to a full serpentine")
+            return self.serpentine(self.step)
+        points = {p for h in self.hotspots for p in self.neighbourhood(h, self.radius)}
+        return order_by_travel(points, current)
+
+
+PLANNERS = {
+    SerpentinePlanner.name: SerpentinePlanner,
+    CoarseToFinePlanner.name: CoarseToFinePlanner,
+    HotspotPlanner.name: HotspotPlanner,
+}
+
+
+def create_planner(
+    strategy: Optional[str],
+    pan_min: int,
+    pan_max: int,
+    tilt_min: int,
+    tilt_max: int,
+    step: int,
+    hotspots: Sequence[Position] = (),
+    hotspot_radius: Optional[int] = None,
+    coarse_factor: int = COARSE_FACTOR,
+) -> ScanPlanner:
+    """
+    Build a planner by strategy name (None uses SCAN_PLANNER).
+
+    Raises:
+        ValueError: If the strategy is unknown
+    """
+    strategy = (strategy or DEFAULT_STRATEGY).lower()
+    bounds = (pan_min, pan_max, tilt_min, tilt_max, step)
+    if strategy == CoarseToFinePlanner.name:
+        return CoarseToFinePlanner(*bounds, coarse_factor=coarse_factor)
+    if strategy == HotspotPlanner.name:
+        return HotspotPlanner(*bounds, hotspots=hotspots, radius=hotspot_radius)
+    if strategy == SerpentinePlanner.name:
+        return SerpentinePlanner(*bounds)
+    raise ValueError(f"Unknown scan strategy '{strategy}'. Use one of: {', '.join(PLANNERS)}")
@@ -0,0 +1,210 @@
+"""
+AgriSense Scan Subscribers - Backpressure-Aware Event Fan-Out
+
+RoboticsScanner used to put_nowait every event into a 100-slot queue per
+WebSocket and dropped the whole subscriber once it filled, so a slow phone
+on cellular lost its session just for falling behind on frame events.
+
+Features:
+- Per-event-type delivery policy:
+  - lossy types (frame) are latest-wins: a newer frame replaces one the
+    subscriber has not sent yet
+  - every other event (classification, advice, state_change, ...) is
+    delivered in order
+- A subscriber is only dropped if its reliable backlog exceeds
+  SCAN_SUBSCRIBER_MAX_PENDING (a dead connection, not a slow one)
+- Per-subscriber stats: delivered / coalesced per type, backlog, queue
+  delay, send time and send rate over a sliding window
+- Events are serialized once and shared by all subscribers (ScanEvent
+  caches its JSON per payload variant)
+
+Configuration (environment):
+- SCAN_SUBSCRIBER_MAX_PENDING: reliable events queued per subscriber before it is dropped (default 500)
+- SCAN_SUBSCRIBER_RATE_WINDOW_S: window for the send-rate stats (default 10)
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, FrozenSet, List
+
+logger = logging.getLogger("AgriSense.ScanSubscribers")
+
+
+MAX_PENDING = int(os.getenv("SCAN_SUBSCRIBER_MAX_PENDING", "500"))
+RATE_WINDOW_S = float(os.getenv("SCAN_SUBSCRIBER_RATE_WINDOW_S", "10"))
+
+# Event types where only the newest pending event matters
+LOSSY_EVENTS: FrozenSet[str] = frozenset({"frame"})
+
+_next_subscriber_id = 0
+
+
+class SubscriberOverflow(Exception):
+    """Raised by ScanSubscriber.put when the reliable backlog exceeds max_pending."""
+
+
+class ScanSubscriber:
+    """
+    One consumer's event queue.
+
+    Entries are kept in arrival order. A lossy event that supersedes a
+    pending one of the same type blanks the old entry and is appended at
+    the end, so ordering relative to other events is preserved.
+    """
+
+    def __init__(self, name: str = "", max_pending: int = MAX_PENDING, lossy: FrozenSet[str] = LOSSY_EVENTS):
+        global _next_subscriber_id
+        _next_subscriber_id += 1
+        self.id = _next_subscriber_id
+        self.name = name or f"subscriber-{self.id}"
+        self.max_pending = max(1, max_pending)
+        self.lossy = lossy
+
+        self._entries: Deque[list] = deque()  # [event, enqueued_at]; event None = superseded
+        self._lossy_pending: Dict[str, list] = {}
+        self._reliable_pending = 0
+        self._ready = asyncio.Event()
+        self.closed = False
+
+        self.connected_at = time.time()
+        self._delivered: Dict[str, int] = {}
+        self._coalesced: Dict[str, int] = {}
+        self._max_backlog = 0
+        self._queue_delay_ms_total = 0.0
+        self._send_ms_total = 0.0
+        self._bytes_sent = 0
+        self._sends = 0
+        self._send_times: Deque[tuple] = deque()  # (t, bytes) within RATE_WINDOW_S
+
+    @property
+    def backlog(self) -> int:
+        return self._reliable_pending + len(self._lossy_pending)
+
+    def put(self, event) -> None:
+        """
+        Enqueue an event (never blocks).
+
+        Raises:
+            SubscriberOverflow: If the reliable backlog is over max_pending
+        """
+        if self.closed:
+            return
+        event_type = event.event_type
+        entry = [event, time.perf_counter()]
+        if event_type in self.lossy:
+            previous = self._lossy_pending.get(event_type)
+            if previous is not None:
+                previous[0] = None
+                self._coalesced[event_type] = self._coalesced.get(event_type, 0) + 1
+            self._lossy_pending[event_type] = entry
+        else:
+            if self._reliable_pending >= self.max_pending:
+                raise SubscriberOverflow(f"{self.name}: {self._reliable_pending} undelivered events")
+            self._reliable_pending += 1
+        self._entries.append(entry)
+        self._max_backlog = max(self._max_backlog, self.backlog)
+        self._ready.set()
+
+    async def get(self):
+        """Next event to send, waiting if none is pending. Returns None once the subscriber is closed."""
+        while not self.closed:
+            while self._entries:
+                entry = self._entries.popleft()
+                event, enqueued_at = entry
+                if event is None:
+                    continue
+                if event.event_type in self.lossy:
+                    if self._lossy_pending.get(event.event_type) is entry:
+                        del self._lossy_pending[event.event_type]
+                else:
+                    self._reliable_pending -= 1
+                self._queue_delay_ms_total += (time.perf_counter() - enqueued_at) * 1000
+                self._delivered[event.event_type] = self._delivered.get(event.event_type, 0) + 1
+                return event
+            self._ready.clear()
+            await self._ready.wait()
+        return None
+
+    def record_send(self, nbytes: int, send_ms: float):
+        """Account one message written to the client (called by the sender)."""
+        now = time.time()
+        self._sends += 1
+        self._bytes_sent += nbytes
+        self._send_ms_total += send_ms
+        self._send_times.append((now, nbytes))
+        while self._send_times and now - self._send_times[0][0] > RATE_WINDOW_S:
+            self._send_times.popleft()
+
+    def close(self):
+        self.closed = True
+        self._entries.clear()
+        self._lossy_pending.clear()
+        self._reliable_pending = 0
+        self._ready.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        recent = [(t, n) for t, n in self._send_times if now - t <= RATE_WINDOW_S]
+        window = min(RATE_WINDOW_S, max(now - self.connected_at, 1e-3))
+        delivered = sum(self._delivered.values())
+        return {
+            "id": self.id,
+            "name": self.name,
+            "connected_s": round(now - self.connected_at, 1),
+            "backlog": self.backlog,
+            "max_backlog": self._max_backlog,
+            "delivered": dict(self._delivered),
+            "coalesced": dict(self._coalesced),
+            "avg_queue_delay_ms": round(self._queue_delay_ms_total / delivered, 2) if delivered else 0.0,
+            "avg_send_ms": round(self._send_ms_total / self._sends, 2) if self._sends else 0.0,
+            "messages_per_s": round(len(recent) / window, 2),
+            "kbytes_per_s": round(sum(n for _, n in recent) / 1024 / window, 1),
+            "mb_sent": round(self._bytes_sent / (1024 * 1024), 2),
+        }
+
+
+class SubscriberHub:
+    """The scanner's set of subscribers; publish() fans an event out to all of them."""
+
+    def __init__(self, max_pending: int = MAX_PENDING):
+        self.max_pending = max_pending
+        self._subscribers: List[ScanSubscriber] = []
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, name: str = "") -> ScanSubscriber:
+        sub = ScanSubscriber(name=name, max_pending=self.max_pending)
+        self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: ScanSubscriber) -> bool:
+        if sub in self._subscribers:
+            self._subscribers.remove(sub)
+            sub.close()
+            return True
+        return False
+
+    def close_all(self):
+        for sub in list(self._subscribers):
+            self.unsubscribe(sub)
+
+    def publish(self, event):
+        for sub in list(self._subscribers):
+            try:
+                sub.put(event)
+            except SubscriberOverflow as e:
+                logger.warning(f"⚠️ Dropping stalled subscriber {e}")
+                self.unsubscribe(sub)
+                self.dropped += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "count": len(self._subscribers),
+            "dropped": self.dropped,
+            "subscribers": [s.get_stats() for s in self._subscribers],
+        }
@@ -0,0 +1,71 @@
+"""
+Tests for AdviceCache (advice_cache.py): LRU eviction, per-entry TTL,
+copy-on-read/write and cache key normalization.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import advice_cache
+from advice_cache import AdviceCache, make_advice_key
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = AdviceCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}  # a is now the most recent
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("c") == {"v": 3}
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(advice_cache.time, "time", lambda: now[0])
+    cache = AdviceCache(max_entries=4, ttl_seconds=10)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2}, ttl_seconds=100)
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.get("b") == {"v": 2}
+    stats = cache.get_stats()
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+    now[0] += 100
+    assert cache.purge_expired() == 1
+    assert len(cache) == 0
+
+
+def test_copies_on_read_and_write():
+    cache = AdviceCache()
+    advice = {"sources": [{"title": "kb"}]}
+    cache.set("k", advice)
+    advice["sources"].append({"title": "mutated"})
+    first = cache.get("k")
+    first["sources"].clear()
+    assert cache.get("k") == {"sources": [{"title": "kb"}]}
+
+
+def test_invalidate_and_clear():
+    cache = AdviceCache()
+    cache.set("a", {})
+    cache.set("b", {})
+    assert cache.invalidate("a") is True
+    assert cache.invalidate("a") is False
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_key_normalization():
+    base = make_advice_key("Early Blight", "Sunny", "Rain  tomorrow", latitude=7.07, longitude=125.61)
+    assert make_advice_key(" early blight ", "SUNNY", "rain tomorrow", latitude=7.1, longitude=125.6) == base
+    assert make_advice_key("Early Blight", "Sunny", "Dry tomorrow", latitude=7.07, longitude=125.61) != base
+    assert make_advice_key("Early Blight", "Sunny", "Rain tomorrow", latitude=10.3, longitude=123.9) != base
+    assert make_advice_key("Early Blight", "Sunny", "Rain tomorrow", latitude=7.07, longitude=125.61,
+                           rag_enabled=False) != base
@@ -0,0 +1,162 @@
+"""
+Tests for the frame channel (frame_channel.py): binary frame messages,
+subscriber frame options, the FrameStore (ids, LRU window, pinning and
+the variant cache) and FrameSender delivery to binary and legacy
+subscribers.
+"""
+
+import sys
+import os
+import json
+import base64
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from frame_channel import FrameOptions, FrameSender, FrameStore, HEADER_SIZE, pack_frame, unpack_frame
+from robotics_scanner import ScanEvent
+
+
+def jpeg(width: int = 64, height: int = 48) -> bytes:
+    ok, buf = cv2.imencode(".jpg", np.full((height, width, 3), 120, dtype=np.uint8))
+    assert ok
+    return buf.tobytes()
+
+
+def test_pack_unpack_round_trip():
+    message = pack_frame(0xFFFFFFFE, b"jpeg-bytes")
+    assert len(message) == HEADER_SIZE + len(b"jpeg-bytes")
+    frame_id, payload = unpack_frame(message)
+    assert frame_id == 0xFFFFFFFE
+    assert bytes(payload) == b"jpeg-bytes"
+
+
+def test_unpack_rejects_other_messages():
+    with pytest.raises(ValueError):
+        unpack_frame(b"AGF")
+    with pytest.raises(ValueError):
+        unpack_frame(b"XXXX" + bytes(8))
+
+
+def test_options_from_params():
+    assert FrameOptions.from_params({}) == FrameOptions()
+    assert FrameOptions.from_params({"frames": "binary"}).binary
+    assert FrameOptions.from_params({"binary": "true"}).binary
+    options = FrameOptions.from_params({"max_width": "320", "quality": "150"})
+    assert (options.max_width, options.quality) == (320, 100)
+    assert not options.is_original
+
+
+def test_store_keeps_recent_frames_and_pins():
+    store = FrameStore(capacity=2)
+    first = store.put(b"one")
+    store.pin(first)
+    second = store.put(b"two")
+    third = store.put(b"three")
+    assert (first, second, third) == (1, 2, 3)
+    # Out of the LRU window but pinned
+    assert store.get(first) == b"one"
+    store.unpin_all()
+    assert store.get(first) is None
+    assert store.get(third) == b"three"
+    assert store.get_stats()["frames"] == 2
+
+
+def test_store_ids_wrap_past_zero():
+    store = FrameStore()
+    store._next_id = 0xFFFFFFFF
+    assert store.put(b"a") == 0xFFFFFFFF
+    assert store.put(b"b") == 1
+
+
+def test_variants_are_encoded_once():
+    store = FrameStore()
+    frame_id = store.put(jpeg(64, 48))
+    original = FrameOptions()
+    small = FrameOptions(max_width=32, quality=50)
+
+    assert not store.needs_work(frame_id, original, as_base64=False)
+    assert store.variant(frame_id, original) == store.get(frame_id)
+
+    assert store.needs_work(frame_id, small, as_base64=False)
+    resized = store.variant(frame_id, small)
+    assert cv2.imdecode(np.frombuffer(resized, np.uint8), cv2.IMREAD_COLOR).shape[:2] == (24, 32)
+    assert not store.needs_work(frame_id, small, as_base64=False)
+    assert store.variant(frame_id, small) is resized
+
+    b64 = store.base64(frame_id, original)
+    assert base64.b64decode(b64) == store.get(frame_id)
+    assert store.base64(frame_id, original) is b64
+
+    stats = store.get_stats()
+    assert stats["variant_misses"] == 2 and stats["variant_hits"] == 2
+    assert store.variant(999, small) is None
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_bytes(self, data: bytes):
+        self.messages.append(data)
+
+    async def send_text(self, text: str):
+        self.messages.append(json.loads(text))
+
+
+async def run_blocking(fn, *args):
+    return fn(*args)
+
+
+def send_all(options: FrameOptions, store: FrameStore, events):
+    websocket = FakeWebSocket()
+    sender = FrameSender(websocket, store, options, run_blocking)
+
+    async def run():
+        return [await sender.send(event) for event in events]
+
+    return websocket.messages, sender, asyncio.run(run())
+
+
+def scan_events(frame_id: int):
+    return [
+        ScanEvent("frame", "scanning", {"frame_id": frame_id}),
+        ScanEvent("classification", "classifying", {"frame_id": frame_id, "disease": "Leaf Mold"}),
+        ScanEvent("advice", "result_ready", {"frame_id": frame_id, "scan_index": 1}),
+    ]
+
+
+def test_binary_subscriber_gets_each_frame_once_before_its_frame_event():
+    store = FrameStore()
+    frame_id = store.put(b"jpeg")
+    events = scan_events(frame_id) + [ScanEvent("frame", "scanning", {"frame_id": frame_id})]
+    messages, sender, sent = send_all(FrameOptions(binary=True), store, events)
+
+    assert messages[0] == pack_frame(frame_id, b"jpeg")
+    assert [m["event_type"] for m in messages[1:]] == ["frame", "classification", "advice", "frame"]
+    # Later events only reference the id
+    assert all(set(m["data"]) <= {"frame_id", "disease", "scan_index"} for m in messages[1:])
+    assert sender.frames_sent == 1
+    assert sender.bytes_sent == sum(sent)
+
+
+def test_binary_subscriber_skips_evicted_frames():
+    messages, sender, _ = send_all(FrameOptions(binary=True), FrameStore(), scan_events(42)[:1])
+    assert [m["event_type"] for m in messages] == ["frame"]
+    assert sender.frames_sent == 0
+
+
+def test_legacy_subscriber_gets_base64_under_the_old_keys():
+    store = FrameStore()
+    frame_id = store.put(b"jpeg")
+    messages, sender, _ = send_all(FrameOptions(), store, scan_events(frame_id))
+
+    frame, classification, advice = messages
+    assert base64.b64decode(frame["data"]["frame_base64"]) == b"jpeg"
+    assert "frame_base64" not in classification["data"] and "image_base64" not in classification["data"]
+    assert advice["data"]["image_base64"] == frame["data"]["frame_base64"]
+    assert sender.frames_sent == 2
@@ -0,0 +1,98 @@
+"""
+Tests for BatchingInferenceQueue (inference_batcher.py): batch collection
+(immediate flush, waiting only for announced images, expect() count
+reconciliation) and failure of a whole batch when its forward pass throws.
+"""
+
+import sys
+import os
+import time
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from inference_batcher import BatchingInferenceQueue
+
+
+IMAGE = np.ones((4, 4, 3), dtype=np.float32)
+
+
+def row_sums(batch: np.ndarray) -> np.ndarray:
+    return batch.sum(axis=(1, 2, 3))[:, np.newaxis]
+
+
+def test_lone_image_is_not_held_for_the_window():
+    q = BatchingInferenceQueue("lone", row_sums, max_batch_size=8, max_wait_ms=500)
+    start = time.perf_counter()
+    row, info = q.infer(IMAGE)
+    assert time.perf_counter() - start < 0.25
+    assert info["batch_size"] == 1
+    assert row[0] == IMAGE.sum()
+
+    start = time.perf_counter()
+    with q.expect():
+        q.infer(IMAGE)
+    assert time.perf_counter() - start < 0.25
+
+
+def test_batch_waits_for_announced_images():
+    q = BatchingInferenceQueue("announced", row_sums, max_batch_size=8, max_wait_ms=2000)
+    announced = threading.Event()
+    sizes = []
+
+    def slow_caller():
+        with q.expect():
+            announced.set()
+            time.sleep(0.1)  # preprocessing
+            sizes.append(q.infer(IMAGE)[1]["batch_size"])
+
+    caller = threading.Thread(target=slow_caller)
+    caller.start()
+    announced.wait()
+    start = time.perf_counter()
+    sizes.append(q.infer(IMAGE)[1]["batch_size"])
+    caller.join()
+
+    assert sizes == [2, 2]
+    # Flushed when the announced image arrived, not at the end of the window
+    assert time.perf_counter() - start < 1.0
+
+
+def test_unsubmitted_announcement_is_reconciled():
+    q = BatchingInferenceQueue("reconcile", row_sums, max_batch_size=8, max_wait_ms=500)
+    with q.expect(3):
+        q.infer(IMAGE)
+        assert q.get_stats()["incoming"] == 2
+    assert q.get_stats()["incoming"] == 0
+
+    start = time.perf_counter()
+    q.infer(IMAGE)
+    assert time.perf_counter() - start < 0.25
+
+
+def test_failed_forward_pass_fails_every_request():
+    release = threading.Event()
+    calls = []
+
+    def failing(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            release.wait()  # hold the first batch so the next two queue up together
+            return row_sums(batch)
+        raise RuntimeError("forward failed")
+
+    q = BatchingInferenceQueue("failing", failing, max_batch_size=8, max_wait_ms=200)
+    first = q.submit(IMAGE)
+    time.sleep(0.05)
+    futures = [q.submit(IMAGE), q.submit(IMAGE)]
+    release.set()
+
+    assert first.result(timeout=2)[1]["batch_size"] == 1
+    for future in futures:
+        with pytest.raises(RuntimeError, match="forward failed"):
+            future.result(timeout=2)
+    assert calls == [1, 2]
+    assert q.get_stats()["errors"] == 2
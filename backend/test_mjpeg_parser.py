@@ -0,0 +1,72 @@
+"""
+Tests for MJPEGParser (mjpeg_stream.py): Content-Length and marker
+framing, frames split across arbitrary chunk boundaries, and resync
+when a part's length does not frame a JPEG.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from mjpeg_stream import MJPEGParser
+
+
+BOUNDARY = b"--123456789000000000000987654321\r\n"
+
+
+def jpeg(payload: bytes) -> bytes:
+    return b"\xff\xd8" + payload + b"\xff\xd9"
+
+
+def part(frame: bytes, with_length: bool = True) -> bytes:
+    headers = b"Content-Type: image/jpeg\r\n"
+    if with_length:
+        headers += b"Content-Length: " + str(len(frame)).encode() + b"\r\n"
+    return BOUNDARY + headers + b"\r\n" + frame + b"\r\n"
+
+
+def feed_all(parser: MJPEGParser, data: bytes, chunk_size: int):
+    frames = []
+    for i in range(0, len(data), chunk_size):
+        frames.extend(bytes(view) for view in parser.feed(data[i:i + chunk_size]))
+    return frames
+
+
+def test_content_length_framing_ignores_inner_eoi():
+    # An 0xFFD9 inside the JPEG (e.g. an EXIF thumbnail) must not end the frame
+    frames = [jpeg(b"thumb\xff\xd9rest" + bytes([i]) * 50) for i in range(3)]
+    parser = MJPEGParser()
+    assert feed_all(parser, b"".join(part(f) for f in frames), 4096) == frames
+    assert parser.length_framed == 3
+    assert parser.marker_framed == 0
+
+
+def test_every_chunk_split():
+    frames = [jpeg(bytes([i]) * (20 + i)) for i in range(4)]
+    stream = b"".join(part(f, with_length=i % 2 == 0) for i, f in enumerate(frames))
+    for chunk_size in range(1, 40):
+        assert feed_all(MJPEGParser(), stream, chunk_size) == frames, chunk_size
+
+
+def test_headerless_marker_framing():
+    frames = [jpeg(b"\x00\r\n\r\n" + bytes([i]) * 30) for i in range(3)]
+    parser = MJPEGParser()
+    assert feed_all(parser, b"".join(frames), 7) == frames
+    assert parser.marker_framed == 3
+
+
+def test_wrong_content_length_resyncs_on_markers():
+    frame = jpeg(b"abc" * 10)
+    bad = BOUNDARY + b"Content-Length: 5\r\n\r\n" + b"junk!" + frame + b"\r\n"
+    parser = MJPEGParser()
+    assert feed_all(parser, bad + part(frame), 4096) == [frame, frame]
+    assert parser.resyncs == 1
+
+
+def test_buffer_is_compacted():
+    frame = jpeg(b"x" * 60_000)
+    parser = MJPEGParser()
+    for _ in range(20):
+        assert [bytes(v) for v in parser.feed(part(frame))] == [frame]
+    assert parser.get_stats()["buffer_kb"] < 600
@@ -0,0 +1,198 @@
+"""
+Tests for ModelRegistry (model_registry.py): lazy loading, pinning,
+LRU eviction under the memory budget (with unloads outside the registry
+lock) and the failed-load cool-down.
+"""
+
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import model_registry
+from model_registry import EVICTED, EVICTING, FAILED, READY, ModelRegistry
+
+
+MB = 1024 * 1024
+
+
+class FakeModels:
+    """load_fn / unload_fn pair recording calls; sizes in MB per model."""
+
+    def __init__(self, sizes, failing=()):
+        self.sizes = sizes
+        self.failing = set(failing)
+        self.loaded = set()
+        self.loads = []
+        self.unloads = []
+
+    def load(self, name):
+        self.loads.append(name)
+        if name in self.failing:
+            raise RuntimeError(f"{name} is corrupt")
+        self.loaded.add(name)
+        return self.sizes[name] * MB
+
+    def unload(self, name):
+        self.unloads.append(name)
+        self.loaded.discard(name)
+
+
+def registry(models, budget_mb=0, retry_s=30):
+    # Late-bound so a test can swap models.load / models.unload afterwards
+    return ModelRegistry(
+        models.sizes, lambda name: models.load(name), lambda name: models.unload(name),
+        budget_mb=budget_mb, retry_s=retry_s,
+    )
+
+
+def test_loads_on_first_use_only():
+    models = FakeModels({"mobilenet": 10, "resnet": 100})
+    reg = registry(models)
+    assert not reg.is_ready("mobilenet")
+    assert reg.ensure_loaded("mobilenet")
+    assert reg.ensure_loaded("mobilenet")
+    assert models.loads == ["mobilenet"]
+    assert reg.resident_bytes() == 10 * MB
+    assert reg.get_status("resnet")["resnet"]["state"] == "unloaded"
+
+
+def test_concurrent_first_requests_share_one_load():
+    models = FakeModels({"mobilenet": 10})
+    gate = threading.Event()
+    load = models.load
+    models.load = lambda name: (gate.wait(), load(name))[1]
+    reg = registry(models)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(reg.ensure_loaded("mobilenet"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join()
+    assert results == [True] * 4
+    assert models.loads == ["mobilenet"]
+
+
+def test_lru_eviction_skips_pinned_models():
+    models = FakeModels({"a": 40, "b": 40, "c": 40})
+    reg = registry(models, budget_mb=100)
+    reg.ensure_loaded("a")
+    reg.ensure_loaded("b")
+    with reg.acquire("a") as ready:
+        assert ready
+        # a is pinned, so the idle b is evicted even though a is older
+        assert reg.ensure_loaded("c")
+        assert models.unloads == ["b"]
+        assert reg.get_status("a")["a"]["in_flight"] == 1
+    assert reg.get_status("b")["b"]["state"] == EVICTED
+    assert reg.get_status("a")["a"]["in_flight"] == 0
+
+    # a is now the least recently used idle model
+    reg.ensure_loaded("c")
+    assert reg.ensure_loaded("b")
+    assert models.unloads == ["b", "a"]
+    assert reg.resident_bytes() == 80 * MB
+
+
+def test_budget_is_soft_when_everything_is_pinned():
+    models = FakeModels({"a": 80, "b": 80})
+    reg = registry(models, budget_mb=100)
+    with reg.acquire("a"):
+        assert reg.ensure_loaded("b")
+    assert models.unloads == []
+    assert reg.resident_bytes() == 160 * MB
+
+
+def test_unload_runs_outside_the_registry_lock():
+    models = FakeModels({"a": 60, "b": 60})
+    reg = registry(models, budget_mb=100)
+    reg.ensure_loaded("a")
+
+    unloading = threading.Event()
+    release = threading.Event()
+    unload = models.unload
+
+    def slow_unload(name):
+        unloading.set()
+        release.wait(5)
+        unload(name)
+
+    models.unload = slow_unload
+    loader = threading.Thread(target=lambda: reg.ensure_loaded("b"))
+    loader.start()
+    assert unloading.wait(5)
+
+    # While a is being unloaded the registry still answers; a counts as resident
+    # until unload_fn returns
+    assert reg.get_status("a")["a"]["state"] == EVICTING
+    assert reg.resident_bytes() == 120 * MB
+    with reg.acquire("b"):
+        pass
+
+    # A request for a waits for the unload to finish, then reloads it
+    reloader = threading.Thread(target=lambda: reg.ensure_loaded("a"))
+    reloader.start()
+    reloader.join(0.05)
+    assert reloader.is_alive()
+    release.set()
+    loader.join()
+    reloader.join()
+    assert models.unloads[0] == "a"
+    assert models.loads == ["a", "b", "a"]
+    assert reg.get_status("a")["a"]["evictions"] == 1
+    assert reg.is_ready("a")
+
+
+def test_failed_unload_keeps_the_model_ready():
+    models = FakeModels({"a": 60, "b": 60})
+    reg = registry(models, budget_mb=100)
+    reg.ensure_loaded("a")
+
+    def broken_unload(name):
+        raise RuntimeError("still referenced")
+
+    models.unload = broken_unload
+    assert reg.ensure_loaded("b")
+    assert reg.is_ready("a")
+    assert reg.get_status("a")["a"]["evictions"] == 0
+    assert reg.resident_bytes() == 120 * MB
+
+
+def test_explicit_evict():
+    models = FakeModels({"a": 10})
+    reg = registry(models)
+    assert not reg.evict("a")
+    reg.ensure_loaded("a")
+    with reg.acquire("a"):
+        assert not reg.evict("a")
+    assert reg.evict("a")
+    assert reg.get_status("a")["a"]["evictions"] == 1
+    with reg.acquire("a") as ready:
+        assert ready
+    assert models.loads == ["a", "a"]
+
+
+def test_failed_load_cool_down(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(model_registry.time, "time", lambda: now[0])
+    models = FakeModels({"resnet": 100}, failing={"resnet"})
+    reg = registry(models, retry_s=30)
+
+    assert not reg.ensure_loaded("resnet")
+    status = reg.get_status("resnet")["resnet"]
+    assert status["state"] == FAILED
+    assert "corrupt" in status["error"]
+
+    now[0] += 10
+    with reg.acquire("resnet") as ready:
+        assert not ready
+    assert models.loads == ["resnet"]
+
+    now[0] += 25
+    models.failing.clear()
+    assert reg.ensure_loaded("resnet")
+    assert models.loads == ["resnet", "resnet"]
+    assert reg.get_status("resnet")["resnet"]["state"] == READY
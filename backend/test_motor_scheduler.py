@@ -0,0 +1,96 @@
+"""
+Tests for MotorCommandScheduler (motor_scheduler.py): how queued commands
+collapse into device requests, which acks report coalesced, and the
+coalesced counter.
+"""
+
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from motor_scheduler import MotorCommand, MotorCommandScheduler
+
+
+def batch(*commands):
+    """MotorCommands from names or (name, args) pairs."""
+    return [
+        MotorCommand(c, {}, None) if isinstance(c, str) else MotorCommand(*c, None)
+        for c in commands
+    ]
+
+
+class FakeESP32:
+    """Records motor requests; each takes a moment so commands queue up behind it."""
+
+    is_connected = True
+
+    def __init__(self):
+        self.requests = []
+
+    def __getattr__(self, command):
+        async def send(**args):
+            self.requests.append((command, args))
+            await asyncio.sleep(0.01)
+            return True
+        return send
+
+
+def test_collapse_sums_jogs_per_axis():
+    requests = MotorCommandScheduler.collapse(batch("motor_left", "motor_left", "motor_up", "motor_right"))
+    assert requests == [("motor_left", {"step": 5}), ("motor_up", {"step": 5})]
+
+
+def test_collapse_absolute_supersedes_earlier_commands():
+    requests = MotorCommandScheduler.collapse(batch(
+        "motor_left", ("set_position", {"pan": 10, "tilt": 40}), ("motor_down", {"step": 3}),
+    ))
+    assert requests == [("set_position", {"pan": 10, "tilt": 40}), ("motor_down", {"step": 3})]
+
+
+def test_collapse_cancelling_jogs_send_nothing():
+    assert MotorCommandScheduler.collapse(batch("motor_up", "motor_down")) == []
+
+
+def test_folded_flags():
+    folded = MotorCommandScheduler.folded
+    # One request per command: nothing was coalesced
+    assert folded(batch("motor_left", "motor_up")) == [False, False]
+    # Jogs merged on the pan axis; the tilt jog has its own request
+    assert folded(batch("motor_left", "motor_left", "motor_up")) == [True, True, False]
+    # Everything before the last absolute command is superseded
+    assert folded(batch("motor_up", "motor_center", "motor_left")) == [True, False, False]
+    assert folded(batch("motor_center", "motor_stop")) == [True, False]
+
+
+def test_acks_and_coalesced_count():
+    async def run():
+        esp32 = FakeESP32()
+        scheduler = MotorCommandScheduler(esp32, min_interval_s=0)
+        first = scheduler.submit("motor_center")
+        await asyncio.sleep(0)  # first request is now in flight
+        queued = [scheduler.submit(c) for c in ("motor_left", "motor_left", "motor_up")]
+        acks = await asyncio.gather(first, *queued)
+        await scheduler.stop()
+        return esp32.requests, acks, scheduler.get_stats()
+
+    requests, acks, stats = asyncio.run(run())
+    assert requests == [("motor_center", {}), ("motor_left", {"step": 10}), ("motor_up", {"step": 5})]
+    assert all(ack["success"] for ack in acks)
+    assert [ack["coalesced"] for ack in acks] == [False, True, True, False]
+    assert stats["submitted"] == 4
+    assert stats["requests"] == 3
+    assert stats["coalesced"] == 1
+
+
+def test_independent_jogs_are_not_counted_as_coalesced():
+    async def run():
+        scheduler = MotorCommandScheduler(FakeESP32(), min_interval_s=0)
+        acks = await asyncio.gather(scheduler.submit("motor_left"), scheduler.submit("motor_up"))
+        await scheduler.stop()
+        return acks, scheduler.get_stats()
+
+    acks, stats = asyncio.run(run())
+    assert [ack["coalesced"] for ack in acks] == [False, False]
+    assert stats["coalesced"] == 0
@@ -0,0 +1,116 @@
+"""
+Tests for SingleFlight / AsyncSingleFlight (request_coalescer.py):
+concurrent callers with the same key share one execution, results are
+copied per caller, and errors reach every waiter.
+"""
+
+import sys
+import os
+import time
+import asyncio
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from request_coalescer import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+    started = threading.Event()
+
+    def work():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return {"advice": ["spray"]}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    leader.start()
+    started.wait()
+    waiters = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(4)]
+    for t in waiters:
+        t.start()
+    for t in [leader, *waiters]:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{"advice": ["spray"]}] * 5
+    # Each caller got its own copy
+    assert len({id(r) for r in results}) == 5
+    stats = flight.get_stats()
+    assert stats["executions"] == 1 and stats["coalesced"] == 4
+    assert flight.in_flight() == 0
+
+
+def test_errors_reach_waiters_and_key_is_released():
+    flight = SingleFlight("test")
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError("groq down")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    waiter = threading.Thread(target=call)
+    waiter.start()
+    leader.join()
+    waiter.join()
+
+    assert errors == ["groq down", "groq down"]
+    assert flight.do("k", lambda: 42) == 42
+
+
+def test_async_callers_share_one_execution():
+    async def run():
+        flight = AsyncSingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"sources": []}
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+        return calls, results, flight
+
+    calls, results, flight = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [{"sources": []}] * 5
+    assert len({id(r) for r in results}) == 5
+    assert flight.get_stats()["coalesced"] == 4
+    assert flight.in_flight() == 0
+
+
+def test_async_cancelled_caller_does_not_cancel_shared_work():
+    async def run():
+        flight = AsyncSingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
@@ -0,0 +1,93 @@
+"""
+Tests for the scan path planners (scan_planner.py): serpentine coverage,
+coarse-to-fine refinement around hits, hotspot revisits and
+travel-ordered paths.
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from scan_planner import (
+    CoarseToFinePlanner,
+    HotspotPlanner,
+    SerpentinePlanner,
+    create_planner,
+    order_by_travel,
+    path_travel,
+    travel,
+)
+
+
+BOUNDS = (0, 60, 30, 60, 15)  # pan_min, pan_max, tilt_min, tilt_max, step
+
+
+def test_travel_is_slower_axis_from_center():
+    assert travel(None, (90, 75)) == 0
+    assert travel((0, 30), (20, 35)) == 20
+    assert travel(None, (0, 75)) == 90
+
+
+def test_serpentine_covers_grid_and_ends():
+    planner = SerpentinePlanner(*BOUNDS)
+    positions = planner.next_pass([])
+    assert len(positions) == len(set(positions)) == 5 * 3
+    # Rows alternate direction, so consecutive rows join at the same edge
+    assert positions[:5] == [(0, 30), (15, 30), (30, 30), (45, 30), (60, 30)]
+    assert positions[5] == (60, 45)
+    assert planner.next_pass([]) == []
+
+
+def test_serpentine_includes_upper_bound():
+    positions = SerpentinePlanner(0, 50, 30, 30, 20).next_pass([])
+    assert [p for p, _ in positions] == [0, 20, 40, 50]
+
+
+def test_coarse_to_fine_refines_only_around_hits():
+    planner = CoarseToFinePlanner(*BOUNDS, coarse_factor=2)
+    coarse = planner.next_pass([])
+    assert set(coarse) == {(p, t) for t in (30, 60) for p in (0, 30, 60)}
+
+    fine = planner.next_pass([(30, 30)], current=coarse[-1])
+    assert fine
+    assert not set(fine) & set(coarse)
+    assert all(abs(p - 30) <= 30 and abs(t - 30) <= 30 for p, t in fine)
+    assert planner.next_pass([(30, 30)]) == []
+
+
+def test_coarse_to_fine_without_hits_stops():
+    planner = CoarseToFinePlanner(*BOUNDS)
+    planner.next_pass([])
+    assert planner.next_pass([]) == []
+    assert planner.passes == 1
+
+
+def test_hotspots_revisit_neighbourhoods():
+    planner = HotspotPlanner(*BOUNDS, hotspots=[(0, 30), (60, 60)], radius=15)
+    positions = planner.next_pass([])
+    assert set(positions) == {
+        (0, 30), (15, 30), (0, 45), (15, 45),
+        (45, 45), (60, 45), (45, 60), (60, 60),
+    }
+
+
+def test_hotspots_fall_back_to_serpentine():
+    assert HotspotPlanner(*BOUNDS).next_pass([]) == SerpentinePlanner(*BOUNDS).next_pass([])
+
+
+def test_order_by_travel_is_greedy_and_shorter():
+    points = [(0, 30), (60, 60), (15, 30), (45, 60), (30, 45)]
+    ordered = order_by_travel(points, start=(0, 30))
+    assert sorted(ordered) == sorted(points)
+    assert ordered[0] == (0, 30)
+    assert path_travel(ordered, (0, 30)) <= path_travel(points, (0, 30))
+
+
+def test_create_planner():
+    assert isinstance(create_planner("coarse_to_fine", *BOUNDS), CoarseToFinePlanner)
+    assert isinstance(create_planner("HOTSPOTS", *BOUNDS), HotspotPlanner)
+    with pytest.raises(ValueError):
+        create_planner("spiral", *BOUNDS)
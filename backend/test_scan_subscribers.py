@@ -0,0 +1,91 @@
+"""
+Tests for ScanSubscriber / SubscriberHub (scan_subscribers.py): latest-wins
+frames, in-order reliable events, backlog accounting, overflow and close.
+"""
+
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from scan_subscribers import ScanSubscriber, SubscriberHub, SubscriberOverflow
+
+
+def event(event_type: str, n: int = 0):
+    return SimpleNamespace(event_type=event_type, n=n)
+
+
+def drain(sub: ScanSubscriber):
+    """Pending events in delivery order (without waiting)."""
+    async def run():
+        out = []
+        while sub.backlog:
+            out.append(await sub.get())
+        return out
+    return [(e.event_type, e.n) for e in asyncio.run(run())]
+
+
+def test_newer_frame_replaces_pending_one_in_order():
+    sub = ScanSubscriber(max_pending=10)
+    sub.put(event("frame", 1))
+    sub.put(event("classification", 1))
+    sub.put(event("frame", 2))
+    sub.put(event("advice", 1))
+    sub.put(event("frame", 3))
+    assert sub.backlog == 3
+
+    # frame 1 and 2 were superseded; frame 3 keeps its place after advice
+    assert drain(sub) == [("classification", 1), ("advice", 1), ("frame", 3)]
+    stats = sub.get_stats()
+    assert stats["coalesced"] == {"frame": 2}
+    assert stats["delivered"] == {"classification": 1, "advice": 1, "frame": 1}
+    assert stats["max_backlog"] == 3
+
+
+def test_reliable_pending_accounting():
+    sub = ScanSubscriber(max_pending=10)
+    for i in range(3):
+        sub.put(event("classification", i))
+    sub.put(event("frame", 0))
+    assert sub._reliable_pending == 3
+    assert sub.backlog == 4
+
+    assert drain(sub) == [("classification", 0), ("classification", 1), ("classification", 2), ("frame", 0)]
+    assert sub._reliable_pending == 0
+    assert sub.backlog == 0
+
+
+def test_overflow_drops_the_subscriber():
+    sub = ScanSubscriber(max_pending=2)
+    sub.put(event("advice", 0))
+    sub.put(event("advice", 1))
+    # Frames never count towards the limit
+    for i in range(5):
+        sub.put(event("frame", i))
+    with pytest.raises(SubscriberOverflow):
+        sub.put(event("advice", 2))
+
+    hub = SubscriberHub(max_pending=1)
+    slow = hub.subscribe("slow")
+    hub.publish(event("advice", 0))
+    hub.publish(event("advice", 1))
+    assert len(hub) == 0
+    assert hub.dropped == 1
+    assert slow.closed
+
+
+def test_close_wakes_get_with_none():
+    async def run():
+        sub = ScanSubscriber()
+        waiter = asyncio.create_task(sub.get())
+        await asyncio.sleep(0.01)
+        sub.close()
+        result = await asyncio.wait_for(waiter, 1.0)
+        sub.put(event("advice"))
+        return result, await sub.get(), sub.backlog
+
+    assert asyncio.run(run()) == (None, None, 0)
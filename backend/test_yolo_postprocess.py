@@ -0,0 +1,87 @@
+"""
+Tests for YOLO post-processing (yolo_detector.py): vectorized NMS against
+the classic greedy loop, and _postprocess_batch box decoding. Neither
+needs onnxruntime or a model file.
+"""
+
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from yolo_detector import YOLODetector, nms
+
+
+def reference_nms(boxes, scores, iou_threshold):
+    """The classic loop the vectorized nms() replaced."""
+    order = list(np.argsort(-scores, kind="stable"))
+    keep = []
+    while order:
+        i = order.pop(0)
+        keep.append(i)
+        remaining = []
+        for j in order:
+            xx1, yy1 = max(boxes[i, 0], boxes[j, 0]), max(boxes[i, 1], boxes[j, 1])
+            xx2, yy2 = min(boxes[i, 2], boxes[j, 2]), min(boxes[i, 3], boxes[j, 3])
+            inter = max(0.0, xx2 - xx1) * max(0.0, yy2 - yy1)
+            area_i = (boxes[i, 2] - boxes[i, 0]) * (boxes[i, 3] - boxes[i, 1])
+            area_j = (boxes[j, 2] - boxes[j, 0]) * (boxes[j, 3] - boxes[j, 1])
+            if inter / (area_i + area_j - inter + 1e-6) <= iou_threshold:
+                remaining.append(j)
+        order = remaining
+    return keep
+
+
+def detector(**kwargs) -> YOLODetector:
+    return YOLODetector(model_path=os.path.join(os.path.dirname(__file__), "missing", "model.onnx"), **kwargs)
+
+
+def test_nms_matches_reference():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        xy = rng.uniform(0, 200, size=(60, 2)).astype(np.float32)
+        wh = rng.uniform(5, 80, size=(60, 2)).astype(np.float32)
+        boxes = np.concatenate([xy, xy + wh], axis=1)
+        scores = rng.uniform(0, 1, size=60).astype(np.float32)
+        assert nms(boxes, scores, 0.5).tolist() == reference_nms(boxes, scores, 0.5)
+
+
+def test_nms_empty():
+    assert nms(np.empty((0, 4), np.float32), np.empty(0, np.float32), 0.5).size == 0
+
+
+def yolo_output(rows, n: int = 32):
+    """[1, 5, n] single-class output from (cx, cy, w, h, score) rows, padded with zero-score rows."""
+    output = np.zeros((n, 5), dtype=np.float32)
+    output[:len(rows)] = rows
+    return output.T[np.newaxis]
+
+
+def test_postprocess_batch_decodes_and_filters():
+    det = detector(conf_threshold=0.25, iou_threshold=0.5)
+    image_a = yolo_output([
+        (100, 100, 40, 20, 0.9),
+        (102, 101, 40, 20, 0.8),  # overlaps the first: suppressed
+        (300, 300, 20, 20, 0.1),  # below the confidence threshold
+    ])
+    image_b = yolo_output([(50, 60, 10, 10, 0.1), (200, 200, 10, 10, 0.05)])
+    outputs = np.concatenate([image_a, image_b])
+    # ratio 0.5 with (10, 20) letterbox padding; image_b keeps its pixels
+    metas = [(0.5, (10, 20), 1280, 960, (1.0, 1.0)), (1.0, (0, 0), 640, 640, (1.0, 1.0))]
+
+    results = det._postprocess_batch(outputs, metas)
+    assert len(results) == 2
+    assert results[1] == []
+    (box,) = results[0]
+    assert (box.x1, box.y1, box.x2, box.y2) == (140.0, 140.0, 220.0, 180.0)
+    assert box.confidence == 0.9
+    assert box.class_name == "Tomato_Leaf"
+
+
+def test_postprocess_applies_decode_scale_and_clips():
+    det = detector(conf_threshold=0.25)
+    output = yolo_output([(5, 5, 20, 20, 0.7)])[0]
+    (box,) = det._postprocess(output, 1.0, (0, 0), 100, 100, scale=(2.0, 2.0))
+    assert (box.x1, box.y1, box.x2, box.y2) == (0.0, 0.0, 30.0, 30.0)
@@ -4,9 +4,12 @@ TensorFlow/Keras model loader and disease prediction
 
 Features:
 - Dual model support (MobileNetV2 / ResNet50)
-- Robust image preprocessing pipeline
+- Lazy loading with memory-budgeted LRU eviction (model_registry)
+- Robust image preprocessing pipeline (single decode, fused into reused buffers)
 - Comprehensive logging and error handling
 - Memory-efficient inference
+- Dynamic micro-batching shared by web uploads and robot scans
+- Pluggable per-model backends (Keras / traced tf.function / TFLite fp32, fp16, int8)
 - Model status monitoring
 
 Configuration (from training metadata):
@@ -16,13 +19,13 @@ Configuration (from training metadata):
 """
 
 import os
+import gc
 import json
 import logging
 import time
-from typing import Tuple, Optional, Dict, Any, List
+from typing import Tuple, Optional, Dict, Any, List, Union
 
 import numpy as np
-import cv2
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,6 +38,11 @@ import tensorflow as tf
 from tensorflow.keras.applications.mobilenet_v2 import preprocess_input as mobilenet_preprocess
 from tensorflow.keras.applications.resnet50 import preprocess_input as resnet_preprocess
 
+from inference_batcher import BatchingInferenceQueue, BATCHING_ENABLED, batch_config
+from inference_backends import create_backend, backend_mode, needs_keras_model
+from model_registry import ModelRegistry, READY
+from image_preprocessing import DecodedImage, decode_image, classifier_input
+
 # ============================================================================
 # CONFIGURATION - Extracted from training notebook/metadata
 # ============================================================================
@@ -77,6 +85,9 @@ MODEL_PATHS = {
     "resnet": os.path.join(BACKEND_DIR, "models", "resnet50", "resnet50_finetuned.h5")
 }
 
+# Models loaded at startup (the rest load on first request)
+PRELOAD_MODELS = os.getenv("VISION_PRELOAD_MODELS", "mobilenet").lower().strip()
+
 # Preprocessing functions per model type
 PREPROCESS_FN = {
     "mobilenet": mobilenet_preprocess,
@@ -97,44 +108,135 @@ _load_status: Dict[str, bool] = {
     "resnet": False
 }
 
+# Per-model forward-pass backends (keras / tf_function / tflite_*)
+_backends: Dict[str, Any] = {}
+
+# Per-model batching queues (created once the model is loaded)
+_batchers: Dict[str, BatchingInferenceQueue] = {}
+
 
 # ============================================================================
 # MODEL LOADER
 # ============================================================================
 
-def load_models() -> Dict[str, bool]:
+def _weights_bytes(model) -> int:
+    """Resident size estimate of a Keras model (its weight tensors)."""
+    return int(sum(np.prod(w.shape) * w.dtype.size for w in model.weights))
+
+
+def _load_model(model_type: str) -> int:
     """
-    Load TensorFlow/Keras models from disk.
-    Uses try/except to handle missing files gracefully.
+    Load one model and its inference backend (registry load_fn).
+    
+    Models configured for a TFLite backend are served from the .tflite
+    artifact alone; the Keras .h5 is only loaded for keras / tf_function
+    backends, or as a fallback when the TFLite artifact is missing.
     
     Returns:
-        Dictionary indicating which models were successfully loaded
+        Estimated resident size in bytes
     """
-    global _models, _load_status
+    model_path = MODEL_PATHS[model_type]
+    start_time = time.time()
+    mode = backend_mode(model_type)
+    backend = None
     
-    for model_type, model_path in MODEL_PATHS.items():
-        try:
-            if os.path.exists(model_path):
-                logger.info(f"🔄 Loading {model_type} model from: {model_path}")
-                start_time = time.time()
-                
-                _models[model_type] = tf.keras.models.load_model(model_path, compile=False)
-                _load_status[model_type] = True
-                
-                load_time = time.time() - start_time
-                logger.info(f"✅ {model_type} model loaded in {load_time:.2f}s")
-                logger.info(f"   Input shape: {_models[model_type].input_shape}")
-                logger.info(f"   Output shape: {_models[model_type].output_shape}")
-            else:
-                _load_status[model_type] = False
-                logger.warning(f"⚠️  Model file not found: {model_path}")
-        except Exception as e:
+    if not needs_keras_model(mode):
+        backend = create_backend(model_type, None, mode)
+    
+    if backend is None:
+        if not os.path.exists(model_path):
             _load_status[model_type] = False
-            logger.error(f"❌ Failed to load {model_type} model: {str(e)}")
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+        
+        logger.info(f"🔄 Loading {model_type} model from: {model_path}")
+        _models[model_type] = tf.keras.models.load_model(model_path, compile=False)
+        logger.info(f"   Input shape: {_models[model_type].input_shape}")
+        logger.info(f"   Output shape: {_models[model_type].output_shape}")
+        
+        keras_mode = mode if needs_keras_model(mode) else "tf_function"
+        backend = create_backend(model_type, _models[model_type], keras_mode)
+        size = _weights_bytes(_models[model_type])
+    else:
+        size = backend.size_bytes
+    
+    _backends[model_type] = backend
+    _load_status[model_type] = True
+    
+    load_time = time.time() - start_time
+    logger.info(f"✅ {model_type} model loaded in {load_time:.2f}s (backend={backend.mode})")
+    
+    if BATCHING_ENABLED and model_type not in _batchers:
+        max_size, max_wait_ms = batch_config(model_type)
+        _batchers[model_type] = BatchingInferenceQueue(
+            model_type,
+            lambda batch, m=model_type: _run_batch(m, batch),
+            max_batch_size=max_size,
+            max_wait_ms=max_wait_ms,
+        )
+    return size
+
+
+def _unload_model(model_type: str):
+    """Drop a model's Keras graph and backend (registry unload_fn). The batch queue is kept."""
+    _backends.pop(model_type, None)
+    _models[model_type] = None
+    _load_status[model_type] = False
+    gc.collect()
+
+
+# Models are loaded on first use and evicted LRU under VISION_MEMORY_BUDGET_MB
+_registry = ModelRegistry(MODEL_PATHS.keys(), _load_model, _unload_model)
+
+
+def preload_models() -> List[str]:
+    """Models named in VISION_PRELOAD_MODELS ("all", "none" or a comma-separated list)."""
+    if PRELOAD_MODELS in {"", "none"}:
+        return []
+    if PRELOAD_MODELS == "all":
+        return list(MODEL_PATHS)
+    return [m.strip() for m in PRELOAD_MODELS.split(",") if m.strip() in MODEL_PATHS]
+
+
+def load_models(model_types: Optional[List[str]] = None) -> Dict[str, bool]:
+    """
+    Load disease models now instead of on first use.
+    Uses the registry, so missing files are handled gracefully and the
+    memory budget still applies.
+    
+    Args:
+        model_types: Models to load (default: all)
     
+    Returns:
+        Dictionary indicating which models were successfully loaded
+    """
+    _registry.preload(model_types if model_types is not None else list(MODEL_PATHS))
     return _load_status.copy()
 
 
+def ensure_model(model_type: str) -> bool:
+    """Load a model if it is not resident. Returns True if it is ready."""
+    return _registry.ensure_loaded(model_type)
+
+
+def get_readiness(model_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Per-model registry state for readiness probes.
+    
+    ready is True when the requested model (or, without one, every
+    preloaded model) is resident.
+    """
+    stats = _registry.get_stats()
+    models = stats["models"] if model_type is None else _registry.get_status(model_type)
+    required = [model_type] if model_type else preload_models()
+    return {
+        "ready": all(models.get(m, {}).get("state") == READY for m in required),
+        "required": required,
+        "budget_mb": stats["budget_mb"],
+        "resident_mb": stats["resident_mb"],
+        "models": models,
+    }
+
+
 # ============================================================================
 # IMAGE PREPROCESSING
 # ============================================================================
@@ -171,21 +273,20 @@ def validate_image_bytes(image_bytes: bytes) -> bool:
     return False
 
 
-def preprocess_image(image_bytes: bytes, model_type: str = "mobilenet") -> np.ndarray:
+def preprocess_image(
+    image: Union[bytes, DecodedImage], model_type: str = "mobilenet", out: np.ndarray = None
+) -> np.ndarray:
     """
-    Preprocess image bytes for model inference.
-    Replicates the exact preprocessing from the training notebook.
-    
-    Steps:
-    1. Decode bytes to numpy array (OpenCV)
-    2. Convert BGR to RGB
-    3. Resize to 224x224
-    4. Apply model-specific preprocessing (tf.keras.applications.[model].preprocess_input)
-    5. Add batch dimension
+    Preprocess an image for model inference.
+    Replicates the exact preprocessing from the training notebook
+    (resize 224x224 -> RGB -> float32 -> preprocess_input), fused into
+    one write into the output array by image_preprocessing.
     
     Args:
-        image_bytes: Raw image bytes (JPEG/PNG)
+        image: Raw image bytes (JPEG/PNG) or an already decoded image
         model_type: 'mobilenet' or 'resnet' (determines preprocessing function)
+        out: Optional (1, 224, 224, 3) float32 destination (e.g. a reused
+            per-thread buffer); a new array is returned otherwise
     
     Returns:
         Preprocessed numpy array ready for model inference
@@ -194,45 +295,34 @@ def preprocess_image(image_bytes: bytes, model_type: str = "mobilenet") -> np.nd
     Raises:
         ValueError: If image cannot be decoded or processed
     """
-    # Decode image bytes to numpy array
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    
-    if img is None:
-        logger.error("Failed to decode image bytes")
-        raise ValueError("Failed to decode image. Please provide a valid JPEG, PNG, or WebP file.")
-    
-    # Convert BGR (OpenCV default) to RGB
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    
-    # Resize to target size (224x224)
-    img = cv2.resize(img, IMG_SIZE, interpolation=cv2.INTER_AREA)
-    
-    # Convert to float32
-    img = img.astype(np.float32)
-    
-    # Apply model-specific preprocessing
-    # MobileNetV2: scales pixels to [-1, 1]
-    # ResNet50: zero-centers each color channel with respect to ImageNet
-    preprocess_fn = PREPROCESS_FN.get(model_type, mobilenet_preprocess)
-    img = preprocess_fn(img)
-    
-    # Add batch dimension: (224, 224, 3) -> (1, 224, 224, 3)
-    img = np.expand_dims(img, axis=0)
+    if not isinstance(image, DecodedImage):
+        try:
+            image = decode_image(image, min_side=IMG_SIZE[0])
+        except ValueError:
+            logger.error("Failed to decode image bytes")
+            raise
     
-    return img
+    if out is None:
+        out = np.empty((1,) + IMG_SIZE + (3,), dtype=np.float32)
+    return classifier_input(image, model_type if model_type in PREPROCESS_FN else "mobilenet", out=out)
 
 
 # ============================================================================
 # PREDICTION
 # ============================================================================
 
-def predict_disease(image_bytes: bytes, model_type: str = "mobilenet") -> Dict[str, Any]:
+def _run_batch(model_type: str, batch: np.ndarray) -> np.ndarray:
+    """One forward pass over an (N, 224, 224, 3) batch."""
+    return _backends[model_type].predict_batch(batch)
+
+
+def predict_disease(image_bytes: Union[bytes, DecodedImage], model_type: str = "mobilenet") -> Dict[str, Any]:
     """
     Predict tomato disease from image bytes.
     
     Args:
-        image_bytes: Raw image bytes (JPEG/PNG)
+        image_bytes: Raw image bytes (JPEG/PNG), or a DecodedImage shared with
+            the YOLO detector so a scanned frame is decoded only once
         model_type: 'mobilenet' or 'resnet'
     
     Returns:
@@ -245,49 +335,129 @@ def predict_disease(image_bytes: bytes, model_type: str = "mobilenet") -> Dict[s
     """
     start_time = time.time()
     
-    # Normalize model_type input
+    # Normalize and validate model_type input
+    model_type = _normalize_model_type(model_type)
+    
+    # Decode once (reduced-size for large JPEGs) before touching the model
+    image = image_bytes if isinstance(image_bytes, DecodedImage) else decode_image(image_bytes, min_side=IMG_SIZE[0])
+    
+    # Load on first use and pin the model so it is not evicted mid-request
+    with _registry.acquire(model_type) as ready:
+        if not ready:
+            logger.warning(f"⚠️  Model '{model_type}' not loaded, returning fallback response")
+            return _not_loaded_result()
+        
+        batcher = _batchers.get(model_type)
+        batch_info = None
+        if batcher is not None:
+            # Announced while preprocessing, so a batch being collected waits for this image
+            with batcher.expect():
+                # Preprocess into this thread's reusable input buffer (the batch queue
+                # copies it into the stacked batch before we return)
+                processed_img = classifier_input(image, model_type)
+                inference_start = time.time()
+                row, batch_info = batcher.infer(processed_img)
+            predictions = row[np.newaxis, :]
+        else:
+            processed_img = classifier_input(image, model_type)
+            inference_start = time.time()
+            predictions = _run_batch(model_type, processed_img)
+        inference_time = (time.time() - inference_start) * 1000
+    
+    result = _build_result(predictions[0], inference_time, start_time, batch_info)
+    
+    # Log prediction
+    logger.info(f"🎯 Prediction: {result['class']} ({result['confidence']:.2%}) in {inference_time:.1f}ms")
+    
+    return result
+
+
+def predict_batch(images: List[Union[bytes, DecodedImage]], model_type: str = "mobilenet") -> List[Dict[str, Any]]:
+    """
+    Classify several images (e.g. YOLO leaf crops of one frame) together.
+    
+    All images are preprocessed into one (N, 224, 224, 3) batch and
+    submitted to the model at once, so they share forward passes (split
+    only by the batch queue's max size).
+    
+    Args:
+        images: Raw image bytes or DecodedImage crops
+        model_type: 'mobilenet' or 'resnet'
+    
+    Returns:
+        One predict_disease-style result dict per image, in order
+    """
+    start_time = time.time()
+    model_type = _normalize_model_type(model_type)
+    if not images:
+        return []
+    
+    batch = np.empty((len(images),) + IMG_SIZE + (3,), dtype=np.float32)
+    for i, image in enumerate(images):
+        if not isinstance(image, DecodedImage):
+            image = decode_image(image, min_side=IMG_SIZE[0])
+        classifier_input(image, model_type, out=batch[i:i + 1])
+    
+    with _registry.acquire(model_type) as ready:
+        if not ready:
+            logger.warning(f"⚠️  Model '{model_type}' not loaded, returning fallback responses")
+            return [_not_loaded_result() for _ in images]
+        
+        inference_start = time.time()
+        batcher = _batchers.get(model_type)
+        if batcher is not None:
+            with batcher.expect(len(images)):
+                futures = [batcher.submit(batch[i]) for i in range(len(images))]
+            outputs = [f.result() for f in futures]
+            rows = [row for row, _ in outputs]
+            infos = [info for _, info in outputs]
+        else:
+            rows = list(_run_batch(model_type, batch))
+            infos = [None] * len(images)
+        inference_time = (time.time() - inference_start) * 1000
+    
+    results = [_build_result(row, inference_time, start_time, info) for row, info in zip(rows, infos)]
+    logger.info(
+        f"🎯 Batch prediction: {len(results)} images in {inference_time:.1f}ms | "
+        + ", ".join(f"{r['class']} ({r['confidence']:.0%})" for r in results)
+    )
+    return results
+
+
+def _normalize_model_type(model_type: str) -> str:
     model_type = model_type.lower().strip()
     if model_type == "mobile":
         model_type = "mobilenet"
-    
-    # Validate model type
     if model_type not in _models:
         raise ValueError(f"Invalid model type: '{model_type}'. Use 'mobilenet' or 'resnet'.")
-    
-    # Check if model is loaded
-    model = _models.get(model_type)
-    if model is None:
-        logger.warning(f"⚠️  Model '{model_type}' not loaded, returning fallback response")
-        return {
-            "class": "Model Not Loaded",
-            "confidence": 0.0,
-            "raw_class": None,
-            "all_predictions": None,
-            "inference_time_ms": 0
-        }
-    
-    # Preprocess image with the correct preprocessing function
-    processed_img = preprocess_image(image_bytes, model_type=model_type)
-    
-    # Run inference
-    inference_start = time.time()
-    predictions = model.predict(processed_img, verbose=0)
-    inference_time = (time.time() - inference_start) * 1000
-    
+    return model_type
+
+
+def _not_loaded_result() -> Dict[str, Any]:
+    return {
+        "class": "Model Not Loaded",
+        "confidence": 0.0,
+        "raw_class": None,
+        "all_predictions": None,
+        "inference_time_ms": 0
+    }
+
+
+def _build_result(
+    probs: np.ndarray, inference_time: float, start_time: float, batch_info: Optional[Dict[str, float]]
+) -> Dict[str, Any]:
+    """Response dict for one row of class probabilities."""
     # Get predicted class index and confidence
-    predicted_idx = int(np.argmax(predictions[0]))
-    confidence = float(predictions[0][predicted_idx])
+    predicted_idx = int(np.argmax(probs))
+    confidence = float(probs[predicted_idx])
     
     # Map index to class name
     raw_class_name = CLASS_NAMES[predicted_idx]
     display_name = DISPLAY_NAMES.get(raw_class_name, raw_class_name)
     
-    # Log prediction
-    logger.info(f"🎯 Prediction: {display_name} ({confidence:.2%}) in {inference_time:.1f}ms")
-    
     # Build sorted predictions (highest first)
     all_preds = {
-        DISPLAY_NAMES.get(CLASS_NAMES[i], CLASS_NAMES[i]): round(float(predictions[0][i]), 4)
+        DISPLAY_NAMES.get(CLASS_NAMES[i], CLASS_NAMES[i]): round(float(probs[i]), 4)
         for i in range(len(CLASS_NAMES))
     }
     sorted_preds = dict(sorted(all_preds.items(), key=lambda x: x[1], reverse=True))
@@ -302,6 +472,8 @@ def predict_disease(image_bytes: bytes, model_type: str = "mobilenet") -> Dict[s
         "inference_time_ms": round(inference_time, 2),
         "total_time_ms": round(total_time, 2)
     }
+    if batch_info is not None:
+        result["batch"] = batch_info
     
     return result
 
@@ -318,19 +490,25 @@ def get_model_status() -> Dict[str, Any]:
         Dictionary with model loading status and metadata
     """
     status = {}
+    registry = _registry.get_status()
     for model_type, model in _models.items():
-        if model is not None:
+        backend = _backends.get(model_type)
+        if backend is not None:
             status[model_type] = {
                 "loaded": True,
                 "path": MODEL_PATHS[model_type],
-                "input_shape": str(model.input_shape),
-                "output_classes": len(CLASS_NAMES)
+                "input_shape": str(model.input_shape) if model is not None else "(None, 224, 224, 3)",
+                "output_classes": len(CLASS_NAMES),
+                "backend": backend.describe(),
+                "registry": registry[model_type],
+                "batching": _batchers[model_type].get_stats() if model_type in _batchers else None,
             }
         else:
             status[model_type] = {
                 "loaded": False,
                 "path": MODEL_PATHS[model_type],
-                "exists": os.path.exists(MODEL_PATHS[model_type])
+                "exists": os.path.exists(MODEL_PATHS[model_type]),
+                "registry": registry[model_type],
             }
     return status
 
@@ -11,6 +11,19 @@ Model config from models/YoloV8/model_metadata_v2.json:
 - Classes: 1 (Tomato_Leaf)
 - Confidence threshold: 0.25
 - IoU threshold: 0.6
+- Optional: max_candidates (top-k entering NMS, default 300),
+  max_detections (default 100)
+- Optional "onnxruntime" section: SessionOptions (threads, graph
+  optimization level, execution mode, memory pattern/arena) and
+  max_batch_size for detect_batch
+- Single-frame detect()/detect_image() calls from all cameras share one
+  BatchingInferenceQueue when the export has a dynamic batch dimension,
+  so concurrent scans run one batched forward pass instead of several
+
+Configuration (environment):
+- YOLO_BATCHING_ENABLED: "false" runs each frame directly (default true)
+- VISION_BATCH_MAX_SIZE_YOLO / VISION_BATCH_MAX_WAIT_MS_YOLO: batch size
+  (capped at max_batch_size) and window, as for the classifiers
 """
 
 import os
@@ -22,21 +35,25 @@ from typing import List, Tuple, Optional
 
 import numpy as np
 
+from inference_batcher import BatchingInferenceQueue, batch_config
+
 logger = logging.getLogger("AgriSense.YOLO")
 
+BATCHING_ENABLED = os.getenv("YOLO_BATCHING_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+
 # Lazy import - only loaded when detector is instantiated
 ort = None
-cv2 = None
+imgproc = None
 
 
 def _ensure_imports():
-    global ort, cv2
+    global ort, imgproc
     if ort is None:
         import onnxruntime as _ort
         ort = _ort
-    if cv2 is None:
-        import cv2 as _cv2
-        cv2 = _cv2
+    if imgproc is None:
+        import image_preprocessing as _imgproc
+        imgproc = _imgproc
 
 
 @dataclass
@@ -61,6 +78,8 @@ class YOLODetector:
         model_path: str = None,
         conf_threshold: float = 0.25,
         iou_threshold: float = 0.6,
+        max_candidates: int = 300,
+        max_detections: int = 100,
     ):
         if model_path is None:
             backend_dir = os.path.dirname(os.path.abspath(__file__))
@@ -69,10 +88,16 @@ class YOLODetector:
         self.model_path = model_path
         self.conf_threshold = conf_threshold
         self.iou_threshold = iou_threshold
+        self.max_candidates = max_candidates  # top-k boxes entering NMS
+        self.max_detections = max_detections
         self.input_size = (640, 640)
         self.class_names = ["Tomato_Leaf"]
         self.session: Optional[object] = None
         self._loaded = False
+        self.runtime_config: dict = {}  # "onnxruntime" section of the metadata
+        self.max_batch_size = 8
+        self._dynamic_batch = False
+        self._batcher: Optional[BatchingInferenceQueue] = None
 
         # Try loading metadata
         metadata_path = os.path.join(os.path.dirname(model_path), "model_metadata_v2.json")
@@ -83,6 +108,10 @@ class YOLODetector:
                 self.conf_threshold = meta.get("confidence_threshold", conf_threshold)
                 self.iou_threshold = meta.get("iou_threshold", iou_threshold)
                 self.class_names = meta.get("class_names", self.class_names)
+                self.max_candidates = meta.get("max_candidates", max_candidates)
+                self.max_detections = meta.get("max_detections", max_detections)
+                self.runtime_config = meta.get("onnxruntime", {})
+                self.max_batch_size = int(self.runtime_config.get("max_batch_size", self.max_batch_size))
                 input_shape = meta.get("input_shape", [640, 640, 3])
                 self.input_size = (input_shape[0], input_shape[1])
                 logger.info(f"Loaded YOLO metadata: {meta.get('model_name', 'unknown')}")
@@ -105,27 +134,75 @@ class YOLODetector:
             if "CUDAExecutionProvider" in available:
                 providers.insert(0, "CUDAExecutionProvider")
 
-            self.session = ort.InferenceSession(self.model_path, providers=providers)
+            self.session = ort.InferenceSession(
+                self.model_path, sess_options=self._session_options(), providers=providers
+            )
             load_time = (time.time() - start) * 1000
 
             input_info = self.session.get_inputs()[0]
             output_info = self.session.get_outputs()[0]
+            # A symbolic/None leading dim means the export accepts any batch size
+            self._dynamic_batch = not isinstance(input_info.shape[0], int)
             logger.info(
                 f"YOLO model loaded in {load_time:.0f}ms | "
                 f"Input: {input_info.name} {input_info.shape} | "
                 f"Output: {output_info.name} {output_info.shape} | "
-                f"Provider: {self.session.get_providers()[0]}"
+                f"Provider: {self.session.get_providers()[0]} | "
+                f"Batch: {'dynamic' if self._dynamic_batch else 'fixed (re-export with export_yolo_onnx.py for batching)'}"
             )
             self._loaded = True
+            if BATCHING_ENABLED and self._dynamic_batch and self._batcher is None:
+                max_size, max_wait_ms = batch_config("yolo")
+                self._batcher = BatchingInferenceQueue(
+                    "yolo", self._run_batch,
+                    max_batch_size=min(max_size, self.max_batch_size),
+                    max_wait_ms=max_wait_ms,
+                )
             return True
         except Exception as e:
             logger.error(f"Failed to load YOLO model: {e}")
             return False
 
+    def _session_options(self):
+        """
+        SessionOptions from the metadata "onnxruntime" section:
+        intra_op_num_threads, inter_op_num_threads (0 = ORT default),
+        graph_optimization_level (disable | basic | extended | all),
+        execution_mode (sequential | parallel), enable_mem_pattern,
+        enable_cpu_mem_arena.
+        """
+        cfg = self.runtime_config
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = int(cfg.get("intra_op_num_threads", 0))
+        opts.inter_op_num_threads = int(cfg.get("inter_op_num_threads", 0))
+        opts.graph_optimization_level = {
+            "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }.get(str(cfg.get("graph_optimization_level", "all")).lower(), ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+        opts.execution_mode = (
+            ort.ExecutionMode.ORT_PARALLEL
+            if str(cfg.get("execution_mode", "sequential")).lower() == "parallel"
+            else ort.ExecutionMode.ORT_SEQUENTIAL
+        )
+        opts.enable_mem_pattern = bool(cfg.get("enable_mem_pattern", True))
+        opts.enable_cpu_mem_arena = bool(cfg.get("enable_cpu_mem_arena", True))
+        return opts
+
     @property
     def is_loaded(self) -> bool:
         return self._loaded and self.session is not None
 
+    def _run_batch(self, blob: np.ndarray) -> np.ndarray:
+        """Forward pass for the batching queue: (N, 3, H, W) -> (N, 4+C, P)."""
+        input_name = self.session.get_inputs()[0].name
+        return self.session.run(None, {input_name: blob})[0]
+
+    def get_batch_stats(self) -> Optional[dict]:
+        """Cross-camera batching metrics (None when frames run directly)."""
+        return self._batcher.get_stats() if self._batcher is not None else None
+
     def detect(self, image_bytes: bytes) -> List[Detection]:
         """
         Run leaf detection on raw image bytes (JPEG/PNG).
@@ -136,40 +213,99 @@ class YOLODetector:
             raise RuntimeError("YOLO model not loaded. Call load() first.")
 
         _ensure_imports()
+        image = imgproc.decode_image(image_bytes, long_side=max(self.input_size))
+        return self.detect_image(image)
 
-        # Decode image
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError("Failed to decode image bytes")
+    def detect_image(self, image) -> List[Detection]:
+        """
+        Run leaf detection on an image_preprocessing.DecodedImage.
 
-        orig_h, orig_w = img.shape[:2]
+        Lets callers that also classify the frame decode it once; boxes are
+        mapped back to the original (pre-reduced-decode) resolution.
+        """
+        if not self.is_loaded:
+            raise RuntimeError("YOLO model not loaded. Call load() first.")
 
-        # Preprocess: letterbox resize
-        resized, ratio, (pad_w, pad_h) = self._letterbox(img, self.input_size)
+        _ensure_imports()
 
-        # BGR -> RGB, normalize to [0, 1], NHWC -> NCHW
-        blob = resized[:, :, ::-1].astype(np.float32) / 255.0
-        blob = np.transpose(blob, (2, 0, 1))  # HWC -> CHW
-        blob = np.expand_dims(blob, axis=0)  # Add batch: NCHW
+        if self._batcher is not None:
+            # Announce the frame so a batch being collected waits for it instead of flushing
+            with self._batcher.expect():
+                # Letterbox, BGR -> RGB, [0, 1], NCHW in one pass into a reused buffer
+                blob, ratio, pad = imgproc.detector_input(image, self.input_size)
 
-        # Run inference
-        input_name = self.session.get_inputs()[0].name
-        start = time.time()
-        outputs = self.session.run(None, {input_name: blob})
+                # Batched with other cameras' frames; the blob is this thread's buffer and
+                # infer() blocks until the batch has been stacked and run
+                start = time.time()
+                output, batch_info = self._batcher.infer(blob)
+        else:
+            blob, ratio, pad = imgproc.detector_input(image, self.input_size)
+            start = time.time()
+            input_name = self.session.get_inputs()[0].name
+            output, batch_info = self.session.run(None, {input_name: blob})[0], None
         inference_ms = (time.time() - start) * 1000
 
-        # Post-process
-        detections = self._postprocess(outputs[0], ratio, (pad_w, pad_h), orig_w, orig_h)
+        # Post-process (decoded-image pixels -> original pixels via the decode scale)
+        detections = self._postprocess(
+            output, ratio, pad, image.orig_w, image.orig_h,
+            scale=(image.scale_x, image.scale_y),
+        )
 
         logger.info(
             f"YOLO inference: {inference_ms:.1f}ms | "
             f"Detections: {len(detections)} | "
-            f"Image: {orig_w}x{orig_h}"
+            f"Image: {image.orig_w}x{image.orig_h}"
+            + (f" | Batch: {batch_info['batch_size']}" if batch_info else "")
         )
 
         return detections
 
+    def detect_batch(self, images: List[bytes]) -> List[List[Detection]]:
+        """
+        Run leaf detection on several images with batched ONNX Runtime calls.
+
+        Images are letterboxed into one NCHW tensor and run in chunks of
+        max_batch_size (metadata "onnxruntime.max_batch_size"). Models
+        exported with a fixed batch of 1 fall back to one call per image.
+
+        Returns:
+            Per-image detection lists in input order; images that fail to
+            decode get an empty list (logged) so one bad frame does not
+            abort an offline re-analysis run.
+        """
+        if not self.is_loaded:
+            raise RuntimeError("YOLO model not loaded. Call load() first.")
+
+        _ensure_imports()
+        results: List[List[Detection]] = [[] for _ in images]
+        decoded, positions = [], []
+        for i, image_bytes in enumerate(images):
+            try:
+                decoded.append(imgproc.decode_image(image_bytes, long_side=max(self.input_size)))
+                positions.append(i)
+            except ValueError as e:
+                logger.warning(f"YOLO batch: skipping image {i}: {e}")
+
+        chunk = self.max_batch_size if self._dynamic_batch else 1
+        input_name = self.session.get_inputs()[0].name
+        start = time.time()
+        for offset in range(0, len(decoded), chunk):
+            batch = decoded[offset:offset + chunk]
+            blob, letterbox = imgproc.detector_batch(batch, self.input_size)
+            outputs = self.session.run(None, {input_name: blob})
+            metas = [
+                (ratio, pad, img.orig_w, img.orig_h, (img.scale_x, img.scale_y))
+                for img, (ratio, pad) in zip(batch, letterbox)
+            ]
+            for pos, dets in zip(positions[offset:offset + chunk], self._postprocess_batch(outputs[0], metas)):
+                results[pos] = dets
+
+        logger.info(
+            f"YOLO batch inference: {len(decoded)} images in {(time.time() - start) * 1000:.1f}ms "
+            f"(chunk={chunk}) | Detections: {sum(len(r) for r in results)}"
+        )
+        return results
+
     def detect_with_timing(self, image_bytes: bytes) -> Tuple[List[Detection], float]:
         """Run detection and return (detections, inference_time_ms)."""
         if not self.is_loaded:
@@ -181,31 +317,6 @@ class YOLODetector:
         total_ms = (time.time() - start) * 1000
         return detections, total_ms
 
-    def _letterbox(
-        self, img: np.ndarray, new_shape: Tuple[int, int] = (640, 640)
-    ) -> Tuple[np.ndarray, float, Tuple[int, int]]:
-        """Resize image with letterbox padding (preserve aspect ratio)."""
-        h, w = img.shape[:2]
-        ratio = min(new_shape[0] / h, new_shape[1] / w)
-        new_unpad_h, new_unpad_w = int(round(h * ratio)), int(round(w * ratio))
-
-        pad_w = (new_shape[1] - new_unpad_w) // 2
-        pad_h = (new_shape[0] - new_unpad_h) // 2
-
-        if (h, w) != (new_unpad_h, new_unpad_w):
-            img = cv2.resize(img, (new_unpad_w, new_unpad_h), interpolation=cv2.INTER_LINEAR)
-
-        # Add padding
-        padded = cv2.copyMakeBorder(
-            img,
-            pad_h, new_shape[0] - new_unpad_h - pad_h,
-            pad_w, new_shape[1] - new_unpad_w - pad_w,
-            cv2.BORDER_CONSTANT,
-            value=(114, 114, 114),
-        )
-
-        return padded, ratio, (pad_w, pad_h)
-
     def _postprocess(
         self,
         output: np.ndarray,
@@ -213,122 +324,126 @@ class YOLODetector:
         pad: Tuple[int, int],
         orig_w: int,
         orig_h: int,
+        scale: Tuple[float, float] = (1.0, 1.0),
     ) -> List[Detection]:
         """
-        Post-process YOLOv8 ONNX output.
+        Post-process YOLOv8 ONNX output for one image.
 
         YOLOv8 output shape is [1, 4+num_classes, num_predictions] = [1, 5, 8400] for 1 class.
         Rows: [cx, cy, w, h, class_conf...]
         """
-        # Handle output shape
-        if output.ndim == 3:
-            output = output[0]  # Remove batch dim -> [5, 8400] or [8400, 5]
+        if output.ndim == 2:
+            output = output[np.newaxis]
+        return self._postprocess_batch(output, [(ratio, pad, orig_w, orig_h, scale)])[0]
 
-        # YOLOv8 exports as [4+C, N], transpose if needed
-        if output.shape[0] < output.shape[1]:
-            output = output.T  # -> [N, 5]
+    def _postprocess_batch(
+        self,
+        outputs: np.ndarray,
+        metas: List[Tuple[float, Tuple[int, int], int, int, Tuple[float, float]]],
+    ) -> List[List[Detection]]:
+        """
+        Post-process a batch of YOLOv8 outputs.
+
+        Args:
+            outputs: [B, 4+C, N] (or [B, N, 4+C]) raw model output
+            metas: Per image (ratio, (pad_w, pad_h), orig_w, orig_h, (scale_x, scale_y))
 
-        num_detections = output.shape[0]
-        num_classes = output.shape[1] - 4
+        Confidence filtering runs over the whole batch at once; each image
+        then keeps its top max_candidates boxes, transforms them in place
+        and goes through matrix NMS.
+        """
+        # YOLOv8 exports as [B, 4+C, N]; view as [B, N, 4+C] without copying
+        if outputs.shape[1] < outputs.shape[2]:
+            outputs = outputs.transpose(0, 2, 1)
 
-        boxes_xywh = output[:, :4]  # cx, cy, w, h
-        class_scores = output[:, 4:]  # class confidences
+        num_classes = outputs.shape[2] - 4
+        class_scores = outputs[:, :, 4:]
 
         # For single-class, just take the one score
         if num_classes == 1:
-            confidences = class_scores[:, 0]
-            class_ids = np.zeros(num_detections, dtype=int)
+            confidences = class_scores[:, :, 0]
+            class_ids = None
         else:
-            confidences = np.max(class_scores, axis=1)
-            class_ids = np.argmax(class_scores, axis=1)
-
-        # Filter by confidence
-        mask = confidences >= self.conf_threshold
-        boxes_xywh = boxes_xywh[mask]
-        confidences = confidences[mask]
-        class_ids = class_ids[mask]
-
-        if len(boxes_xywh) == 0:
-            return []
-
-        # Convert cx,cy,w,h -> x1,y1,x2,y2
-        boxes_xyxy = np.zeros_like(boxes_xywh)
-        boxes_xyxy[:, 0] = boxes_xywh[:, 0] - boxes_xywh[:, 2] / 2  # x1
-        boxes_xyxy[:, 1] = boxes_xywh[:, 1] - boxes_xywh[:, 3] / 2  # y1
-        boxes_xyxy[:, 2] = boxes_xywh[:, 0] + boxes_xywh[:, 2] / 2  # x2
-        boxes_xyxy[:, 3] = boxes_xywh[:, 1] + boxes_xywh[:, 3] / 2  # y2
-
-        # Scale boxes back to original image coordinates
-        pad_w, pad_h = pad
-        boxes_xyxy[:, 0] = (boxes_xyxy[:, 0] - pad_w) / ratio
-        boxes_xyxy[:, 1] = (boxes_xyxy[:, 1] - pad_h) / ratio
-        boxes_xyxy[:, 2] = (boxes_xyxy[:, 2] - pad_w) / ratio
-        boxes_xyxy[:, 3] = (boxes_xyxy[:, 3] - pad_h) / ratio
-
-        # Clip to image boundaries
-        boxes_xyxy[:, 0] = np.clip(boxes_xyxy[:, 0], 0, orig_w)
-        boxes_xyxy[:, 1] = np.clip(boxes_xyxy[:, 1], 0, orig_h)
-        boxes_xyxy[:, 2] = np.clip(boxes_xyxy[:, 2], 0, orig_w)
-        boxes_xyxy[:, 3] = np.clip(boxes_xyxy[:, 3], 0, orig_h)
-
-        # Apply NMS
-        keep_indices = self._nms(boxes_xyxy, confidences, self.iou_threshold)
-
-        detections = []
-        for i in keep_indices:
-            cls_id = int(class_ids[i])
-            cls_name = self.class_names[cls_id] if cls_id < len(self.class_names) else f"class_{cls_id}"
-            detections.append(
-                Detection(
-                    x1=round(float(boxes_xyxy[i, 0]), 1),
-                    y1=round(float(boxes_xyxy[i, 1]), 1),
-                    x2=round(float(boxes_xyxy[i, 2]), 1),
-                    y2=round(float(boxes_xyxy[i, 3]), 1),
-                    confidence=round(float(confidences[i]), 4),
-                    class_name=cls_name,
-                )
-            )
-
-        # Sort by confidence descending
-        detections.sort(key=lambda d: d.confidence, reverse=True)
-        return detections
-
-    def _nms(
-        self, boxes: np.ndarray, scores: np.ndarray, iou_threshold: float
-    ) -> List[int]:
-        """Non-Maximum Suppression."""
-        if len(boxes) == 0:
-            return []
-
-        x1 = boxes[:, 0]
-        y1 = boxes[:, 1]
-        x2 = boxes[:, 2]
-        y2 = boxes[:, 3]
-        areas = (x2 - x1) * (y2 - y1)
-
-        order = scores.argsort()[::-1]
-        keep = []
-
-        while len(order) > 0:
-            i = order[0]
-            keep.append(i)
-
-            if len(order) == 1:
-                break
-
-            xx1 = np.maximum(x1[i], x1[order[1:]])
-            yy1 = np.maximum(y1[i], y1[order[1:]])
-            xx2 = np.minimum(x2[i], x2[order[1:]])
-            yy2 = np.minimum(y2[i], y2[order[1:]])
-
-            inter_w = np.maximum(0, xx2 - xx1)
-            inter_h = np.maximum(0, yy2 - yy1)
-            intersection = inter_w * inter_h
-
-            union = areas[i] + areas[order[1:]] - intersection
-            iou = intersection / (union + 1e-6)
-
-            remaining = np.where(iou <= iou_threshold)[0]
-            order = order[remaining + 1]
-
-        return keep
+            class_ids = np.argmax(class_scores, axis=2)
+            confidences = np.take_along_axis(class_scores, class_ids[:, :, np.newaxis], axis=2)[:, :, 0]
+
+        passing = confidences >= self.conf_threshold
+        results = []
+        for b, (ratio, (pad_w, pad_h), orig_w, orig_h, (scale_x, scale_y)) in enumerate(metas):
+            idx = np.flatnonzero(passing[b])
+            if idx.size == 0:
+                results.append([])
+                continue
+
+            # Top-k pre-filter: leaf-dense frames can have hundreds of candidates
+            scores = confidences[b, idx]
+            if idx.size > self.max_candidates:
+                top = np.argpartition(scores, -self.max_candidates)[-self.max_candidates:]
+                idx, scores = idx[top], scores[top]
+
+            # cx,cy,w,h -> x1,y1,x2,y2 -> original image pixels, in place on one copy
+            boxes = outputs[b, idx, :4].astype(np.float32, copy=True)
+            boxes[:, 2:] *= 0.5
+            boxes[:, :2] -= boxes[:, 2:]
+            boxes[:, 2:] *= 2.0
+            boxes[:, 2:] += boxes[:, :2]
+            boxes -= np.array([pad_w, pad_h, pad_w, pad_h], dtype=np.float32)
+            boxes *= np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32) / ratio
+            np.clip(boxes, 0, np.array([orig_w, orig_h, orig_w, orig_h], dtype=np.float32), out=boxes)
+
+            keep = nms(boxes, scores, self.iou_threshold)[:self.max_detections]
+
+            # Round once for the kept boxes, then build dataclasses from Python floats
+            kept_boxes = np.round(boxes[keep].astype(np.float64), 1).tolist()
+            kept_scores = np.round(scores[keep].astype(np.float64), 4).tolist()
+            kept_classes = class_ids[b, idx[keep]].tolist() if class_ids is not None else [0] * len(keep)
+            detections = []
+            for (x1, y1, x2, y2), conf, cls_id in zip(kept_boxes, kept_scores, kept_classes):
+                cls_name = self.class_names[cls_id] if cls_id < len(self.class_names) else f"class_{cls_id}"
+                detections.append(Detection(x1=x1, y1=y1, x2=x2, y2=y2, confidence=conf, class_name=cls_name))
+
+            # NMS keeps boxes in descending confidence order
+            results.append(detections)
+        return results
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Greedy Non-Maximum Suppression over a precomputed IoU matrix.
+
+    Same result as the classic loop (highest score first, drop boxes whose
+    IoU with a kept box exceeds the threshold), but all IoUs come from one
+    vectorized [K, K] computation; the remaining per-box step is a row lookup.
+
+    Returns:
+        Indices of kept boxes, highest score first
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    order = np.argsort(-scores, kind="stable")
+    b = boxes[order]
+    areas = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+
+    xx1 = np.maximum(b[:, np.newaxis, 0], b[np.newaxis, :, 0])
+    yy1 = np.maximum(b[:, np.newaxis, 1], b[np.newaxis, :, 1])
+    xx2 = np.minimum(b[:, np.newaxis, 2], b[np.newaxis, :, 2])
+    yy2 = np.minimum(b[:, np.newaxis, 3], b[np.newaxis, :, 3])
+    np.subtract(xx2, xx1, out=xx2)
+    np.subtract(yy2, yy1, out=yy2)
+    np.maximum(xx2, 0, out=xx2)
+    np.maximum(yy2, 0, out=yy2)
+    inter = np.multiply(xx2, yy2, out=xx2)
+    union = areas[:, np.newaxis] + areas[np.newaxis, :] - inter
+    union += 1e-6
+    overlaps = np.divide(inter, union, out=inter) > iou_threshold
+
+    n = len(order)
+    suppressed = np.zeros(n, dtype=bool)
+    keep = []
+    for i in range(n):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= overlaps[i]
+    return order[keep]
@@ -30,6 +30,7 @@ export default function ESP32ScannerPage() {
 
   // WebSocket
   const wsRef = useRef(null)
+  const frameUrlsRef = useRef(new Map()) // frame_id -> object URL of binary frames
   const canvasRef = useRef(null)
   const imgRef = useRef(null)
 
@@ -42,14 +43,20 @@ export default function ESP32ScannerPage() {
   useEffect(() => {
     if (!isConnected) return
 
-    const wsUrl = `${API_URL.replace('http', 'ws')}/ws/scan`
+    // Frames arrive as binary messages (b"AGF1" + uint32 frame_id + JPEG); events reference frame_id
+    const wsUrl = `${API_URL.replace('http', 'ws')}/ws/scan?frames=binary`
     const ws = new WebSocket(wsUrl)
+    ws.binaryType = 'arraybuffer'
 
     ws.onopen = () => {
       console.log('WebSocket connected')
     }
 
     ws.onmessage = (event) => {
+      if (event.data instanceof ArrayBuffer) {
+        handleBinaryFrame(event.data)
+        return
+      }
       const msg = JSON.parse(event.data)
       handleWsMessage(msg)
     }
@@ -68,6 +75,8 @@ export default function ESP32ScannerPage() {
       if (ws.readyState === WebSocket.OPEN) {
         ws.close()
       }
+      frameUrlsRef.current.forEach(url => URL.revokeObjectURL(url))
+      frameUrlsRef.current.clear()
     }
   }, [isConnected])
 
@@ -76,11 +85,30 @@ export default function ESP32ScannerPage() {
     drawDetections()
   }, [detections, latestFrame])
 
+  const handleBinaryFrame = useCallback((buffer) => {
+    const view = new DataView(buffer)
+    if (buffer.byteLength < 8 || view.getUint32(0) !== 0x41474631) return // "AGF1"
+    const frameId = view.getUint32(4)
+    const urls = frameUrlsRef.current
+    urls.set(frameId, URL.createObjectURL(new Blob([buffer.slice(8)], { type: 'image/jpeg' })))
+    // Keep a few recent frames; the displayed one is always among them
+    while (urls.size > 8) {
+      const [oldestId, oldestUrl] = urls.entries().next().value
+      URL.revokeObjectURL(oldestUrl)
+      urls.delete(oldestId)
+    }
+  }, [])
+
   const handleWsMessage = useCallback((msg) => {
     if (msg.event_type === 'state_change') {
       setScanState(msg.state)
     } else if (msg.event_type === 'frame') {
-      setLatestFrame(msg.data.frame_base64)
+      const url = frameUrlsRef.current.get(msg.data.frame_id)
+      if (url) {
+        setLatestFrame(url)
+      } else if (msg.data.frame_base64) {
+        setLatestFrame(`data:image/jpeg;base64,${msg.data.frame_base64}`)
+      }
       setDetections(msg.data.detections || [])
     } else if (msg.event_type === 'detection') {
       setDetections(msg.data.detections || [])
@@ -96,12 +124,14 @@ export default function ESP32ScannerPage() {
         timestamp: new Date().toISOString(),
       }, ...prev])
     } else if (msg.event_type === 'advice') {
-      // Update the latest result with advice
+      // Pipelined scans deliver advice asynchronously: match it by scan index.
+      // Advice for a result we don't have (cleared by a new scan, or sent
+      // before this client connected) is dropped, never put on another result
       setScanResults(prev => {
+        const idx = prev.findIndex(r => r.scanIndex === msg.data.scan_index)
+        if (idx < 0) return prev
         const updated = [...prev]
-        if (updated.length > 0) {
-          updated[0] = { ...updated[0], advice: msg.data.advice }
-        }
+        updated[idx] = { ...updated[idx], advice: msg.data.advice }
         return updated
       })
     } else if (msg.event_type === 'error') {
@@ -379,7 +409,7 @@ export default function ESP32ScannerPage() {
                   {latestFrame ? (
                     <img
                       ref={imgRef}
-                      src={`data:image/jpeg;base64,${latestFrame}`}
+                      src={latestFrame}
                       alt="ESP32 Camera Feed"
                       className="w-full h-full object-contain"
                       onLoad={drawDetections}